@@ -1,5 +1,8 @@
 """
 Configuration for state types
+
+Optionally, 'district_groups': (count, rate) generates that many groups of districts (e.g. counties),
+and puts each district in a random group with the given probability.
 """
 
 STATE_TYPES = {
@@ -18,6 +21,7 @@ STATE_TYPES = {
                                        ('Small Good', 100),
                                        ('Small Very Poor', 200),
                                        ('Small Very Good', 100)],
+         'district_groups': (58, 0.95),
          'subject_skip_percentages': {'Math': .04, 'ELA': .03},
          'demographics': 'california',
          'id': '06'
@@ -30,6 +34,7 @@ STATE_TYPES = {
                                        ('Small Average', 5),
                                        ('Small Poor', 2),
                                        ('Small Good', 2)],
+         'district_groups': (3, 0.8),
          'subject_skip_percentages': {'Math': .04, 'ELA': .03},
          'demographics': 'california',
          'id': '00'
@@ -6,6 +6,7 @@ The data generator for the SBAC project.
 import argparse
 import datetime
 
+from datagen.util.run_config import apply_run_config, load_run_config, run_config_args
 from datagen.worker_manager import WorkerManager
 
 if __name__ == '__main__':
@@ -15,31 +16,90 @@ if __name__ == '__main__':
                                             '\n  --state_type devel --gen_iab --gen_item --pkg-source ./in/iabs.csv'
                                             '\n  --state_type tiny --gen_sum ./in/20*.csv'
                                             '\n  --state_type california --gen_sum --gen_ica ./in/20*.csv'
+                                            '\n  --config ./in/run.yaml --plan'
                                      )
 
+    parser.add_argument('-cfg', '--config', dest='config', action='store', default=None, help='Run configuration file (YAML or JSON) with the settings of the run; command line arguments override it (YAML requires PyYAML)')
+    parser.add_argument('-ip', '--import_profile', '--import-profile', dest='import_profile', action='store_true', default=False, help='Print the time spent importing each datagen module at start up (like python -X importtime), without generating data')
+    parser.add_argument('-pl', '--plan', dest='plan', action='store_true', default=False, help='Validate the run and print its plan (expected students and outcomes by school), without generating data')
+
     parser.add_argument('-sn', '--state_name', dest='state_name', action='store', default='California', help='The name of the state (default=California)')
     parser.add_argument('-sc', '--state_code', dest='state_code', action='store', default='CA', help='The code of the state to generate data for')
     parser.add_argument('-st', '--state_type', dest='state_type', action='store', default='tiny', help='Specify the type of state to generate data for')
 
     parser.add_argument('-hier', '--hier_source', dest='hier_source', action='store', default='generate', help='Source of hierarchy, either \'generate\' or a CSV pathname, e.g. ./in/hierarchy.csv')
+    parser.add_argument('-hierc', '--hier_cache', dest='hier_cache', action='store', default=None, help='Folder for caching generated hierarchies, so later runs with the same state arguments (and seed) reuse the hierarchy and its ids, e.g. ./in/.cache')
+    parser.add_argument('-hiers', '--hier_seed', dest='hier_seed', action='store', type=int, default=None, help='Random seed for generating the hierarchy, to generate the same hierarchy every time')
     parser.add_argument('-sub', '--subject_source', dest='subject_source', action='store', default='generate', help='Source of subject definitions files, either \'generate\' or a glob expression matching files, e.g. ./in/*_subject.xml')
     parser.add_argument('-pkg', '--pkg_source', dest='pkg_source', action='store', help='Source of assessment packages, a glob expression matching files, e.g. ./in/20*.csv')
+    parser.add_argument('-pc', '--pkg_cache', dest='pkg_cache', action='store', default=None, help='Folder for caching compiled assessment packages, so later runs don\'t parse them again, e.g. ./in/.cache (requires pyarrow)')
+    parser.add_argument('-pp', '--pkg_processes', dest='pkg_processes', action='store', type=int, default=1, help='Number of processes for parsing assessment package files in parallel (default=1)')
+    parser.add_argument('-y', '--years', dest='years', action='store', type=int, nargs='+', default=None, help='The years of the assessment packages to generate, e.g. 2018 2019 (default is all the packages\' years)')
+    parser.add_argument('-sd', '--seed', dest='seed', action='store', type=int, default=None, help='Random seed for generating the population and outcomes, to generate the same data every time (with --hier_seed)')
 
     group = parser.add_argument_group('outcomes')
     group.add_argument('-gsum', '--gen_sum', dest='gen_sum', action='store_true', default=False, help='Generate summative outcomes')
     group.add_argument('-gica', '--gen_ica', dest='gen_ica', action='store_true', default=False, help='Generate ICA outcomes')
     group.add_argument('-giab', '--gen_iab', dest='gen_iab', action='store_true', default=False, help='Generate IAB outcomes')
     group.add_argument('-gitem', '--gen_item', dest='gen_item', action='store_true', default=False, help='Generate item level data')
+    group.add_argument('-ce', '--capability_engine', dest='capability_engine', action='store', choices=['python', 'numpy'], default='python', help='Backend for generating student capabilities (numpy requires the numpy package, default=python)')
 
     parser.add_argument('-o', '--out_dir', dest='out_dir', action='store', default='out', help='Specify the root directory for writing output files to')
     # since there is only a single output format right now, default it to true for convenience
     parser.add_argument('-xo', '--xml_out', dest='xml_out', action='store_true', default=True, help='Output data to (TRT) XML')
+    parser.add_argument('-nxo', '--no_xml_out', dest='xml_out', action='store_false', help='Do not output (TRT) XML files, e.g. when submitting directly with --http_out')
+    parser.add_argument('-po', '--parquet_out', dest='parquet_out', action='store_true', default=False, help='Output data to partitioned Parquet files (requires pyarrow)')
+    parser.add_argument('-ao', '--arrow_out', dest='arrow_out', action='store_true', default=False, help='Output data to partitioned Arrow IPC files (requires pyarrow)')
+    parser.add_argument('-co', '--csv_out', dest='csv_out', action='store_true', default=False, help='Output data to CSV files for bulk database loads')
+    parser.add_argument('-to', '--tsv_out', dest='tsv_out', action='store_true', default=False, help='Output data to TSV (PostgreSQL text format) files for bulk database loads')
+    parser.add_argument('-ho', '--http_out', dest='http_out', action='store_true', default=False, help='Submit (TRT) XML directly to the import service')
+
+    group = parser.add_argument_group('http submission')
+    group.add_argument('-hu', '--http_url', dest='http_url', action='store', default='http://localhost:8080/exams/imports', help='Import service endpoint (default=http://localhost:8080/exams/imports)')
+    group.add_argument('-ht', '--http_token', dest='http_token', action='store', default=None, help='Access token (default is the stub token service token)')
+    group.add_argument('-htu', '--http_token_url', dest='http_token_url', action='store', default=None, help='OAuth2 token endpoint; if set, the token is fetched (and refreshed) from it')
+    group.add_argument('-htd', '--http_token_data', dest='http_token_data', action='store', default=None, help='Form data for the token request, e.g. grant_type=password&username=...&password=...&client_id=...&client_secret=...')
+    group.add_argument('-hc', '--http_concurrency', dest='http_concurrency', action='store', type=int, default=8, help='Max number of concurrent submissions (default=8)')
+    group.add_argument('-hr', '--http_retries', dest='http_retries', action='store', type=int, default=3, help='Max number of retries for a failed submission (default=3)')
+    group.add_argument('-hl', '--http_log', dest='http_log', action='store', default='imports.log', help='Submission result log, relative to the output directory (default=imports.log)')
+
+    group = parser.add_argument_group('population snapshot')
+    group.add_argument('-sp', '--save_population', dest='save_population', action='store_true', default=False, help='Save the generated hierarchy and student population so later runs can load it (requires pyarrow)')
+    group.add_argument('-lp', '--load_population', dest='load_population', action='store_true', default=False, help='Load a saved hierarchy and student population and generate only outcomes (requires pyarrow)')
+    group.add_argument('-pd', '--population_dir', dest='population_dir', action='store', default='population', help='Population snapshot folder, relative to the output directory (default=population)')
+
+    group = parser.add_argument_group('compression')
+    group.add_argument('-z', '--compress', dest='compress', action='store', choices=['gzip', 'zstd', 'lz4'], default=None, help='Compress output files (zstd and lz4 require the zstandard and lz4 packages)')
+    group.add_argument('-zl', '--compress_level', dest='compress_level', action='store', type=int, default=None, help='Compression level (default is the codec default)')
+    group.add_argument('-zb', '--compress_buffer_size', dest='compress_buffer_size', action='store', type=int, default=1024 * 1024, help='Size in bytes of the write buffer for compressed files (default=1048576)')
+    group.add_argument('-zt', '--compress_threaded', dest='compress_threaded', action='store_true', default=False, help='Compress and write output on a background thread')
 
     args, unknown = parser.parse_known_args()
 
-    if not args.xml_out:
+    if args.import_profile:
+        from datagen.util.import_profile import import_profile_report
+        print(import_profile_report())
+        exit()
+
+    # settings from a run configuration are defaults for the command line arguments
+    if args.config:
+        try:
+            config = load_run_config(args.config)
+        except ValueError as e:
+            print(e)
+            exit(1)
+        apply_run_config(config)
+        parser.set_defaults(**run_config_args(config))
+        args, unknown = parser.parse_known_args()
+
+    if not (args.xml_out or args.parquet_out or args.arrow_out or args.csv_out or args.tsv_out or args.http_out):
         print('Please specify at least one output format')
-        print('  --xml_out   Output (TRT) XML')
+        print('  --xml_out      Output (TRT) XML')
+        print('  --parquet_out  Output Parquet')
+        print('  --arrow_out    Output Arrow IPC')
+        print('  --csv_out      Output CSV')
+        print('  --tsv_out      Output TSV')
+        print('  --http_out     Submit to the import service')
         exit()
 
     if not args.pkg_source:
@@ -54,7 +114,11 @@ if __name__ == '__main__':
         print('  --gen_iab  Interim assessment block (IAB) package')
         exit()
 
-    worker = WorkerManager(args)
+    try:
+        worker = WorkerManager(args)
+    except ValueError as e:
+        print(e)
+        exit(1)
 
     # Record current (start) time
     tstart = datetime.datetime.now()
@@ -130,21 +130,64 @@ def generate_item_data(outcome: AssessmentOutcome):
         outcome.item_data.append(aid)
 
 
-def generate_session(outcome: [AssessmentOutcome]):
+def generate_session(outcome: [AssessmentOutcome], sessions=None):
     """ generate and set session based on date, student group for this subject
+
+    :param outcome: outcome to set
+    :param sessions: session registry, defaults to SESSIONS
     """
     group = outcome.student.get_group(outcome.assessment.subject.code)
     if not outcome.date_taken and not group:
         return
+    outcome.session = (sessions if sessions is not None else SESSIONS).get(outcome.date_taken, group)
+
+
+class SessionRegistry:
+    """
+    Session strings by (date taken, student group). There are only a few distinct sessions per
+    school per year, so each is hashed once instead of once per outcome. The registry is cleared
+    when it reaches max_size, and should be cleared (see clear) after each school-year.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._sessions = {}
+
+    def get(self, date_taken, group) -> str:
+        """ Get the session for a date and group, either of which may be None.
 
+        :param date_taken: date taken
+        :param group: student group
+        :return: session string, e.g. SMI-3fa2
+        """
+        # the group name is what is hashed, and is unique to a group id
+        key = (date_taken, group.name if group else None)
+        session = self._sessions.get(key)
+        if session is None:
+            if len(self._sessions) >= self.max_size:
+                self._sessions.clear()
+            session = self._sessions[key] = _session(date_taken, group)
+        return session
+
+    def clear(self):
+        self._sessions.clear()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def _session(date_taken, group) -> str:
     hasher = hashlib.sha1()
-    if outcome.date_taken:
-        hasher.update(str(outcome.date_taken).encode())
+    if date_taken:
+        hasher.update(str(date_taken).encode())
     if group:
         hasher.update(group.name.encode())
     hexdigest = hasher.hexdigest()
     # pick last name based on last 4 digits of digest and combine with first 4 digits
-    outcome.session = names.PEOPLE_NAMES.last_names[int(hexdigest[-4:], 16)][:3].upper() + '-' + hexdigest[:4]
+    return names.PEOPLE_NAMES.last_names[int(hexdigest[-4:], 16)][:3].upper() + '-' + hexdigest[:4]
+
+
+SESSIONS = SessionRegistry()
 
 
 def set_opportunity_dates(outcome: [AssessmentOutcome]):
@@ -172,6 +215,7 @@ def generate_response(aid: AssessmentOutcomeItemData, item: AssessmentItem, capa
     #
     # student capability ranges from 0.0 to 4.0
     # chance to answer correctly is based on capability if it's available
+    item = item.item    # read the metadata from the item rather than through the assessment item
     correct_rate = (0.40 + 0.15 * capability) if capability is not None else 0.70
     correct_rate += (0 if not item.difficulty else -0.05 * item.difficulty)
     correct = random() < correct_rate
@@ -8,6 +8,7 @@ import datagen.config.state_types as state_config
 import datagen.generators.names as name_gen
 from datagen.config import cfg
 from datagen.model.district import District
+from datagen.model.districtgroup import DistrictGroup
 from datagen.model.institutionhierarchy import InstitutionHierarchy
 from datagen.model.registrationsystem import RegistrationSystem
 from datagen.model.school import School
@@ -50,6 +51,22 @@ def generate_state(state_type, name, code, id_gen=IDGen,
     return s
 
 
+def generate_district_group(state: State, id_gen=IDGen):
+    """Generate a group of districts.
+
+    :param state: The state the group belongs to
+    :param id_gen: id generator
+    :returns: The district group
+    """
+    g = DistrictGroup()
+    g.guid = id_gen.get_uuid()
+    g.name = name_gen.generate_district_group_name()
+    g.state = state
+    g.id = id_gen.get_district_group_id(state.id)
+
+    return g
+
+
 def generate_district(district_type, state: State, id_gen=IDGen, district_types=hier_config.DISTRICT_TYPES):
     """Generate a district specified by the parameters.
 
@@ -76,14 +93,15 @@ def generate_district(district_type, state: State, id_gen=IDGen, district_types=
 
 
 def generate_school(school_type, district: District, id_gen=IDGen, school_types=hier_config.SCHOOL_TYPES,
-                    interim_asmt_rate=cfg.INTERIM_ASMT_RATE):
+                    interim_asmt_rate=None):
     """Generate a school specified by the parameters.
 
     :param school_type: The type of school to generate
     :param district: The district the school belongs to
     :param id_gen: ID generator
     :param school_types: The school types configuration object
-    :param interim_asmt_rate: The rate (chance) that students in this school will take interim assessments
+    :param interim_asmt_rate: The rate (chance) that students in this school will take interim assessments,
+                              None for cfg.INTERIM_ASMT_RATE
     :returns: The school
     """
     # Validate the school type
@@ -101,6 +119,8 @@ def generate_school(school_type, district: District, id_gen=IDGen, school_types=
     s.id = id_gen.get_school_id(district.id)
 
     # Decide if the school takes interim assessments
+    if interim_asmt_rate is None:
+        interim_asmt_rate = cfg.INTERIM_ASMT_RATE
     if random.random() < interim_asmt_rate:
         s.takes_interim_asmts = True
 
@@ -176,6 +196,6 @@ def set_up_schools_with_grades(schools, grades_of_concern):
     """
     schools_with_grades = {}
     for school in schools:
-        grades_for_school = grades_of_concern.intersection(school.config['grades'])
+        grades_for_school = grades_of_concern.intersection(school.type_config.grade_set)
         schools_with_grades[school] = dict(zip(grades_for_school, [[] for _ in range(len(grades_for_school))]))
     return schools_with_grades
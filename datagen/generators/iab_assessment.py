@@ -9,7 +9,7 @@ from datagen.model.assessment import Assessment
 from datagen.model.assessmentoutcome import AssessmentOutcome
 from datagen.model.score import Score
 from datagen.model.student import Student
-from datagen.util.assessment_stats import random_stderr, claim_perf_lvl, score_given_capability
+from datagen.util.assessment_stats import random_stderrs, claim_perf_lvl, scores_given_capabilities
 from datagen.util.id_gen import IDGen
 
 
@@ -38,6 +38,33 @@ def create_iab_outcome_object(date_taken: datetime.date,
     iab_results[iab_asmt.guid].append(ao)
 
 
+def create_iab_outcome_objects(date_taken: datetime.date,
+                               students: [Student],
+                               iab_asmt: Assessment,
+                               id_gen: IDGen,
+                               iab_results: {str: AssessmentOutcome},
+                               gen_item=True):
+    """
+    Batch version of create_iab_outcome_object.
+
+    :param date_taken: date test was taken
+    :param students: students to create outcomes for
+    :param iab_asmt: IAB assessment
+    :param id_gen: ID generator
+    :param iab_results: Dictionary of assessment results to update
+    :param gen_item: If should create item-level responses
+    """
+    if not students:
+        return
+
+    # Make sure the assessment is known in the results
+    if iab_asmt.guid not in iab_results:
+        iab_results[iab_asmt.guid] = []
+
+    iab_results[iab_asmt.guid].extend(
+        generate_interim_assessment_outcomes(date_taken, students, iab_asmt, id_gen, gen_item=gen_item))
+
+
 def generate_interim_assessment_outcome(date_taken: datetime.date,
                                         student: Student,
                                         assessment: Assessment,
@@ -53,30 +80,51 @@ def generate_interim_assessment_outcome(date_taken: datetime.date,
     @param gen_item: If should create item-level responses
     @returns: The assessment outcome
     """
+    return generate_interim_assessment_outcomes(date_taken, [student], assessment, id_gen, gen_item)[0]
 
-    # Run the General generator
-    sao = gen_asmt_generator.generate_assessment_outcome(student, assessment, id_gen)
 
-    # Set other specifics
-    sao.school = student.school
-    sao.date_taken = date_taken
-    sao.admin_condition = 'NS'
-    gen_asmt_generator.generate_session(sao)
+def generate_interim_assessment_outcomes(date_taken: datetime.date,
+                                         students: [Student],
+                                         assessment: Assessment,
+                                         id_gen: IDGen,
+                                         gen_item=True):
+    """
+    Generate assessment outcomes for a batch of students.
+    The scores are generated for the whole batch at once.
 
-    # Generate assessment outcome Item-level data
-    if gen_item:
-        gen_asmt_generator.generate_item_data(sao)
+    @param date_taken: date test was taken
+    @param students: The students to create the outcomes for
+    @param assessment: The assessment to create the outcomes for
+    @param id_gen: ID generator
+    @param gen_item: If should create item-level responses
+    @returns: The assessment outcomes, in the same order as the students
+    """
+    outcomes = []
+    for student in students:
+        # Run the General generator
+        sao = gen_asmt_generator.generate_assessment_outcome(student, assessment, id_gen)
 
-    # set timestamps for the opportunity
-    gen_asmt_generator.set_opportunity_dates(sao)
+        # Set other specifics
+        sao.school = student.school
+        sao.date_taken = date_taken
+        sao.admin_condition = 'NS'
+        gen_asmt_generator.generate_session(sao)
 
-    # use the student capability to generate an overall score
+        # Generate assessment outcome Item-level data
+        if gen_item:
+            gen_asmt_generator.generate_item_data(sao)
+
+        # set timestamps for the opportunity
+        gen_asmt_generator.set_opportunity_dates(sao)
+
+        outcomes.append(sao)
+
+    # use the student capabilities to generate overall scores
     # note that IAB level is calculated differently using SB formulae
-    overall = Score('Overall')
-    overall.score, level = \
-        score_given_capability(student.capability[assessment.subject.code], assessment.overall.get_cuts())
-    overall.stderr = random_stderr(overall.score, assessment.overall.score_min, assessment.overall.score_max)
-    overall.perf_lvl = claim_perf_lvl(overall.score, overall.stderr, assessment.overall.cut_points[1])
-    sao.overall = overall
-
-    return sao
+    capabilities = [student.capability[assessment.subject.code] for student in students]
+    scores, _ = scores_given_capabilities(capabilities, assessment.overall.get_cuts())
+    stderrs = random_stderrs(scores, assessment.overall.score_min, assessment.overall.score_max)
+    for sao, score, stderr in zip(outcomes, scores, stderrs):
+        sao.overall = Score('Overall', score, stderr, claim_perf_lvl(score, stderr, assessment.overall.cut_points[1]))
+
+    return outcomes
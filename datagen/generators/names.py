@@ -3,6 +3,7 @@ Generate name components.
 
 """
 
+import functools
 import os
 import random
 
@@ -15,13 +16,16 @@ NAMES_LAST = os.path.join(NAME_FILES_PATH, 'dist.all.last')
 NAMES_FEMALE_FIRST = os.path.join(NAME_FILES_PATH, 'dist.female.first')
 NAMES_MALE_FIRST = os.path.join(NAME_FILES_PATH, 'dist.male.first')
 
-NAMES_BIRDS = tuple(map(str.strip, open(os.path.join(NAME_FILES_PATH, 'birds.txt'))))
-NAMES_FISH = tuple(map(str.strip, open(os.path.join(NAME_FILES_PATH, 'fish.txt'))))
-NAMES_MAMMALS = tuple(map(str.strip, open(os.path.join(NAME_FILES_PATH, 'mammals.txt'))))
-NAMES_ANIMALS = tuple(map(str.strip, open(os.path.join(NAME_FILES_PATH, 'one-word-animal-names.txt'))))
+# word lists, read the first time they are used (see _words)
+NAMES_BIRDS = os.path.join(NAME_FILES_PATH, 'birds.txt')
+NAMES_FISH = os.path.join(NAME_FILES_PATH, 'fish.txt')
+NAMES_MAMMALS = os.path.join(NAME_FILES_PATH, 'mammals.txt')
+NAMES_ANIMALS = os.path.join(NAME_FILES_PATH, 'one-word-animal-names.txt')
 
 DISTRICT_SUFFIXES = ('District', 'School District', 'Schools', 'County Schools', 'Public Schools', 'SD')
 
+DISTRICT_GROUP_SUFFIXES = ('County', 'County Office of Education', 'Region', 'Regional Service Center')
+
 SCHOOL_SUFFIXES = {'Elementary School': ['El Sch', 'Elem', 'Ctr', 'Elementary School', 'Primary', 'Elementary',
                                          'Elem', 'Sch'],
                    'Middle School': ['Middle School', 'Community Middle', 'Middle', 'Junior High',
@@ -34,6 +38,7 @@ STREET_SUFFIXES = ['Road', 'Rd.', 'RD', 'Avenue', 'Ave.', 'AVE', 'Street', 'St.'
 
 APARTMENT_PREFIXES = ['#', 'Apt', 'Suite']
 
+# the name pools are generated the first time they are used
 PEOPLE_NAMES = PeopleNames(NAMES_MALE_FIRST, NAMES_FEMALE_FIRST, NAMES_LAST)
 
 
@@ -43,7 +48,16 @@ def generate_district_name(max_name_length=None):
     :param max_name_length: The longest a name can be
     :returns: New district name
     """
-    return _generate_name_from_lists(NAMES_ANIMALS, NAMES_ANIMALS, DISTRICT_SUFFIXES, max_name_length)
+    return _generate_name_from_lists(_words(NAMES_ANIMALS), _words(NAMES_ANIMALS), DISTRICT_SUFFIXES, max_name_length)
+
+
+def generate_district_group_name(max_name_length=None):
+    """Generate a name for a group of districts.
+
+    :param max_name_length: The longest a name can be
+    :returns: New district group name
+    """
+    return _generate_name_from_lists(_words(NAMES_ANIMALS), _words(NAMES_ANIMALS), DISTRICT_GROUP_SUFFIXES, max_name_length)
 
 
 def generate_school_name(school_type, max_name_length=None):
@@ -55,7 +69,7 @@ def generate_school_name(school_type, max_name_length=None):
     """
     if school_type not in SCHOOL_SUFFIXES:
         raise KeyError("School type '" + school_type + "' not found")
-    return _generate_name_from_lists(NAMES_ANIMALS, NAMES_ANIMALS, SCHOOL_SUFFIXES[school_type], max_name_length)
+    return _generate_name_from_lists(_words(NAMES_ANIMALS), _words(NAMES_ANIMALS), SCHOOL_SUFFIXES[school_type], max_name_length)
 
 
 def generate_person_name(gender):
@@ -85,7 +99,7 @@ def generate_street_address_line_1():
 
     :returns: The street address
     """
-    return str(random.randint(1, 5000)) + ' ' + random.choice(NAMES_BIRDS) + ' ' + random.choice(STREET_SUFFIXES)
+    return str(random.randint(1, 5000)) + ' ' + random.choice(_words(NAMES_BIRDS)) + ' ' + random.choice(STREET_SUFFIXES)
 
 
 def generate_street_address_line_2():
@@ -101,7 +115,7 @@ def generate_street_address_city():
 
     :returns: The city name of a street address
     """
-    return random.choice(NAMES_BIRDS) + ' ' + random.choice(NAMES_BIRDS)
+    return random.choice(_words(NAMES_BIRDS)) + ' ' + random.choice(_words(NAMES_BIRDS))
 
 
 def _generate_name_from_lists(list_1, list_2, suffix_list, max_name_length=None):
@@ -133,3 +147,14 @@ def _generate_name_from_lists(list_1, list_2, suffix_list, max_name_length=None)
     if max_name_length and (len(result) > max_name_length):
         result = result[:max_name_length]
     return (result + ' ' + suffix).replace('\n', '').replace('\r', '')
+
+
+@functools.lru_cache(maxsize=None)
+def _words(file):
+    """Read a word list, once.
+
+    :param file: word list file, one word (or phrase) per line
+    :returns: tuple of the words
+    """
+    with open(file) as f:
+        return tuple(map(str.strip, f))
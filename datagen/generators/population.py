@@ -9,19 +9,22 @@ import random
 from math import ceil
 
 import datagen.config.cfg as cfg
-import datagen.config.hierarchy as hier_config
 import datagen.config.population as pop_config
 import datagen.generators.names as name_gen
+import datagen.util.capability as capability
 from datagen.generators.subject import get_el_adjacent
 from datagen.model.district import District
 from datagen.model.school import School
 from datagen.model.staff import DistrictStaff, TeachingStaff
 from datagen.model.student import Student
 from datagen.model.studentgroup import StudentGroup
-from datagen.util.assessment_stats import Properties, RandomLevelByDemographics, random_capability, \
-    adjust_capability, inverse_adjustment
+from datagen.util.assessment_stats import Properties, RandomLevelByDemographics, inverse_adjustment
+from datagen.util.dates import DATES
 from datagen.util.id_gen import IDGen
-from datagen.util.weighted_choice import weighted_choice
+from datagen.util.weighted_choice import SAMPLERS
+
+# assessment stats generators by (grade, subject group), see _get_level_generator
+_LEVEL_GENERATORS = {}
 
 
 def generate_district_staff_member(district: District, id_gen: IDGen=IDGen, sub_class=None):
@@ -62,102 +65,117 @@ def generate_student(school: School, grade, id_gen: IDGen, acad_year, subject_co
                      has_physical_address_rate=pop_config.HAS_PHYSICAL_ADDRESS_RATE,
                      has_address_line_2_rate=pop_config.HAS_ADDRESS_LINE_2_RATE):
     """
-    Generate a student.
+    Generate a student. See generate_students for the parameters.
 
-    :param school: The school the student belongs to
-    :param grade: The grade the student belongs to
-    :param id_gen: id generator
-    :param acad_year: The current academic year this student is being created for (optional, defaults to your machine
-                      clock's current year)
-    :param subject_codes: list of subject codes (for generating student capability)
-    :param has_email_address_rate: The rate at which to generate an email address for the student
-    :param has_physical_address_rate: The rate at which to generate a physical address for the student
-    :param has_address_line_2_rate: The rate at which to generate a line two address for the student
     :return: The student
     """
-    # Build student basics
-    s = Student()
-    s.guid = id_gen.get_uuid()
-    s.grade = grade
-    s.school = school
-    s.dob = _determine_student_dob(s.grade, acad_year)
-
-    # Determine demographics
-    (gender, ethnicities, iep, sec504, lep, ed) = _determine_demographics(school.demo_config[str(grade)])
-    s.gender = gender
-    s.prg_iep = iep
-    s.prg_sec504 = sec504
-    s.prg_lep = lep
-    s.prg_econ_disad = ed
-
-    if 'amer_ind' in ethnicities:
-        s.eth_amer_ind = True
-    if 'black' in ethnicities:
-        s.eth_black = True
-    if 'hispanic' in ethnicities:
-        s.eth_hispanic = True
-    if 'asian' in ethnicities:
-        s.eth_asian = True
-    if 'filipino' in ethnicities:
-        s.eth_filipino = True
-    if 'pac_isl' in ethnicities:
-        s.eth_pacific = True
-    if 'white' in ethnicities:
-        s.eth_white = True
-    if 'multi' in ethnicities:
-        s.eth_multi = True
-    if 'none' in ethnicities:
-        s.eth_none = True
+    return generate_students(school, grade, 1, id_gen, acad_year, subject_codes, military_connected_dist,
+                             has_email_address_rate, has_physical_address_rate, has_address_line_2_rate)[0]
 
-    # Create the name
-    s.first_name, s.middle_name, s.last_name = name_gen.generate_person_name(s.gender)
 
-    # Create physical and email addresses
-    if random.random() < has_email_address_rate:
-        # Email address (first.last.#@example.com)
-        s.email = s.first_name + '.' + s.last_name + '.' + str(random.randint(1, 5000)) + '@example.com'
-
-    if random.random() < has_physical_address_rate:
-        s.address_line_1 = name_gen.generate_street_address_line_1()
-        if random.random() < has_address_line_2_rate:
-            s.address_line_2 = name_gen.generate_street_address_line_2()
-        s.address_city = name_gen.generate_street_address_city()
-        s.address_zip = random.randint(10000, 99999)
-
-    # Get the demographic config
-    demo_config = school.demo_config[str(grade)]
-
-    # Set other specifics
-    s.state = school.district.state
-    s.district = school.district
-    s.id = id_gen.get_student_id()
-    s.external_ssid = hashlib.md5(s.id.encode('utf-8')).hexdigest()
-    s.rec_id = id_gen.get_rec_id('student')
-    s.school_entry_date = _generate_date_enter_us_school(s.grade, acad_year)
-    s.derived_demographic = _generate_derived_demographic(s)
-    s.prg_migrant = determine_demo_option_selected(demo_config['migrant'])
-    s.prg_idea = determine_demo_option_selected(demo_config['idea'])
-    s.prg_primary_disability = random.choice(cfg.PRG_DISABILITY_TYPES)
-    s.military_connected = _pick_demo_option(military_connected_dist)
-
-    # None-out primary disability if it doesn't make sense
-    if not s.prg_iep and not s.prg_idea and not s.prg_sec504:
-        s.prg_primary_disability = None
-
-    # Set language items
-    _set_lang_items(s, acad_year)
-
-    # generate and store the student's capability based on demographics and school adjustment
-    adj = hier_config.SCHOOL_TYPES[school.type_str]['students'].get('adjust_pld', 0.0)
-    for subject_code in subject_codes:
-        # hack to make performance in EL-related subjects reflect student's english-learner status
-        subject_adj = adj
-        if get_el_adjacent(subject_code) and s.elas == 'EL' and cfg.LEP_PROFICIENCY_LEVELS.index(s.lang_prof_level) < 3:
-            subject_adj += 0.4 * (cfg.LEP_PROFICIENCY_LEVELS.index(s.lang_prof_level) - 3)
-        generator, demo = _get_level_demographics(s, subject_code)
-        s.capability[subject_code] = random_capability(generator.distribution(demo), subject_adj)
+def generate_students(school: School, grade, n, id_gen: IDGen, acad_year, subject_codes: [str],
+                      military_connected_dist=pop_config.MILITARY_CONNECTED_DIST,
+                      has_email_address_rate=pop_config.HAS_EMAIL_ADDRESS_RATE,
+                      has_physical_address_rate=pop_config.HAS_PHYSICAL_ADDRESS_RATE,
+                      has_address_line_2_rate=pop_config.HAS_ADDRESS_LINE_2_RATE):
+    """
+    Generate a batch of students for a school grade.
+    The demographic attributes are drawn for the whole batch at once, and the capability distributions
+    are computed once for each distinct combination of demographics, rather than for every student.
 
-    return s
+    :param school: The school the students belong to
+    :param grade: The grade the students belong to
+    :param n: The number of students to generate
+    :param id_gen: id generator
+    :param acad_year: The current academic year the students are being created for
+    :param subject_codes: list of subject codes (for generating student capability)
+    :param military_connected_dist: The distribution of military connected values
+    :param has_email_address_rate: The rate at which to generate an email address for a student
+    :param has_physical_address_rate: The rate at which to generate a physical address for a student
+    :param has_address_line_2_rate: The rate at which to generate a line two address for a student
+    :return: The students
+    """
+    # Get the demographic config and draw the demographics for the batch
+    demo_config = school.demographics[grade]
+    (genders, ethnicities, ieps, sec504s, leps, eds) = _determine_demographics(demo_config, n)
+    migrants = determine_demo_options_selected(demo_config['migrant'], n)
+    ideas = determine_demo_options_selected(demo_config['idea'], n)
+    military_connected = _pick_demo_options(military_connected_dist, n)
+    disabilities = random.choices(cfg.PRG_DISABILITY_TYPES, k=n)
+    dobs = _determine_student_dobs(grade, acad_year, n)
+    entry_dates = _generate_dates_enter_us_school(grade, acad_year, n)
+
+    # capability generators and distributions (by student demographics) for each subject
+    adj = school.type_config.adjust_pld
+    level_generators = {subject_code: _get_level_generator(grade, subject_code) for subject_code in subject_codes}
+
+    students = []
+    distributions = []
+    adjustments = []
+    for i in range(n):
+        # Build student basics
+        s = Student()
+        s.guid = id_gen.get_uuid()
+        s.grade = grade
+        s.school = school
+        s.dob = dobs[i]
+
+        # Set demographics
+        s.gender = genders[i]
+        s.prg_iep = ieps[i]
+        s.prg_sec504 = sec504s[i]
+        s.prg_lep = leps[i]
+        s.prg_econ_disad = eds[i]
+        _set_ethnicities(s, ethnicities[i])
+
+        # Create the name
+        s.first_name, s.middle_name, s.last_name = name_gen.generate_person_name(s.gender)
+
+        # Create physical and email addresses
+        if random.random() < has_email_address_rate:
+            # Email address (first.last.#@example.com)
+            s.email = s.first_name + '.' + s.last_name + '.' + str(random.randint(1, 5000)) + '@example.com'
+
+        if random.random() < has_physical_address_rate:
+            s.address_line_1 = name_gen.generate_street_address_line_1()
+            if random.random() < has_address_line_2_rate:
+                s.address_line_2 = name_gen.generate_street_address_line_2()
+            s.address_city = name_gen.generate_street_address_city()
+            s.address_zip = random.randint(10000, 99999)
+
+        # Set other specifics
+        s.state = school.district.state
+        s.district = school.district
+        s.id = id_gen.get_student_id()
+        s.external_ssid = hashlib.md5(s.id.encode('utf-8')).hexdigest()
+        s.rec_id = id_gen.get_rec_id('student')
+        s.school_entry_date = entry_dates[i]
+        s.derived_demographic = _generate_derived_demographic(s)
+        s.prg_migrant = migrants[i]
+        s.prg_idea = ideas[i]
+        s.prg_primary_disability = disabilities[i]
+        s.military_connected = military_connected[i]
+
+        # None-out primary disability if it doesn't make sense
+        if not s.prg_iep and not s.prg_idea and not s.prg_sec504:
+            s.prg_primary_disability = None
+
+        # Set language items
+        _set_lang_items(s, acad_year)
+
+        # the student's capability distribution is based on demographics, the adjustment on the school
+        # (and, as a hack to make performance in EL-related subjects reflect english-learner status, the subject)
+        demo = _get_student_demographics(s)
+        distributions.append([level_generators[subject_code].cached_distribution(demo)
+                              for subject_code in subject_codes])
+        adjustments.append([adj + capability.el_adjustment(s, subject_code) for subject_code in subject_codes])
+
+        students.append(s)
+
+    # generate and store the students' capabilities
+    capability.ENGINE.initialize(students, subject_codes, distributions, adjustments)
+
+    return students
 
 
 def advance_student(student: Student, schools_by_grade, hold_back_rate=pop_config.STUDENT_HOLD_BACK_RATE,
@@ -174,49 +192,73 @@ def advance_student(student: Student, schools_by_grade, hold_back_rate=pop_confi
                           boundaries
     :returns: True if the student still exists in the system, False if they do not
     """
+    return len(advance_students([student], schools_by_grade, hold_back_rate, drop_out_rate, transfer_rate)) == 1
 
-    # clear flags
-    student.held_back = False
-    student.transfer = False
-
-    # Now check if this student should be advanced
-    if random.random() < hold_back_rate:
-        # The student is not being advanced
-        # Decide if the student should drop out and make sure the student's grade is valid
-        #   If the student's grade is not valid, we could accidentally return True
-        #   Return False to indicate the student is dropped out
-        student.held_back = True
-        if random.random() < drop_out_rate:
-            # The student is being dropped out, so make them go away
-            return False
-        else:
-            # If the student is not being advanced, but is still in a valid grade, return True
-            return student.grade in schools_by_grade
-
-    # Bump the grade
-    student.grade += 1
 
-    # If the new grade is not available in any school, drop the student
-    if student.grade not in schools_by_grade:
-        return False
+def advance_students(students: [Student], schools_by_grade, hold_back_rate=pop_config.STUDENT_HOLD_BACK_RATE,
+                     drop_out_rate=pop_config.STUDENT_DROP_OUT_RATE, transfer_rate=pop_config.STUDENT_TRANSFER_RATE):
+    """Advance a cohort of students to the next grade, see advance_student.
+    The hold back, drop out and transfer decisions are drawn for the whole cohort, new schools are picked
+    for all transferring students of a grade at once, and each student's capability adjustments are combined
+    into a single adjustment.
 
-    # changes in the student situation may change their capability
-    adjustments = []
-
-    # If the new grade of the student is not available in the school, pick a new school
-    if student.grade not in student.school.grades or random.random() < transfer_rate:
-        student.transfer = True
-        # apply capability adjustments by undoing old school and applying new school
-        adjustments.append(
-            inverse_adjustment(hier_config.SCHOOL_TYPES[student.school.type_str]['students'].get('adjust_pld', 0.0)))
-        student.school = random.choice(schools_by_grade[student.grade])
-        adjustments.append(hier_config.SCHOOL_TYPES[student.school.type_str]['students'].get('adjust_pld', 0.0))
-
-    # SmarterBalanced wants to see students get better so apply a small adjustment each time they advance
-    adjustments.append(0.1)
-    _apply_capability_adjustments(student, adjustments)
-
-    return True
+    :param students: The students to move
+    :param schools_by_grade: Potential new schools for a student to be enrolled in
+    :param hold_back_rate: The rate at which a student should be held back from a new grade
+    :param drop_out_rate: The rate that a student will drop out at if they are not advanced
+    :param transfer_rate: The rate at which a student will transfer to a new school without being forced to by grade
+                          boundaries
+    :returns: The students that still exist in the system
+    """
+    rand = random.random
+    held_back = [rand() < hold_back_rate for _ in students]
+
+    remaining = []
+    transfers_by_grade = {}
+    for student, held in zip(students, held_back):
+        # clear flags
+        student.transfer = False
+        student.held_back = held
+
+        if held:
+            # The student is not being advanced; decide if they drop out, and make sure their grade is still valid
+            if rand() >= drop_out_rate and student.grade in schools_by_grade:
+                remaining.append(student)
+            continue
+
+        # Bump the grade; if the new grade is not available in any school, drop the student
+        student.grade += 1
+        if student.grade not in schools_by_grade:
+            continue
+        remaining.append(student)
+
+        # If the new grade of the student is not available in the school, pick a new school
+        if student.grade not in student.school.type_config.grade_set or rand() < transfer_rate:
+            student.transfer = True
+            transfers_by_grade.setdefault(student.grade, []).append(student)
+
+    # pick the new schools, remembering the old school's adjustment for the capability adjustment
+    old_adjustments = {}
+    for grade, transfers in transfers_by_grade.items():
+        for student, school in zip(transfers, random.choices(schools_by_grade[grade], k=len(transfers))):
+            old_adjustments[id(student)] = student.school.type_config.adjust_pld
+            student.school = school
+
+    # changes in the student situation may change their capability:
+    #  - for a transfer, undo the old school adjustment and apply the new school adjustment
+    #  - SmarterBalanced wants to see students get better so apply a small adjustment each time they advance
+    # adjustments are gamma corrections so they can be combined into a single exponent
+    exponents = {}
+    advanced = [student for student in remaining if not student.held_back]
+    keys = [(old_adjustments[id(student)], student.school.type_config.adjust_pld) if student.transfer else None
+            for student in advanced]
+    for key in keys:
+        if key not in exponents:
+            adjustments = [0.1] if key is None else [inverse_adjustment(key[0]), key[1], 0.1]
+            exponents[key] = capability.combine_adjustments(adjustments)
+    capability.ENGINE.adjust(advanced, [exponents[key] for key in keys])
+
+    return remaining
 
 
 def determine_demo_option_selected(sub_config):
@@ -231,53 +273,72 @@ def determine_demo_option_selected(sub_config):
     return False
 
 
+def determine_demo_options_selected(sub_config, n):
+    """Decide if a boolean characteristic is selected (is true), for a batch.
+
+    :param sub_config: A dictionary for a single boolean characteristic
+    :param n: The number of values to decide
+    :returns: List of whether the characteristic is selected
+    """
+    perc = sub_config['perc']
+    return [random.random() < perc for _ in range(n)]
+
+
 def _determine_student_dob(grade, acad_year=datetime.datetime.now().year):
     """Generates an appropriate date of birth given the student's current grade
 
     :param grade: The current grade of the student
     :param acad_year: The current academic year this student is being created for (optional, defaults to your machine
                       clock's current year)
-    :return: A string representation of the student's date of birth
+    :return: The student's date of birth
+    """
+    return _determine_student_dobs(grade, acad_year, 1)[0]
+
+
+def _determine_student_dobs(grade, acad_year, n):
+    """Generates dates of birth for a batch of students in a grade
+
+    :param grade: The current grade of the students
+    :param acad_year: The current academic year the students are being created for
+    :param n: The number of students
+    :return: list of dates of birth
     """
     approx_age = grade + 6
     birth_year = acad_year - approx_age
 
-    if calendar.isleap(birth_year):
-        bday_offset = random.randint(0, 365)
-    else:
-        bday_offset = random.randint(0, 364)
-
-    # construct a birth date as an offset from January 1st
-    return datetime.date(birth_year, 1, 1) + datetime.timedelta(days=bday_offset)
+    # birth dates are offsets from January 1st
+    days = 366 if calendar.isleap(birth_year) else 365
+    return DATES.random_dates(DATES.ordinal(birth_year), 0, days - 1, n)
 
 
-def _determine_demographics(config):
-    """Determine the demographic characteristics for a student based on the configuration dictionary.
+def _determine_demographics(config, n):
+    """Determine the demographic characteristics for a batch of students based on the configuration dictionary.
 
     :param config: Demographics configuration dictionary to use
-    :returns: A tuple of characteristics
+    :param n: The number of students
+    :returns: A tuple of lists of characteristics
     """
     # Determine characteristics
-    gender = _pick_demo_option(config['gender'])
-    ethnicity = _pick_demo_option(config['ethnicity'])
-    iep = determine_demo_option_selected(config['iep'])
-    sec504 = determine_demo_option_selected(config['504'])
-    lep = determine_demo_option_selected(config['lep'])
-    ed = determine_demo_option_selected(config['econ_dis'])
-
-    # Pick more ethnicities if needed
-    if ethnicity == 'multi':
-        eth1 = 'multi'
-        eth2 = 'multi'
-        while eth1 == 'multi' or eth2 == 'multi':
-            eth1 = _pick_demo_option(config['ethnicity']) if eth1 == 'multi' else eth1
-            eth2 = _pick_demo_option(config['ethnicity']) if eth2 == 'multi' else eth2
-        ethnicities = ['multi', eth1, eth2]
+    genders = _pick_demo_options(config['gender'], n)
+    ethnicities = _pick_demo_options(config['ethnicity'], n)
+    ieps = determine_demo_options_selected(config['iep'], n)
+    sec504s = determine_demo_options_selected(config['504'], n)
+    leps = determine_demo_options_selected(config['lep'], n)
+    eds = determine_demo_options_selected(config['econ_dis'], n)
+
+    # Pick two more (non-multi) ethnicities for multi-ethnic students
+    multi = ethnicities.count('multi')
+    if multi:
+        others = SAMPLERS.get(config['ethnicity'], lambda: {name: obj['perc'] for name, obj in
+                                                            config['ethnicity'].items() if name != 'multi'},
+                              'not multi').sample(2 * multi)
+        ethnicities = [['multi', others.pop(), others.pop()] if ethnicity == 'multi' else [ethnicity]
+                       for ethnicity in ethnicities]
     else:
-        ethnicities = [ethnicity]
+        ethnicities = [[ethnicity] for ethnicity in ethnicities]
 
     # Return the characteristics
-    return gender, ethnicities, iep, sec504, lep, ed
+    return genders, ethnicities, ieps, sec504s, leps, eds
 
 
 def _pick_demo_option(sub_config):
@@ -286,23 +347,80 @@ def _pick_demo_option(sub_config):
     :param sub_config: A dictionary for a single multi-select characteristic
     :returns: Selected value for characteristic
     """
-    return weighted_choice({name: obj['perc'] for name, obj in sub_config.items()})
+    return _demo_option_sampler(sub_config).choose()
+
 
+def _pick_demo_options(sub_config, n):
+    """Pick a demographic characteristic from a dict of options, for a batch.
 
-def _get_level_demographics(student: Student, subject_code):
+    :param sub_config: A dictionary for a single multi-select characteristic
+    :param n: The number of values to pick
+    :returns: List of selected values for characteristic
+    """
+    return _demo_option_sampler(sub_config).sample(n)
+
+
+def _demo_option_sampler(sub_config):
+    """Get the (compiled once) sampler for a multi-select characteristic.
+
+    :param sub_config: A dictionary for a single multi-select characteristic
+    :returns: WeightedChooser
     """
-    Creates the assessment stats generator and corresponding student demographics.
-    They can be used to make calls in RandomLevelByDemographics like random_level and distribution
+    return SAMPLERS.get(sub_config, lambda: {name: obj['perc'] for name, obj in sub_config.items()})
+
+
+def _set_ethnicities(student: Student, ethnicities: [str]):
+    """Set the ethnicity flags of a student.
 
     :param student: student
+    :param ethnicities: list of ethnicities
+    """
+    if 'amer_ind' in ethnicities:
+        student.eth_amer_ind = True
+    if 'black' in ethnicities:
+        student.eth_black = True
+    if 'hispanic' in ethnicities:
+        student.eth_hispanic = True
+    if 'asian' in ethnicities:
+        student.eth_asian = True
+    if 'filipino' in ethnicities:
+        student.eth_filipino = True
+    if 'pac_isl' in ethnicities:
+        student.eth_pacific = True
+    if 'white' in ethnicities:
+        student.eth_white = True
+    if 'multi' in ethnicities:
+        student.eth_multi = True
+    if 'none' in ethnicities:
+        student.eth_none = True
+
+
+def _get_level_generator(grade, subject_code):
+    """
+    Get the assessment stats generator for a grade and subject.
+    Generators are created once (per grade and subject group) so their distributions are computed only once.
+
+    :param grade: grade
     :param subject_code: subject code
-    :return: RandomLevelByDemographics and student properties
+    :return: RandomLevelByDemographics
     """
-    demographics = cfg.DEMOGRAPHICS_BY_GRADE[student.grade]
     # hack for custom subjects
-    level_breakdowns = cfg.LEVELS_BY_GRADE_BY_SUBJ['ELA' if get_el_adjacent(subject_code) else 'Math'][student.grade]
-    level_generator = RandomLevelByDemographics(demographics, level_breakdowns)
+    level_subject = 'ELA' if get_el_adjacent(subject_code) else 'Math'
+    key = (grade, level_subject)
+    if key not in _LEVEL_GENERATORS:
+        demographics = cfg.DEMOGRAPHICS_BY_GRADE[grade]
+        level_breakdowns = cfg.LEVELS_BY_GRADE_BY_SUBJ[level_subject][grade]
+        _LEVEL_GENERATORS[key] = RandomLevelByDemographics(demographics, level_breakdowns)
+    return _LEVEL_GENERATORS[key]
+
 
+def _get_student_demographics(student: Student):
+    """
+    Get the student demographics used by the assessment stats generator.
+
+    :param student: student
+    :return: student properties
+    """
     student_race = ('dmg_eth_2mr' if student.eth_multi else
                     'dmg_eth_ami' if student.eth_amer_ind else
                     'dmg_eth_asn' if student.eth_asian else
@@ -313,14 +431,12 @@ def _get_level_demographics(student: Student, subject_code):
                     'dmg_eth_wht' if student.eth_white else
                     'dmg_eth_nst')
 
-    student_demographics = Properties(dmg_prg_504=student.prg_sec504,
-                                      dmg_prg_tt1=student.prg_econ_disad,
-                                      dmg_prg_iep=student.prg_iep,
-                                      dmg_prg_lep=student.prg_lep,
-                                      gender=student.gender,
-                                      race=student_race)
-
-    return level_generator, student_demographics
+    return Properties(dmg_prg_504=student.prg_sec504,
+                      dmg_prg_tt1=student.prg_econ_disad,
+                      dmg_prg_iep=student.prg_iep,
+                      dmg_prg_lep=student.prg_lep,
+                      gender=student.gender,
+                      race=student_race)
 
 
 def repopulate_school_grade(school: School, grade, grade_students, id_gen, reg_sys,
@@ -350,10 +466,12 @@ def repopulate_school_grade(school: School, grade, grade_students, id_gen, reg_s
     student_count = student_count + random.choice(additional_student_choice)
 
     # Re-fill grade to this new student count
-    while len(grade_students) < student_count:
-        s = generate_student(school, grade, id_gen, acad_year, subject_codes)
-        s.reg_sys = reg_sys
-        grade_students.append(s)
+    if len(grade_students) < student_count:
+        students = generate_students(school, grade, student_count - len(grade_students), id_gen, acad_year,
+                                     subject_codes)
+        for s in students:
+            s.reg_sys = reg_sys
+        grade_students.extend(students)
 
 
 def assign_student_groups(school, grade, grade_students, id_gen: IDGen, subject_codes: [str]):
@@ -370,18 +488,18 @@ def assign_student_groups(school, grade, grade_students, id_gen: IDGen, subject_
     @param id_gen: The IDGen instance, used to make groups unique across multiple schools
     @param subject_codes: The list of subject codes
     """
+    if not grade_students or not subject_codes:
+        return
     num_groups = int(ceil(len(grade_students) / school.group_size))
-    for subject_code in subject_codes:
-        # generate lists of subgroups for each subject corresponding to school's group size
-        subgroups = []
-        for _ in range(num_groups):
-            group_id = id_gen.get_group_id('group')
-            group_name = 'G' + str(grade) + '-' + str(group_id)
-            subgroups.append((group_id, group_name))
+    # reserve the group ids for all subjects at once, num_groups per subject
+    group_ids = id_gen.get_group_ids('group', num_groups * len(subject_codes))
+    for i, subject_code in enumerate(subject_codes):
+        # one group object per group, shared by the students assigned to it
+        subgroups = [StudentGroup(subject_code, group_id, 'G' + str(grade) + '-' + str(group_id))
+                     for group_id in group_ids[i * num_groups:(i + 1) * num_groups]]
         # assign each student a (randomly selected) group for this subject
-        for grade_student in grade_students:
-            (group_id, group_name) = random.choice(subgroups)
-            grade_student.set_group(StudentGroup(subject_code, group_id, group_name))
+        for grade_student, group in zip(grade_students, random.choices(subgroups, k=len(grade_students))):
+            grade_student.groups[subject_code] = group
 
 
 def _generate_date_enter_us_school(grade, acad_year=datetime.datetime.now().year):
@@ -394,10 +512,27 @@ def _generate_date_enter_us_school(grade, acad_year=datetime.datetime.now().year
                       current year)
     @return: a date object that represents the student's entry date
     """
-    entry_year = acad_year - grade - 1
-    entry_month = random.randint(8, 9)
-    entry_day = random.randint(15, 31) if entry_month == 8 else random.randint(1, 15)
-    return datetime.date(entry_year, entry_month, entry_day)
+    return _generate_dates_enter_us_school(grade, acad_year, 1)[0]
+
+
+def _generate_dates_enter_us_school(grade, acad_year, n):
+    """
+    Generates dates of when a batch of students would have entered a US school, see _generate_date_enter_us_school.
+
+    @param grade: the current grade of the students
+    @param acad_year: The current academic year to use to create the dates
+    @param n: The number of students
+    @return: list of dates
+    """
+    return [_late_summer_date(acad_year - grade - 1) for _ in range(n)]
+
+
+def _late_summer_date(year):
+    """
+    @return: a date from Aug 15 to Sep 15; August or September are equally likely (as picking a month then a day)
+    """
+    offset = random.randint(0, 16) if random.random() < 0.5 else 17 + random.randint(0, 14)
+    return DATES.date(DATES.ordinal(year, 8, 15) + offset)
 
 
 def _generate_derived_demographic(student):
@@ -490,9 +625,7 @@ def _generate_date_lep_entry(grade, acad_year=datetime.datetime.now().year):
     @return: a date object that represents the student's entry date
     """
     entry_year = acad_year - (grade if grade < 5 else random.randint(4, grade))
-    entry_month = random.randint(8, 9)
-    entry_day = random.randint(15, 31) if entry_month == 8 else random.randint(1, 15)
-    return datetime.date(entry_year, entry_month, entry_day)
+    return _late_summer_date(entry_year)
 
 
 def _generate_date_lep_exit(grade, acad_year=datetime.datetime.now().year):
@@ -505,14 +638,4 @@ def _generate_date_lep_exit(grade, acad_year=datetime.datetime.now().year):
     @return: a date object that represents the student's exit date
     """
     entry_year = acad_year - (3 if grade > 3 else 1)
-    entry_month = random.randint(3, 6)
-    entry_day = random.randint(1, 30)
-    return datetime.date(entry_year, entry_month, entry_day)
-
-
-def _apply_capability_adjustments(student: Student, adjustments: [float]):
-    for subject_code, capability in student.capability.items():
-        value = capability
-        for adj in adjustments:
-            value = adjust_capability(value, adj)
-        student.capability[subject_code] = value
+    return DATES.date(DATES.ordinal(entry_year, random.randint(3, 6)) + random.randint(0, 29))
@@ -14,8 +14,8 @@ from datagen.model.assessmentoutcome import AssessmentOutcome
 from datagen.model.score import Score
 from datagen.model.student import Student
 from datagen.model.targetscore import TargetScore
-from datagen.util.assessment_stats import random_subscores, performance_level, even_cuts
-from datagen.util.assessment_stats import random_stderr, claim_perf_lvl, score_given_capability
+from datagen.util.assessment_stats import random_subscores_batch, performance_level, even_cuts
+from datagen.util.assessment_stats import random_stderrs, claim_perf_lvl, scores_given_capabilities
 from datagen.util.id_gen import IDGen
 
 
@@ -47,38 +47,81 @@ def create_assessment_outcome_object(date_taken: datetime.date,
     @param gen_item: If should generate item-level data
     @returns: Array of outcomes
     """
+    create_assessment_outcome_objects(date_taken, [student], asmt, id_gen, assessment_results,
+                                      skip_rate, retake_rate, delete_rate, update_rate, gen_item)
+
+
+def create_assessment_outcome_objects(date_taken: datetime.date,
+                                      students: [Student],
+                                      asmt: Assessment,
+                                      id_gen: IDGen,
+                                      assessment_results: {str: AssessmentOutcome},
+                                      skip_rate=cfg.ASMT_SKIP_RATE,
+                                      retake_rate=cfg.ASMT_RETAKE_RATE,
+                                      delete_rate=cfg.ASMT_DELETE_RATE,
+                                      update_rate=cfg.ASMT_UPDATE_RATE,
+                                      gen_item=True):
+    """
+    Create the outcome(s) for a single assessment for a batch of students.
+    See create_assessment_outcome_object for details, the outcomes for a student are kept together.
+
+    @param date_taken: date taken
+    @param students: The students to create outcomes for
+    @param asmt: The assessment to create outcomes for
+    @param id_gen: ID generator
+    @param assessment_results: Dictionary of assessment results to update
+    @param skip_rate: The rate (chance) that a student skips the assessment
+    @param retake_rate: The rate (chance) that a student will re-take the assessment
+    @param delete_rate: The rate (chance) that a student's result will be deleted
+    @param update_rate: The rate (chance) that a student's result will be updated (deleted and re-added)
+    @param gen_item: If should generate item-level data
+    """
     # Make sure they are taking the assessment
-    if random.random() < skip_rate:
+    students = [student for student in students if random.random() >= skip_rate]
+    if not students:
         return
 
     # Make sure the assessment is known in the results
     if asmt.guid not in assessment_results:
         assessment_results[asmt.guid] = []
 
-    # Create the original outcome object
-    ao = generate_assessment_outcome(date_taken, student, asmt, id_gen, gen_item=gen_item)
-    assessment_results[asmt.guid].append(ao)
+    # Create the original outcome objects
+    outcomes = generate_assessment_outcomes(date_taken, students, asmt, id_gen, gen_item=gen_item)
 
     # Decide if something special is happening
-    special_random = random.random()
-    if special_random < retake_rate:
-        # Set the original outcome object to inactive, create a new outcome (with an advanced date take), and return
-        ao.result_status = cfg.ASMT_STATUS_INACTIVE
-        ao2 = generate_assessment_outcome(
-            date_taken + datetime.timedelta(days=7), student, asmt, id_gen, gen_item=gen_item)
-        assessment_results[asmt.guid].append(ao2)
-    elif special_random < update_rate:
-        # Set the original outcome object to deleted and create a new outcome
-        ao.result_status = cfg.ASMT_STATUS_DELETED
-        ao2 = generate_assessment_outcome(date_taken, student, asmt, id_gen, gen_item=gen_item)
-        assessment_results[asmt.guid].append(ao2)
-
-        # See if the updated record should be deleted
-        if random.random() < delete_rate:
-            ao2.result_status = cfg.ASMT_STATUS_DELETED
-    elif special_random < delete_rate:
-        # Set the original outcome object to deleted
-        ao.result_status = cfg.ASMT_STATUS_DELETED
+    retakes = []
+    updates = []
+    for i, ao in enumerate(outcomes):
+        special_random = random.random()
+        if special_random < retake_rate:
+            # Set the original outcome object to inactive, create a new outcome (with an advanced date take)
+            ao.result_status = cfg.ASMT_STATUS_INACTIVE
+            retakes.append(i)
+        elif special_random < update_rate:
+            # Set the original outcome object to deleted and create a new outcome
+            ao.result_status = cfg.ASMT_STATUS_DELETED
+            updates.append(i)
+        elif special_random < delete_rate:
+            # Set the original outcome object to deleted
+            ao.result_status = cfg.ASMT_STATUS_DELETED
+
+    second_outcomes = {}
+    if retakes:
+        second_outcomes.update(zip(retakes, generate_assessment_outcomes(
+            date_taken + datetime.timedelta(days=7), [students[i] for i in retakes], asmt, id_gen, gen_item=gen_item)))
+    if updates:
+        for i, ao2 in zip(updates, generate_assessment_outcomes(
+                date_taken, [students[i] for i in updates], asmt, id_gen, gen_item=gen_item)):
+            # See if the updated record should be deleted
+            if random.random() < delete_rate:
+                ao2.result_status = cfg.ASMT_STATUS_DELETED
+            second_outcomes[i] = ao2
+
+    results = assessment_results[asmt.guid]
+    for i, ao in enumerate(outcomes):
+        results.append(ao)
+        if i in second_outcomes:
+            results.append(second_outcomes[i])
 
 
 def generate_assessment_outcome(date_taken: datetime.date,
@@ -96,64 +139,90 @@ def generate_assessment_outcome(date_taken: datetime.date,
     @param gen_item: If should create item-level responses
     @returns: The assessment outcome
     """
+    return generate_assessment_outcomes(date_taken, [student], assessment, id_gen, gen_item)[0]
 
-    # Run the General generator
-    sao = gen_asmt_generator.generate_assessment_outcome(student, assessment, id_gen)
-
-    # Set other specifics
-    sao.school = student.school
-    sao.admin_condition = 'Valid' if assessment.is_summative() else 'SD'
-    sao.date_taken = date_taken
-    gen_asmt_generator.generate_session(sao)
-
-    # Generate assessment outcome Item-level data
-    if gen_item:
-        gen_asmt_generator.generate_item_data(sao)
 
-    # set timestamps for the opportunity
-    gen_asmt_generator.set_opportunity_dates(sao)
+def generate_assessment_outcomes(date_taken: datetime.date,
+                                 students: [Student],
+                                 assessment: Assessment,
+                                 id_gen,
+                                 gen_item=True):
+    """
+    Generate assessment outcomes for a batch of students.
+    The scores are generated for the whole batch at once.
 
-    # use the student capability to generate an overall score and performance level
-    overall = Score('Overall')
-    overall.score, overall.perf_lvl = \
-        score_given_capability(student.capability[assessment.subject.code], assessment.overall.get_cuts())
-    overall.stderr = random_stderr(overall.score, assessment.overall.score_min, assessment.overall.score_max) if assessment.subject.emit_overall_stderr else None
-    sao.overall = overall
+    @param date_taken: date taken
+    @param students: The students to create the outcomes for
+    @param assessment: The assessment to create the outcomes for
+    @param id_gen: ID generator
+    @param gen_item: If should create item-level responses
+    @returns: The assessment outcomes, in the same order as the students
+    """
+    outcomes = []
+    for student in students:
+        # Run the General generator
+        sao = gen_asmt_generator.generate_assessment_outcome(student, assessment, id_gen)
+
+        # Set other specifics
+        sao.school = student.school
+        sao.admin_condition = 'Valid' if assessment.is_summative() else 'SD'
+        sao.date_taken = date_taken
+        gen_asmt_generator.generate_session(sao)
+
+        # Generate assessment outcome Item-level data
+        if gen_item:
+            gen_asmt_generator.generate_item_data(sao)
+
+        # set timestamps for the opportunity
+        gen_asmt_generator.set_opportunity_dates(sao)
+
+        outcomes.append(sao)
+
+    # use the student capabilities to generate overall scores and performance levels
+    score_min = assessment.overall.score_min
+    score_max = assessment.overall.score_max
+    capabilities = [student.capability[assessment.subject.code] for student in students]
+    scores, levels = scores_given_capabilities(capabilities, assessment.overall.get_cuts())
+    stderrs = random_stderrs(scores, score_min, score_max) if assessment.subject.emit_overall_stderr \
+        else [None] * len(scores)
+    for sao, score, stderr, level in zip(outcomes, scores, stderrs, levels):
+        sao.overall = Score('Overall', score, stderr, level)
 
     # generate alt scores if indicated
     # note that we're using the overall min/max scores; some day we should use alt-specific values
     if assessment.alts and len(assessment.alts) > 0:
-        sao.alt_scores = []
         alt_weights = [alt_def.weight for alt_def in assessment.alts]
-        alt_scores = random_subscores(overall.score, alt_weights, assessment.overall.score_min, assessment.overall.score_max)
-        for alt, alt_score in zip(assessment.alts, alt_scores):
-            sao.alt_scores.append(
-                Score(alt.code, alt_score,
-                      random_stderr(alt_score, assessment.overall.score_min, assessment.overall.score_max),
-                      performance_level(alt_score, alt.get_cuts())))
+        alt_scores = random_subscores_batch(scores, alt_weights, score_min, score_max)
+        alt_stderrs = random_stderrs([alt_score for row in alt_scores for alt_score in row], score_min, score_max)
+        alt_cuts = [alt.get_cuts() for alt in assessment.alts]
+        for i, sao in enumerate(outcomes):
+            row_stderrs = alt_stderrs[i * len(alt_weights):(i + 1) * len(alt_weights)]
+            sao.alt_scores = [Score(alt.code, alt_score, stderr, performance_level(alt_score, cuts))
+                              for alt, alt_score, stderr, cuts in
+                              zip(assessment.alts, alt_scores[i], row_stderrs, alt_cuts)]
 
     # generate claim scores if indicated
     if assessment.claims and len(assessment.claims) > 0:
         # use the overall min/max score for claims (since we don't have any other values to use)
-        min_score = assessment.overall.score_min
-        max_score = assessment.overall.score_max
-
         claim_weights = [claim_def.weight for claim_def in assessment.claims]
-        claim_scores = random_subscores(overall.score, claim_weights, min_score, max_score)
+        claim_scores = random_subscores_batch(scores, claim_weights, score_min, score_max)
+        claim_stderrs = random_stderrs([claim_score for row in claim_scores for claim_score in row],
+                                       score_min, score_max)
 
         # non-SB claims need cut-points to calculate their level; we don't have information on
         # that so just assume an even distribution between min/max values.
         # We need to get the number of claim performance levels from the subject definition.
-        levels = assessment.subject.types[assessment.type].claim_scoring.perf_levels
-        claim_cuts = even_cuts(min_score, max_score, levels)
-
-        sao.claim_scores = []
-        for claim, claim_score in zip(assessment.claims, claim_scores):
-            stderr = random_stderr(claim_score, min_score, max_score)
-            claim_level = claim_perf_lvl(claim_score, stderr, assessment.overall.cut_points[1]) \
-                if assessment.subject.sbac_claim_levels else performance_level(claim_score, claim_cuts)
-            sao.claim_scores.append(Score(claim.code, claim_score, stderr, claim_level)
-                if assessment.subject.emit_claim_score else Score(claim.code, None, None, claim_level))
+        claim_levels = assessment.subject.types[assessment.type].claim_scoring.perf_levels
+        claim_cuts = even_cuts(score_min, score_max, claim_levels)
+
+        for i, sao in enumerate(outcomes):
+            sao.claim_scores = []
+            row_stderrs = claim_stderrs[i * len(claim_weights):(i + 1) * len(claim_weights)]
+            for claim, claim_score, stderr in zip(assessment.claims, claim_scores[i], row_stderrs):
+                claim_level = claim_perf_lvl(claim_score, stderr, assessment.overall.cut_points[1]) \
+                    if assessment.subject.sbac_claim_levels else performance_level(claim_score, claim_cuts)
+                sao.claim_scores.append(Score(claim.code, claim_score, stderr, claim_level)
+                    if assessment.subject.emit_claim_score else Score(claim.code, None, None, claim_level))
 
     # for summative assessments, if the items have target information, generate target residuals
     # NOTE: these are really fake values, with no real correlation to overall/item scores:
@@ -162,10 +231,9 @@ def generate_assessment_outcome(date_taken: datetime.date,
     if assessment.is_summative() and assessment.item_bank and any(item.target for item in assessment.item_bank):
         # collect the unique targets from all items
         targets = Counter(item.target for item in assessment.item_bank if item.target)
-        offset = (student.capability[assessment.subject.code] - 2.0) / 2.0
-        sao.target_scores = [TargetScore(t, random.uniform(-0.1, +0.1), random.triangular(-1.0, +1.0, offset))
-                             for t in targets.keys()]
-
-    return sao
-
+        for sao, capability in zip(outcomes, capabilities):
+            offset = (capability - 2.0) / 2.0
+            sao.target_scores = [TargetScore(t, random.uniform(-0.1, +0.1), random.triangular(-1.0, +1.0, offset))
+                                 for t in targets.keys()]
 
+    return outcomes
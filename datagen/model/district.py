@@ -13,6 +13,7 @@ class District:
         self.id = None          # unique natural id for district
         self.name = None
         self.state = None
+        self.group = None       # district group, None if the district is directly under the state
         self.type_str = None
         self.config = None
         self.demo_config = None
@@ -0,0 +1,15 @@
+"""
+A group of districts.
+"""
+
+
+class DistrictGroup:
+    """
+    A group of districts, e.g. a county office of education; between the state and its districts.
+    """
+
+    def __init__(self):
+        self.guid = None
+        self.id = None          # unique natural id for the group
+        self.name = None
+        self.state = None
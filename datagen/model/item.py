@@ -4,24 +4,52 @@ Model an assessment item
 """
 
 
-class AssessmentItem:
+class Item:
     """
-    An assessment item
+    Item metadata, which is the same in every assessment the item is in (see ItemRegistry)
     """
 
-    __slots__ = ('bank_key', 'item_key', 'position', 'segment_id', 'type',
-                 'max_score', 'dok', 'difficulty', 'operational', 'answer_key', 'options_count', 'target')
+    __slots__ = ('bank_key', 'item_key', 'type', 'max_score', 'dok', 'difficulty', 'answer_key', 'options_count',
+                 'target')
 
     def __init__(self):
         self.bank_key = None        # e.g. '200'
         self.item_key = None        # e.g. '13958'
-        self.position = None        # 1 - n
-        self.segment_id = None      # should match segment id obviously
         self.type = None            # MC, EQ, MS, ...; aka format
         self.max_score = None       # 1 - n
         self.dok = None             # DoK, 1-4
         self.difficulty = None      # difficulty, -3.0 to 10
-        self.operational = '1'      # '1' if operational, '0' if field test
         self.answer_key = None      # for MC,MS comma-delimited list of answers, e.g. 'A,C'
         self.options_count = 0      # for MC,MS number of answer options; e.g. 4 -> A,B,C,D
         self.target = None          # item target, e.g. '3|G-SRT|A'
+
+
+def _item_field(name: str) -> property:
+    # an AssessmentItem attribute that is the item's; setting it sets the (possibly shared) item's
+    return property(lambda self: getattr(self.item, name), lambda self, value: setattr(self.item, name, value))
+
+
+class AssessmentItem:
+    """
+    An assessment item: an item with its position and segment in the assessment.
+    The item's metadata (bank_key, item_key, type, ...) is read from the item, which may be shared with
+    other assessments; code reading it for every response can read it from item directly.
+    """
+
+    __slots__ = ('item', 'position', 'segment_id', 'operational')
+
+    def __init__(self, item: Item = None):
+        self.item = item if item else Item()    # metadata, shared if the item is registered
+        self.position = None        # 1 - n
+        self.segment_id = None      # should match segment id obviously
+        self.operational = '1'      # '1' if operational, '0' if field test
+
+    bank_key = _item_field('bank_key')
+    item_key = _item_field('item_key')
+    type = _item_field('type')
+    max_score = _item_field('max_score')
+    dok = _item_field('dok')
+    difficulty = _item_field('difficulty')
+    answer_key = _item_field('answer_key')
+    options_count = _item_field('options_count')
+    target = _item_field('target')
@@ -1,6 +1,7 @@
 """
 A school.
 """
+from datagen.util.compiled_config import COMPILED
 
 
 class School:
@@ -17,35 +18,54 @@ class School:
         self.demo_config = None
         self.takes_interim_asmts = False
 
+    @property
+    def config(self):
+        """The school type configuration.
+        """
+        return self._config
+
+    @config.setter
+    def config(self, config):
+        self._config = config
+        self.type_config = COMPILED.school_type(config)            # compiled SchoolType
+
+    @property
+    def demo_config(self):
+        """The demographics configuration, by grade ('0' - '12').
+        """
+        return self._demo_config
+
+    @demo_config.setter
+    def demo_config(self, demo_config):
+        self._demo_config = demo_config
+        self.demographics = COMPILED.demographics(demo_config)     # compiled, indexed by (int) grade
+
     @property
     def grades(self):
         """The grades in the school, ordered low to high.
         """
-        return sorted(self.config['grades'])
+        return self.type_config.grades
 
     @property
     def student_count_min(self):
         """The minimum number of students to have in a grade for this school.
         """
-        return self.config['students']['min']
+        return self.type_config.student_min
 
     @property
     def student_count_max(self):
         """The maximum number of students to have in a grade for this school.
         """
-        return self.config['students']['max']
+        return self.type_config.student_max
 
     @property
     def student_count_avg(self):
         """The average number of students to have in a grade for this school.
         """
-        if 'avg' not in self.config['students']:
-            smin, smax = self.config['students']['min'], self.config['students']['max']
-            self.config['students']['avg'] = ((smax - smin) // 2) + smin
-        return self.config['students']['avg']
+        return self.type_config.student_avg
 
     @property
     def group_size(self):
         """The average group size
         """
-        return self.config['group_size']
+        return self.type_config.group_size
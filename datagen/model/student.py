@@ -57,7 +57,7 @@ class Student:
         self.prg_primary_disability = None
         self.military_connected = None
         self.derived_demographic = None
-        self.groups = []
+        self.groups = {}            # map of subject_code -> student group
         self.capability = {}        # map of subject_code -> capability, 0.0 <= value < 4.0
 
     @property
@@ -87,14 +87,7 @@ class Student:
 
         :param new_group: student group
         """
-        for i, group in enumerate(self.groups):
-            if group.subject_code == new_group.subject_code:
-                self.groups[i] = new_group
-                return
-        self.groups.append(new_group)
+        self.groups[new_group.subject_code] = new_group
 
     def get_group(self, subject_code: str):
-        for group in self.groups:
-            if group.subject_code == subject_code:
-                return group
-        return None
+        return self.groups.get(subject_code)
@@ -0,0 +1,214 @@
+"""
+An output worker that writes outcomes to columnar (Parquet or Arrow IPC) files.
+
+Outcomes, alt scores, claim scores and item responses each get their own table. Tables are partitioned
+by academic year, subject and assessment type, e.g. outcomes/year=2018/subject=Math/type=SUM/part-0.parquet
+so analytics and warehouse loaders can prune partitions. Rows are accumulated in per-partition column
+buffers and flushed as bounded row groups (Parquet) or record batches (Arrow IPC).
+
+pyarrow is required for this worker; it is imported only when columnar output is requested.
+Compression uses the formats' own codecs: Parquet supports gzip, zstd and lz4, Arrow IPC supports zstd and lz4.
+"""
+import os
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from datagen.model.assessmentoutcome import AssessmentOutcome
+from datagen.outputworkers.worker import Worker
+from datagen.util.compression import OutputCompression
+
+OUTCOME_SCHEMA = pa.schema([
+    ('rec_id', pa.int64()),
+    ('guid', pa.string()),
+    ('result_status', pa.string()),
+    ('assessment_id', pa.string()),
+    ('assessment_name', pa.string()),
+    ('grade', pa.int8()),
+    ('state_code', pa.string()),
+    ('district_id', pa.string()),
+    ('school_id', pa.string()),
+    ('student_id', pa.string()),
+    ('student_rec_id', pa.int64()),
+    ('student_grade', pa.int8()),
+    ('session_id', pa.string()),
+    ('admin_condition', pa.string()),
+    ('date_taken', pa.date32()),
+    ('start_date', pa.timestamp('ms')),
+    ('status_date', pa.timestamp('ms')),
+    ('submit_date', pa.timestamp('ms')),
+    ('overall_score', pa.int32()),
+    ('overall_stderr', pa.int32()),
+    ('overall_perf_lvl', pa.int8()),
+])
+
+SCORE_SCHEMA = pa.schema([
+    ('outcome_rec_id', pa.int64()),
+    ('code', pa.string()),
+    ('score', pa.int32()),
+    ('stderr', pa.int32()),
+    ('perf_lvl', pa.int8()),
+])
+
+ITEM_SCHEMA = pa.schema([
+    ('outcome_rec_id', pa.int64()),
+    ('bank_key', pa.string()),
+    ('item_key', pa.string()),
+    ('position', pa.int32()),
+    ('segment_id', pa.string()),
+    ('format', pa.string()),
+    ('operational', pa.string()),
+    ('is_selected', pa.string()),
+    ('score', pa.int32()),
+    ('page_time', pa.int32()),
+    ('admin_date', pa.timestamp('ms')),
+    ('response_date', pa.timestamp('ms')),
+    ('response_value', pa.string()),
+])
+
+
+class ColumnarTable:
+    """
+    A partitioned table: per-partition column buffers with lazily-opened file writers.
+    """
+
+    def __init__(self, root, name, schema: pa.Schema, fmt, batch_size, compression: OutputCompression = None):
+        self.root = root
+        self.name = name
+        self.schema = schema
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.compression = compression
+        self._buffers = {}      # partition -> {column: [values]}
+        self._writers = {}      # partition -> (sink, writer)
+
+    def append(self, partition: tuple, row: tuple):
+        """ Append a row (values in schema order) to the buffer for the partition, flushing if it is full.
+        """
+        buffer = self._buffers.get(partition)
+        if buffer is None:
+            buffer = self._buffers[partition] = [[] for _ in self.schema.names]
+        for column, value in zip(buffer, row):
+            column.append(value)
+        if len(buffer[0]) >= self.batch_size:
+            self._flush(partition)
+
+    def close(self):
+        for partition in list(self._buffers.keys()):
+            self._flush(partition)
+        for sink, writer in self._writers.values():
+            writer.close()
+            if sink is not None:
+                sink.close()
+        self._writers = {}
+
+    def _flush(self, partition):
+        buffer = self._buffers.pop(partition, None)
+        if not buffer or len(buffer[0]) == 0:
+            return
+        batch = pa.RecordBatch.from_arrays([pa.array(column, type=field.type)
+                                            for column, field in zip(buffer, self.schema)], schema=self.schema)
+        if self.fmt == 'parquet':
+            self._writer(partition).write_table(pa.Table.from_batches([batch]), row_group_size=self.batch_size)
+        else:
+            self._writer(partition).write_batch(batch)
+
+    def _writer(self, partition):
+        if partition not in self._writers:
+            year, subject, asmt_type = partition
+            path = os.path.join(self.root, self.name,
+                                'year=' + str(year), 'subject=' + subject, 'type=' + asmt_type)
+            os.makedirs(path, exist_ok=True)
+            if self.fmt == 'parquet':
+                file = os.path.join(path, 'part-0.parquet')
+                self._writers[partition] = (None, pq.ParquetWriter(file, self.schema, **self._parquet_options()))
+            else:
+                file = os.path.join(path, 'part-0.arrow')
+                sink = pa.OSFile(file, 'wb')
+                self._writers[partition] = (sink, ipc.new_file(sink, self.schema, options=self._ipc_options()))
+        return self._writers[partition][1]
+
+    def _parquet_options(self):
+        if not self.compression or not self.compression.codec:
+            return {}
+        return {'compression': self.compression.codec, 'compression_level': self.compression.level}
+
+    def _ipc_options(self):
+        if not self.compression or self.compression.codec not in ('zstd', 'lz4'):
+            return None
+        return ipc.IpcWriteOptions(compression=pa.Codec(self.compression.codec, self.compression.level))
+
+
+class ColumnarWorker(Worker):
+    def __init__(self, out_path_root, fmt='parquet', batch_size=65536, compression: OutputCompression = None):
+        """
+        :param out_path_root: root output folder; tables are written under a 'parquet' or 'arrow' sub-folder
+        :param fmt: 'parquet' or 'arrow' (Arrow IPC file format, memory-mappable)
+        :param batch_size: rows buffered per partition before being written as a row group / record batch
+        :param compression: output compression settings (codec and level are used)
+        """
+        if fmt not in ('parquet', 'arrow'):
+            raise ValueError("Unknown columnar format '{}' (expected 'parquet' or 'arrow')".format(fmt))
+        self.out_path_root = os.path.join(out_path_root, fmt)
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.compression = compression
+        self.outcomes = None
+        self.alt_scores = None
+        self.claim_scores = None
+        self.items = None
+
+    def prepare(self):
+        self.outcomes = ColumnarTable(self.out_path_root, 'outcomes', OUTCOME_SCHEMA, self.fmt,
+                                      self.batch_size, self.compression)
+        self.alt_scores = ColumnarTable(self.out_path_root, 'alt_scores', SCORE_SCHEMA, self.fmt,
+                                        self.batch_size, self.compression)
+        self.claim_scores = ColumnarTable(self.out_path_root, 'claim_scores', SCORE_SCHEMA, self.fmt,
+                                          self.batch_size, self.compression)
+        self.items = ColumnarTable(self.out_path_root, 'items', ITEM_SCHEMA, self.fmt,
+                                   self.batch_size, self.compression)
+
+    def cleanup(self):
+        for table in (self.outcomes, self.alt_scores, self.claim_scores, self.items):
+            if table:
+                table.close()
+
+    def write_iab_outcome(self, results: [AssessmentOutcome], assessment_guid):
+        for result in results:
+            self.write_outcome(result)
+
+    def write_assessment_outcome(self, results: [AssessmentOutcome], assessment_guid, state_code, district_id):
+        for result in results:
+            self.write_outcome(result)
+
+    def write_outcome(self, outcome: AssessmentOutcome):
+        asmt = outcome.assessment
+        student = outcome.student
+        school = outcome.school
+        partition = (asmt.year, asmt.subject.code, asmt.type)
+        overall = outcome.overall
+
+        self.outcomes.append(partition, (
+            outcome.rec_id, outcome.guid, outcome.result_status, asmt.id, asmt.name, asmt.grade,
+            school.district.state.code, school.district.id, school.id,
+            student.id, student.rec_id, student.grade,
+            outcome.session, outcome.admin_condition, outcome.date_taken,
+            outcome.start_date, outcome.status_date, outcome.submit_date,
+            overall.score if overall else None,
+            overall.stderr if overall else None,
+            overall.perf_lvl if overall else None))
+
+        for score in outcome.alt_scores or []:
+            self.alt_scores.append(partition, (outcome.rec_id, score.code, score.score, score.stderr, score.perf_lvl))
+        for score in outcome.claim_scores or []:
+            self.claim_scores.append(partition, (outcome.rec_id, score.code, score.score, score.stderr, score.perf_lvl))
+
+        for item_data in outcome.item_data:
+            item = item_data.item
+            self.items.append(partition, (
+                outcome.rec_id, item.bank_key, item.item_key, item.position, item.segment_id, item.type,
+                item.operational, item_data.is_selected, item_data.score, item_data.page_time,
+                item_data.admin_date, item_data.response_date,
+                # summative results should not have item response included (business policy)
+                None if asmt.is_summative() else item_data.response_value))
@@ -0,0 +1,252 @@
+"""
+An output worker that writes flat files (CSV or TSV) suitable for bulk database loads,
+e.g. PostgreSQL COPY or MySQL LOAD DATA.
+
+Each table is written to a series of files, e.g. ASMT_OUTCOME_0001.csv, ASMT_OUTCOME_0002.csv, ...
+A new file is started once the current one exceeds the configured (uncompressed) size. Next to every data file
+a JSON manifest (same base name) describes the table, columns, format and row count; that pairing
+is what scripts/submit_lz.sh expects.
+
+Rows are formatted into an in-memory buffer and written in large chunks. Null values are written
+as empty (unquoted) fields for CSV and as \\N for TSV, booleans are written as 1/0.
+"""
+import csv
+import io
+import json
+import os
+
+from datagen.model.assessmentoutcome import AssessmentOutcome
+from datagen.model.student import Student
+from datagen.outputworkers.worker import Worker
+from datagen.util.compression import OutputCompression
+from datagen.util.dates import DATES
+
+OUTCOME_COLUMNS = [
+    'rec_id', 'guid', 'result_status', 'assessment_guid', 'assessment_id', 'assessment_name', 'subject', 'type',
+    'academic_year', 'grade', 'state_code', 'district_id', 'school_id', 'student_id', 'student_rec_id',
+    'student_grade', 'session_id', 'admin_condition', 'date_taken', 'start_date', 'status_date', 'submit_date',
+    'overall_score', 'overall_stderr', 'overall_perf_lvl'
+]
+
+SCORE_COLUMNS = ['outcome_rec_id', 'code', 'score', 'stderr', 'perf_lvl']
+
+ITEM_COLUMNS = [
+    'outcome_rec_id', 'bank_key', 'item_key', 'position', 'segment_id', 'format', 'operational', 'is_selected',
+    'score', 'page_time', 'admin_date', 'response_date', 'response_value'
+]
+
+STUDENT_COLUMNS = [
+    'student_id', 'rec_id', 'guid', 'external_ssid', 'state_code', 'district_id', 'school_id', 'grade',
+    'first_name', 'middle_name', 'last_name', 'gender', 'birthdate',
+    'eth_hispanic', 'eth_amer_ind', 'eth_asian', 'eth_filipino', 'eth_black', 'eth_white', 'eth_pacific',
+    'eth_multi', 'prg_iep', 'prg_sec504', 'prg_lep', 'prg_econ_disad', 'prg_migrant',
+    'lang_code', 'elas', 'elas_start_date', 'military_connected'
+]
+
+REGISTRATION_COLUMNS = ['registration_guid', 'academic_year', 'student_id', 'state_code', 'district_id',
+                        'school_id', 'grade']
+
+
+class _TsvWriter:
+    """ A csv.writer work-alike for PostgreSQL text format: tab delimited, backslash escaped, \\N for null.
+    """
+    _ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def writerow(self, row):
+        self.buffer.write('\t'.join('\\N' if value is None else value.translate(self._ESCAPES) for value in row))
+        self.buffer.write('\n')
+
+
+class RotatingFlatFile:
+    """
+    A buffered writer for one table, rotating to a new file (with manifest) when the size limit is reached.
+    """
+
+    def __init__(self, out_path_root, name, columns, fmt='csv', max_file_size=256 * 1024 * 1024,
+                 buffer_size=4 * 1024 * 1024, compression: OutputCompression = None):
+        self.out_path_root = out_path_root
+        self.name = name
+        self.columns = columns
+        self.fmt = fmt
+        self.max_file_size = max_file_size
+        self.buffer_size = buffer_size
+        self.compression = compression if compression else OutputCompression()
+        self.part = 0
+        self._file = None
+        self._file_name = None
+        self._file_rows = 0
+        self._file_bytes = 0
+        self._buffer = io.StringIO()
+        self._buffer_rows = 0
+        self._writer = self._new_writer(self._buffer)
+
+    def writerow(self, values):
+        self._writer.writerow([_format(value, self.fmt) for value in values])
+        self._buffer_rows += 1
+        if self._buffer.tell() >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer_rows == 0:
+            return
+        if not self._file:
+            self._open()
+        data = self._buffer.getvalue().encode('utf-8')
+        self._file.write(data)
+        self._file_bytes += len(data)
+        self._file_rows += self._buffer_rows
+        self._buffer = io.StringIO()
+        self._buffer_rows = 0
+        self._writer = self._new_writer(self._buffer)
+        if self._file_bytes >= self.max_file_size:
+            self._close_file()
+
+    def close(self):
+        self.flush()
+        self._close_file()
+
+    def _new_writer(self, buffer):
+        if self.fmt == 'tsv':
+            return _TsvWriter(buffer)
+        return csv.writer(buffer, lineterminator='\n')
+
+    def _open(self):
+        self.part += 1
+        self._file_name = '{}_{:04}.{}'.format(self.name, self.part, self.fmt)
+        self._file = self.compression.open(os.path.join(self.out_path_root, self._file_name))
+        header = io.StringIO()
+        self._new_writer(header).writerow(self.columns)
+        data = header.getvalue().encode('utf-8')
+        self._file.write(data)
+        self._file_bytes = len(data)
+        self._file_rows = 0
+
+    def _close_file(self):
+        if not self._file:
+            return
+        self._file.close()
+        self._file = None
+        self._write_manifest()
+
+    def _write_manifest(self):
+        base, _ = os.path.splitext(self._file_name)
+        manifest = {
+            'table': self.name,
+            'file': self.compression.path(self._file_name),
+            'format': self.fmt,
+            'compression': self.compression.codec,
+            'delimiter': '\t' if self.fmt == 'tsv' else ',',
+            'header': True,
+            'null': '\\N' if self.fmt == 'tsv' else '',
+            'encoding': 'UTF-8',
+            'columns': self.columns,
+            'rows': self._file_rows,
+            'bytes': self._file_bytes
+        }
+        with open(os.path.join(self.out_path_root, base + '.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+
+def _format(value, fmt):
+    if value is None:
+        return None if fmt == 'tsv' else ''
+    if value is True:
+        return '1'
+    if value is False:
+        return '0'
+    return str(value)
+
+
+class CsvWorker(Worker):
+    def __init__(self, out_path_root, fmt='csv', max_file_size=256 * 1024 * 1024, buffer_size=4 * 1024 * 1024,
+                 compression: OutputCompression = None):
+        """
+        :param out_path_root: folder the files are written to
+        :param fmt: 'csv' or 'tsv'
+        :param max_file_size: approximate (uncompressed) file size in bytes at which a new file is started
+        :param buffer_size: approximate size (chars) of the in-memory buffer for each table
+        :param compression: output compression, None for uncompressed files
+        """
+        if fmt not in ('csv', 'tsv'):
+            raise ValueError("Unknown flat file format '{}' (expected 'csv' or 'tsv')".format(fmt))
+        self.out_path_root = out_path_root
+        self.fmt = fmt
+        self.max_file_size = max_file_size
+        self.buffer_size = buffer_size
+        self.compression = compression
+        self.tables = {}
+
+    def prepare(self):
+        os.makedirs(self.out_path_root, exist_ok=True)
+        for name, columns in (('ASMT_OUTCOME', OUTCOME_COLUMNS),
+                              ('ASMT_ALT_SCORE', SCORE_COLUMNS),
+                              ('ASMT_CLAIM_SCORE', SCORE_COLUMNS),
+                              ('ASMT_ITEM', ITEM_COLUMNS),
+                              ('STUDENT', STUDENT_COLUMNS),
+                              ('STUDENT_REG', REGISTRATION_COLUMNS)):
+            self.tables[name] = RotatingFlatFile(self.out_path_root, name, columns, self.fmt,
+                                                 self.max_file_size, self.buffer_size, self.compression)
+
+    def cleanup(self):
+        for table in self.tables.values():
+            table.close()
+
+    def write_students_dim(self, students: [Student]):
+        table = self.tables['STUDENT']
+        for s in students:
+            table.writerow((
+                s.id, s.rec_id, s.guid, s.external_ssid, s.school.district.state.code, s.school.district.id,
+                s.school.id, s.grade, s.first_name, s.middle_name, s.last_name, s.gender, DATES.iso(s.dob),
+                s.eth_hispanic, s.eth_amer_ind, s.eth_asian, s.eth_filipino, s.eth_black, s.eth_white,
+                s.eth_pacific, s.eth_multi, s.prg_iep, s.prg_sec504, s.prg_lep, s.prg_econ_disad, s.prg_migrant,
+                s.lang_code, s.elas, DATES.iso(s.elas_start_date), s.military_connected))
+
+    def write_students_reg(self, students: [Student], rs_guid, asmt_year):
+        table = self.tables['STUDENT_REG']
+        for s in students:
+            table.writerow((rs_guid, asmt_year, s.id, s.school.district.state.code, s.school.district.id,
+                            s.school.id, s.grade))
+
+    def write_iab_outcome(self, results: [AssessmentOutcome], assessment_guid):
+        for result in results:
+            self.write_outcome(result)
+
+    def write_assessment_outcome(self, results: [AssessmentOutcome], assessment_guid, state_code, district_id):
+        for result in results:
+            self.write_outcome(result)
+
+    def write_outcome(self, outcome: AssessmentOutcome):
+        asmt = outcome.assessment
+        student = outcome.student
+        school = outcome.school
+        overall = outcome.overall
+
+        self.tables['ASMT_OUTCOME'].writerow((
+            outcome.rec_id, outcome.guid, outcome.result_status, asmt.guid, asmt.id, asmt.name,
+            asmt.subject.code, asmt.type, asmt.year, asmt.grade,
+            school.district.state.code, school.district.id, school.id,
+            student.id, student.rec_id, student.grade, outcome.session, outcome.admin_condition,
+            DATES.iso(outcome.date_taken), outcome.start_date, outcome.status_date, outcome.submit_date,
+            overall.score if overall else None,
+            overall.stderr if overall else None,
+            overall.perf_lvl if overall else None))
+
+        for score in outcome.alt_scores or []:
+            self.tables['ASMT_ALT_SCORE'].writerow(
+                (outcome.rec_id, score.code, score.score, score.stderr, score.perf_lvl))
+        for score in outcome.claim_scores or []:
+            self.tables['ASMT_CLAIM_SCORE'].writerow(
+                (outcome.rec_id, score.code, score.score, score.stderr, score.perf_lvl))
+
+        items = self.tables['ASMT_ITEM']
+        for item_data in outcome.item_data:
+            item = item_data.item
+            items.writerow((
+                outcome.rec_id, item.bank_key, item.item_key, item.position, item.segment_id, item.type,
+                item.operational, item_data.is_selected, item_data.score, item_data.page_time,
+                item_data.admin_date, item_data.response_date,
+                # summative results should not have item response included (business policy)
+                None if asmt.is_summative() else item_data.response_value))
@@ -0,0 +1,96 @@
+"""
+An output worker that submits TRT outcomes directly to the RDW import service, so data can be
+generated and loaded in one pass without writing (and then reading) millions of XML files.
+
+Submissions run on a thread pool; the number of queued outcomes is bounded so generation is
+throttled to the rate the import service accepts them. The result of every submission is
+appended (as a line of JSON, similar to scripts/submit_xml.sh output) to the result log.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from datagen.model.assessmentoutcome import AssessmentOutcome
+from datagen.model.institutionhierarchy import InstitutionHierarchy
+from datagen.outputworkers.xml_worker import XmlWorker
+from datagen.util.import_client import ImportClient, ImportResult
+
+
+class HttpWorker(XmlWorker):
+    def __init__(self, client: ImportClient, concurrency: int = 8, result_log: str = None):
+        """
+        :param client: import service client, should have a pool at least as big as the concurrency
+        :param concurrency: max number of concurrent submissions
+        :param result_log: file to which submission results are appended, None for no log
+        """
+        super().__init__(None)
+        self.client = client
+        self.concurrency = concurrency
+        self.result_log = result_log
+        self.submitted = 0
+        self.failed = 0
+        self._executor = None
+        self._pending = threading.BoundedSemaphore(concurrency * 4)
+        self._lock = threading.Lock()
+        self._log = None
+        self._start = None
+
+    def prepare(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='http-worker')
+        if self.result_log:
+            self._log = open(self.result_log, 'a')
+        self._start = time.perf_counter()
+
+    def cleanup(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.client.close()
+        if self._log:
+            self._log.close()
+            self._log = None
+        if self._start is not None:
+            elapsed = time.perf_counter() - self._start
+            print('Submitted {} outcomes ({} failed) in {:.1f}s, {:.1f}/s'.format(
+                self.submitted, self.failed, elapsed, self.submitted / elapsed if elapsed else 0))
+
+    def write_hierarchies(self, hierarchies: [InstitutionHierarchy]):
+        pass
+
+    def write_assessments(self, asmts):
+        pass
+
+    def write_asmt_to_file(self, outcome: AssessmentOutcome):
+        xml = self.outcome_to_xml(outcome)
+        if not xml:
+            return
+        file = '/'.join((outcome.school.district.state.code, outcome.school.district.id, outcome.school.id,
+                         '{}.xml'.format(outcome.rec_id)))
+        self._pending.acquire()
+        try:
+            self._executor.submit(self._submit, file, xml)
+        except Exception:
+            self._pending.release()
+            raise
+
+    def _submit(self, file, xml):
+        # nobody waits for the future, so anything raised is recorded as a failed submission
+        try:
+            try:
+                result = self.client.submit(file, xml)
+            except Exception as ex:
+                result = ImportResult(file)
+                result.error = '{}: {}'.format(type(ex).__name__, ex)
+            self._record(result)
+        finally:
+            self._pending.release()
+
+    def _record(self, result: ImportResult):
+        with self._lock:
+            self.submitted += 1
+            if not result.ok:
+                self.failed += 1
+            if self._log:
+                self._log.write(json.dumps(result.to_dict()))
+                self._log.write('\n')
@@ -1,66 +1,44 @@
-import json
 import os
-from collections import OrderedDict
 from xml.etree.ElementTree import Element, SubElement, tostring
 
 from datagen.model.assessment import Assessment
 from datagen.model.assessmentoutcome import AssessmentOutcome
 from datagen.model.institutionhierarchy import InstitutionHierarchy
 from datagen.outputworkers.worker import Worker
-from datagen.util.hierarchy import write_hierarchy
+from datagen.util.compression import OutputCompression
+from datagen.util.dates import DATES
+from datagen.util.hierarchy import HierarchyWriter
 from datagen.writers import tabulator_writer
+from datagen.writers.organizations_writer import OrganizationsWriter
 
 
 class XmlWorker(Worker):
-    def __init__(self, out_path_root):
+    def __init__(self, out_path_root, compression: OutputCompression = None):
         self.out_path_root = out_path_root
+        self.compression = compression if compression else OutputCompression()
+        self.hierarchy_writer = None
+        self.organizations_writer = None
 
     def prepare(self):
         pass
 
     def cleanup(self):
-        pass
+        if self.hierarchy_writer:
+            self.hierarchy_writer.close()
+            self.hierarchy_writer = None
+        if self.organizations_writer:
+            self.organizations_writer.close()
+            self.organizations_writer = None
 
     def write_hierarchies(self, hierarchies: [InstitutionHierarchy]):
-        self._write_hierarchies_to_json(hierarchies)
-        write_hierarchy(os.path.join(self.out_path_root, 'hierarchy.csv'), [ih.school for ih in hierarchies])
-
-    def _write_hierarchies_to_json(self, hierarchies: [InstitutionHierarchy]):
-        districts = {}
-        schools = {}
-
-        # because each district is generated individually, we need to read the file to
-        # get previous districts, merge the new ones, then rewrite the file ...
-        file = os.path.join(self.out_path_root, 'organizations.json')
-        if os.path.isfile(file):
-            with open(file, "r") as f:
-                org = json.load(f)
-                if 'districts' in org:
-                    districts = {d['entityId']: d for d in org['districts']}
-                if 'institutions' in org:
-                    schools = {s['entityId']: s for s in org['institutions']}
-
-        for hierarchy in hierarchies:
-            if hierarchy.district.id not in districts:
-                districts[hierarchy.district.id] = {
-                    'entityId': hierarchy.district.id,
-                    'entityName': hierarchy.district.name,
-                    'entityType': 'DISTRICT',
-                    'parentEntityType': 'STATE',
-                    'parentEntityId': hierarchy.state.code
-                }
-            if hierarchy.school.id not in schools:
-                schools[hierarchy.school.id] = {
-                    'entityId': hierarchy.school.id,
-                    'entityName': hierarchy.school.name,
-                    'entityType': 'INSTITUTION',
-                    'parentEntityType': 'DISTRICT',
-                    'parentEntityId': hierarchy.district.id
-                }
-
-        with open(file, "w") as f:
-            # force output order to be same as org hierarchy
-            json.dump(OrderedDict([('districts', list(districts.values())), ('institutions', list(schools.values()))]), f, indent=2)
+        schools = [ih.school for ih in hierarchies]
+        # the files are (over)written by the first call, later calls append to them
+        if not self.hierarchy_writer:
+            self.hierarchy_writer = HierarchyWriter(os.path.join(self.out_path_root, 'hierarchy.csv'))
+            self.organizations_writer = OrganizationsWriter(os.path.join(self.out_path_root, 'organizations.json'),
+                                                            self.compression)
+        self.hierarchy_writer.write(schools)
+        self.organizations_writer.write(schools)
 
     def write_assessments(self, asmts: [Assessment]):
         tabulator_writer.write_assessments(os.path.join(self.out_path_root, 'assessments.csv'), asmts, )
@@ -74,9 +52,19 @@ class XmlWorker(Worker):
             self.write_asmt_to_file(result)
 
     def write_asmt_to_file(self, outcome: AssessmentOutcome):
-        # skip inactive or deleted outcomes
+        xml = self.outcome_to_xml(outcome)
+        if xml:
+            self.compression.write_file(self.file_path_for_outcome(outcome), xml)
+
+    def outcome_to_xml(self, outcome: AssessmentOutcome) -> str:
+        """
+        Build the TRT XML document for this outcome.
+
+        :param outcome: outcome
+        :return: XML string, None for inactive or deleted outcomes (which are skipped)
+        """
         if outcome.result_status != 'C':
-            return
+            return None
 
         root = Element('TDSReport')
 
@@ -102,7 +90,7 @@ class XmlWorker(Worker):
         contextDateStr = outcome.status_date.isoformat()
         self._add_examinee_attribute(examinee, 'StudentIdentifier', student.id, contextDateStr)
         self._add_examinee_attribute(examinee, 'AlternateSSID', student.external_ssid, contextDateStr)
-        self._add_examinee_attribute(examinee, 'Birthdate', student.dob, contextDateStr)
+        self._add_examinee_attribute(examinee, 'Birthdate', DATES.iso(student.dob), contextDateStr)
         self._add_examinee_attribute(examinee, 'FirstName', student.first_name, contextDateStr)
         self._add_examinee_attribute(examinee, 'MiddleName', student.middle_name, contextDateStr)
         self._add_examinee_attribute(examinee, 'LastOrSurname', student.last_name, contextDateStr)
@@ -118,14 +106,14 @@ class XmlWorker(Worker):
         self._add_examinee_attribute(examinee, 'DemographicRaceTwoOrMoreRaces', self._map_yes_no(student.eth_multi), contextDateStr)
         self._add_examinee_attribute(examinee, 'IDEAIndicator', self._map_yes_no(student.prg_iep), contextDateStr)
         self._add_examinee_attribute(examinee, 'LEPStatus', self._map_yes_no(student.prg_lep), contextDateStr)
-        self._add_examinee_attribute(examinee, 'LimitedEnglishProficiencyEntryDate', student.prg_lep_entry_date, contextDateStr)
-        self._add_examinee_attribute(examinee, 'LEPExitDate', student.prg_lep_exit_date, contextDateStr)
+        self._add_examinee_attribute(examinee, 'LimitedEnglishProficiencyEntryDate', DATES.iso(student.prg_lep_entry_date), contextDateStr)
+        self._add_examinee_attribute(examinee, 'LEPExitDate', DATES.iso(student.prg_lep_exit_date), contextDateStr)
         self._add_examinee_attribute(examinee, 'Section504Status', self._map_yes_no(student.prg_sec504), contextDateStr)
         self._add_examinee_attribute(examinee, 'EconomicDisadvantageStatus', self._map_yes_no(student.prg_econ_disad), contextDateStr)
         self._add_examinee_attribute(examinee, 'LanguageCode', student.lang_code, contextDateStr)
         self._add_examinee_attribute(examinee, 'EnglishLanguageProficiencyLevel', student.lang_prof_level, contextDateStr)
         self._add_examinee_attribute(examinee, 'EnglishLanguageAcquisitionStatus', student.elas, contextDateStr)
-        self._add_examinee_attribute(examinee, 'EnglishLanguageAcquisitionStatusStartDate', student.elas_start_date, contextDateStr)
+        self._add_examinee_attribute(examinee, 'EnglishLanguageAcquisitionStatusStartDate', DATES.iso(student.elas_start_date), contextDateStr)
         self._add_examinee_attribute(examinee, 'MigrantStatus', self._map_yes_no(student.prg_migrant), contextDateStr)
         self._add_examinee_attribute(examinee, 'MilitaryConnectedStudentIndicator', student.military_connected, contextDateStr)
         # The generated groups aren't really that useful so let's not emit them
@@ -176,7 +164,7 @@ class XmlWorker(Worker):
         # opportunity.set('windowOpportunity', None)
         opportunity.set('administrationCondition', outcome.admin_condition)
         opportunity.set('assessmentParticipantSessionPlatformUserAgent', '')
-        opportunity.set('effectiveDate', asmt.effective_date.isoformat())
+        opportunity.set('effectiveDate', DATES.iso(asmt.effective_date))
 
         if asmt.segment:
             segment = SubElement(opportunity, 'Segment')
@@ -238,14 +226,12 @@ class XmlWorker(Worker):
                 self._add_score_info(subScoreList, 'Evidence/Elaboration', item_data.sub_scores[1])
                 self._add_score_info(subScoreList, 'Conventions', item_data.sub_scores[2])
 
-        xml = tostring(root, 'unicode')
-        with open(self.file_path_for_outcome(outcome), "w") as f:
-            f.write(xml)
+        return tostring(root, 'unicode')
 
     def file_path_for_outcome(self, outcome: AssessmentOutcome):
         """
         Build file path for this outcome from state, district, school, and outcome rec id
-        Make sure parent folders exist.
+        Make sure parent folders exist. If output is compressed, the codec extension is added when writing.
 
         :param outcome:
         :return:
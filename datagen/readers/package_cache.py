@@ -0,0 +1,129 @@
+"""
+A cache of compiled assessment packages, so a run doesn't have to parse the tabulator csv files
+that an earlier run (or another process) already parsed.
+
+A file is compiled (see tabulator_reader.compile_assessments_file) into an Arrow IPC file: the item
+columns are the record batch and the assessment records are in the schema metadata. Compiled files
+are named for a hash of the source file content. Loading one only skips parsing the csv: the items
+are read into Python lists, so each process still holds its own copy of them. An index (index.json)
+maps source files to their hash by modification time and size, so an unchanged file isn't read at all.
+
+pyarrow is required; this module is imported only when a cache folder is given.
+"""
+import hashlib
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from datagen.readers.tabulator_reader import ITEM_FIELDS, compile_assessments_file
+
+VERSION = 1
+
+ITEM_SCHEMA = pa.schema([
+    ('bank_key', pa.string()),
+    ('item_key', pa.string()),
+    ('type', pa.string()),
+    ('position', pa.int32()),
+    ('max_score', pa.int32()),
+    ('dok', pa.int32()),
+    ('difficulty', pa.float64()),
+    ('operational', pa.string()),
+    ('answer_key', pa.string()),
+    ('options_count', pa.int32()),
+    ('target', pa.string()),
+])
+assert ITEM_SCHEMA.names == ITEM_FIELDS
+
+
+class PackageCache:
+    def __init__(self, path: str):
+        """
+        :param path: cache folder, created if necessary
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._index_file = os.path.join(path, 'index.json')
+        self._index = {}
+        if os.path.isfile(self._index_file):
+            with open(self._index_file) as f:
+                self._index = json.load(f)
+
+    def get(self, file: str) -> ([dict], {str: list}):
+        """
+        :param file: path of tabulator csv file
+        :return: (assessment records, item columns or None), see compile_assessments_file; None if not cached
+        """
+        compiled_file = self._compiled_file(file)
+        return self._read(compiled_file) if os.path.isfile(compiled_file) else None
+
+    def put(self, file: str, compiled: ([dict], {str: list})):
+        """
+        :param file: path of tabulator csv file
+        :param compiled: the file compiled with its items, see compile_assessments_file
+        """
+        self._write(self._compiled_file(file), compiled[0], compiled[1])
+
+    def load(self, file: str) -> ([dict], {str: list}):
+        """ Load a compiled package, compiling (and caching) it if necessary.
+
+        :param file: path of tabulator csv file
+        :return: (assessment records, item columns or None), see compile_assessments_file;
+                 None if the file isn't an assessments file
+        """
+        compiled = self.get(file)
+        if not compiled:
+            compiled = compile_assessments_file(file)
+            if compiled:
+                self.put(file, compiled)
+        return compiled
+
+    def _compiled_file(self, file: str) -> str:
+        return os.path.join(self.path, self.key(file) + '.arrow')
+
+    def key(self, file: str) -> str:
+        """
+        :return: cache key for the file, a hash of its content (cached by the file's modification time and size)
+        """
+        stat = os.stat(file)
+        path = os.path.abspath(file)
+        entry = self._index.get(path)
+        if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['key']
+
+        digest = hashlib.sha1(b'%d:' % VERSION)
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        key = digest.hexdigest()
+        self._index[path] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'key': key}
+        self._save_index()
+        return key
+
+    def _save_index(self):
+        # write and rename, so a concurrent reader never sees a partial index
+        tmp_file = '{}.{}'.format(self._index_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_file, self._index_file)
+
+    def _write(self, compiled_file: str, records: [dict], items: {str: list}):
+        schema = ITEM_SCHEMA.with_metadata({'version': str(VERSION),
+                                            'records': json.dumps(records),
+                                            'items': 'true' if items is not None else 'false'})
+        tmp_file = '{}.{}'.format(compiled_file, os.getpid())
+        with ipc.new_file(tmp_file, schema) as writer:
+            if items:
+                writer.write_batch(pa.record_batch([items[name] for name in ITEM_FIELDS], schema=schema))
+        os.replace(tmp_file, compiled_file)
+
+    @staticmethod
+    def _read(compiled_file: str) -> ([dict], {str: list}):
+        reader = ipc.open_file(pa.memory_map(compiled_file))
+        metadata = reader.schema.metadata
+        records = json.loads(metadata[b'records'])
+        if metadata[b'items'] != b'true':
+            return records, None
+        table = reader.read_all()
+        return records, {name: table.column(name).to_pylist() for name in ITEM_FIELDS}
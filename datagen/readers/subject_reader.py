@@ -1,17 +1,20 @@
 """
 A reader for subject XML files.
 
+A subject file is parsed incrementally (iterparse), keeping only what the generator uses: the assessment
+types with their scoring, the alt scores and the (scorable) claims. Everything else, e.g. messages and
+standards, is discarded as it is read.
 """
 
 import glob
-from distutils.util import strtobool
 from xml.etree import ElementTree
-from xml.etree.ElementTree import Element
 
 from datagen.generators.subject import set_custom_defaults
 from datagen.model.scorable import Scorable
 from datagen.model.subject import Subject, SubjectAssessmentType, SubjectScoring
 
+SCORING_TAGS = ('OverallScoring', 'AltScoring', 'ClaimScoring')
+
 
 def load_subjects(glob_pattern: str):
     """
@@ -37,43 +40,88 @@ def load_subject_file(file: str):
     :param file: filename
     :return: subject
     """
+    return build_subject(parse_subject(file))
+
+
+def parse_subject(source) -> dict:
+    """
+    Parse a subject XML document.
+
+    :param source: file name or file object
+    :return: definition, e.g. {'code': 'ELPAC',
+                               'types': [('SUM', {'OverallScoring': (4, '1150', '1950'), ...})],
+                               'alts': [('1', 'Oral')],
+                               'claims': [('1', 'Listening')]}
+             a scoring is (number of performance levels, min score, max score), None if it is empty;
+             only scorable claims are included
+    """
+    definition = {'code': None, 'types': [], 'alts': [], 'claims': []}
+    path = []           # tags of the current element and its ancestors
+    scoring = None      # [tag, number of performance levels, min score, max score, has children]
+    for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            path.append(element.tag)
+            depth = len(path)
+            if depth == 1:
+                definition['code'] = element.get('code')
+            elif depth == 3 and path[1] == 'AssessmentTypes':
+                definition['types'].append((element.get('code').upper(), {}))
+            elif depth == 3 and path[1] == 'AltScores':
+                definition['alts'].append((element.get('code'), element.get('name')))
+            elif depth == 3 and path[1] == 'Claims':
+                if _to_bool(element.get('scorable', 'true')):
+                    definition['claims'].append((element.get('code'), element.get('name')))
+            elif depth == 4 and path[1] == 'AssessmentTypes' and element.tag in SCORING_TAGS:
+                scoring = [element.tag, 0, element.get('minScore'), element.get('maxScore'), False]
+            elif depth > 4 and scoring:
+                scoring[4] = True
+                if element.tag == 'PerformanceLevel':
+                    scoring[1] += 1
+        else:
+            if len(path) == 4 and scoring:
+                # as for find(), the first of a kind is the one
+                tag, levels, min_score, max_score, has_children = scoring
+                definition['types'][-1][1].setdefault(tag, (levels, min_score, max_score) if has_children else None)
+                scoring = None
+            path.pop()
+            element.clear()
+    return definition
+
+
+def build_subject(definition: dict) -> Subject:
+    """
+    :param definition: parsed subject definition, see parse_subject
+    :return: subject
+    """
+    subject = Subject(definition['code'])
+
+    for code, scorings in definition['types']:
+        assessment_type = SubjectAssessmentType(code)
+        assessment_type.overall_scoring = __scoring(scorings.get('OverallScoring'))
+        assessment_type.alt_scoring = __scoring(scorings.get('AltScoring'))
+        assessment_type.claim_scoring = __scoring(scorings.get('ClaimScoring'))
+        subject.types[code] = assessment_type
 
-    tree = ElementTree.parse(file)
-    root = tree.getroot()
-
-    subject = Subject(root.get('code'))
-
-    types = root.find('./AssessmentTypes')
-    if types:
-        for type in types:
-            code = type.get('code').upper()
-            assessment_type = SubjectAssessmentType(code)
-            assessment_type.overall_scoring = __extract_scoring(type.find('./OverallScoring'))
-            assessment_type.alt_scoring = __extract_scoring(type.find('./AltScoring'))
-            assessment_type.claim_scoring = __extract_scoring(type.find('./ClaimScoring'))
-            subject.types[code] = assessment_type
-
-    altscores = root.find('./AltScores')
-    if altscores:
-        for altscore in altscores:
-            if not subject.alts:
-                subject.alts = []
-            subject.alts.append(Scorable(altscore.get('code'), altscore.get('name')))
-
-    claims = root.find('./Claims')
-    if claims:
-        for claim in claims:
-            if not strtobool(claim.get('scorable', 'true')):
-                continue
-            if not subject.claims:
-                subject.claims = []
-            subject.claims.append(Scorable(claim.get('code'), claim.get('name')))
+    if definition['alts']:
+        subject.alts = [Scorable(code, name) for code, name in definition['alts']]
+
+    if definition['claims']:
+        subject.claims = [Scorable(code, name) for code, name in definition['claims']]
 
     return subject
 
 
-def __extract_scoring(element: Element):
-    if element:
-        levels = element.findall('.//PerformanceLevel')
-        return SubjectScoring(len(levels), min_score = element.get('minScore'), max_score = element.get('maxScore'))
+def __scoring(scoring: tuple):
+    if scoring:
+        return SubjectScoring(scoring[0], min_score=scoring[1], max_score=scoring[2])
     return None
+
+
+def _to_bool(value: str) -> bool:
+    # what distutils.util.strtobool accepted
+    value = value.lower()
+    if value in ('y', 'yes', 't', 'true', 'on', '1'):
+        return True
+    if value in ('n', 'no', 'f', 'false', 'off', '0'):
+        return False
+    raise ValueError("Invalid boolean value '{}'".format(value))
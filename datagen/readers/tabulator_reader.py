@@ -3,11 +3,19 @@ A reader for the output of the assessment package tabulator.
 
 It will produce assessment packages optionally with items.
 
+A file is read in two steps: it is compiled into assessment records and item columns (see
+compile_assessments_file), which are then built into assessments. The compiled form doesn't
+depend on the subjects or on what is being loaded, so it can be cached (see package_cache), and
+files can be compiled in parallel, in a pool of processes. Items are shared by the assessments
+they are in (see item_registry).
+
 """
 
 import csv
 import datetime
 import glob
+import os
+import time
 
 from datagen.config import cfg
 from datagen.model.assessment import Assessment
@@ -16,9 +24,26 @@ from datagen.model.scorable import Scorable
 from datagen.model.segment import AssessmentSegment
 from datagen.model.subject import Subject
 from datagen.util.id_gen import IDGen
+from datagen.util.item_registry import ITEMS
+
+# the assessment-level columns, as much of the row as is kept for building an assessment
+ASSESSMENT_COLUMNS = ['AssessmentId', 'AssessmentName', 'AssessmentSubject', 'AssessmentGrade', 'AssessmentType',
+                      'AssessmentSubtype', 'AssessmentVersion', 'AcademicYear'] + \
+                     [prefix + suffix
+                      for prefix in ['Scaled', 'Alt1', 'Alt2', 'Alt3', 'Alt4', 'Alt5', 'Alt6']
+                      for suffix in ['Low1', 'High1', 'High2', 'High3', 'High4', 'High5']]
+
+# the item columns, named for the AssessmentItem attributes (except segment_id)
+ITEM_FIELDS = ['bank_key', 'item_key', 'type', 'position', 'max_score', 'dok', 'difficulty', 'operational',
+               'answer_key', 'options_count', 'target']
 
+# columns from which allowed accommodations are inferred
+ACCOMMODATION_COLUMNS = [('ASL', 'AmericanSignLanguage'), ('Braille', 'Braille'),
+                         ('AllowCalculator', 'Calculator'), ('Spanish', 'Spanish')]
 
-def load_assessments(glob_pattern, subjects: [Subject], load_sum, load_ica, load_iab, load_items) -> [Assessment]:
+
+def load_assessments(glob_pattern, subjects: [Subject], load_sum, load_ica, load_iab, load_items,
+                     cache_dir=None, processes=1) -> [Assessment]:
     """
     Load assessments from any csv file in the given directory
 
@@ -28,14 +53,71 @@ def load_assessments(glob_pattern, subjects: [Subject], load_sum, load_ica, load
     :param load_ica: True to load ICAs
     :param load_iab: True to load IABs
     :param load_items: True to load items, False to ignore item data
+    :param cache_dir: folder for compiled packages (see package_cache), None to always parse the csv files
+    :param processes: number of processes for parsing files, 1 to parse them in this process
     :return: loaded assessments
     """
+    start = time.perf_counter()
+    files = glob.glob(glob_pattern)
+
+    cache = None
+    compiled = {}
+    if cache_dir:
+        # pyarrow is an optional dependency, only needed for the package cache
+        from datagen.readers.package_cache import PackageCache
+        cache = PackageCache(cache_dir)
+        for file in files:
+            compiled[file] = cache.get(file)
+    cached = [file for file in files if compiled.get(file)]
+
+    # the cache holds items even if they aren't being loaded now
+    parse_items = load_items or cache is not None
+    parse = [file for file in files if file not in cached]
+    if processes > 1 and len(parse) > 1:
+        # imported here, multiprocessing is slow to import and most runs parse in this process
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(processes, len(parse))) as executor:
+            results = list(executor.map(__compile_file, parse, [parse_items] * len(parse), [load_items] * len(parse)))
+    else:
+        results = [__compile_file(file, parse_items, load_items) for file in parse]
+    for file, (result, complete) in zip(parse, results):
+        compiled[file] = result
+        if cache and result and complete:
+            cache.put(file, result)
+
     assessments = []
-    for file in (glob.glob(glob_pattern)):
-        assessments.extend(load_assessments_file(file, subjects, load_sum, load_ica, load_iab, load_items))
+    item_count = 0
+    for file in files:
+        if compiled[file]:
+            records, items = compiled[file]
+            built = build_assessments(records, items, subjects, load_sum, load_ica, load_iab, load_items)
+            assessments.extend(built)
+            # only the items of the assessments loaded
+            item_count += sum(len(asmt.item_bank) for asmt in built if asmt.item_bank)
+
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(file) for file in parse) / (1024 * 1024)
+    print('Loaded {} assessments from {} files ({} parsed, {} cached), {} items in {:.2f}s, parsed {:.1f}MB at {:.1f}MB/s'
+          .format(len(assessments), len(files), len(parse), len(cached), item_count, elapsed, size,
+                  size / elapsed if elapsed else 0))
     return assessments
 
 
+def __compile_file(file, parse_items, items_required):
+    """
+    :return: (compiled file, True if it is complete); if parsing items fails and they aren't required,
+             the file is compiled without them (so it isn't complete)
+    """
+    if parse_items and not items_required:
+        try:
+            return compile_assessments_file(file, True), True
+        except (KeyError, ValueError) as e:
+            # e.g. bad item data, which doesn't matter if items aren't being loaded
+            print('Ignoring item data in assessment package {}: {}'.format(file, e))
+            return compile_assessments_file(file, False), False
+    return compile_assessments_file(file, parse_items), parse_items
+
+
 def load_assessments_file(file, subjects: [Subject], load_sum, load_ica, load_iab, load_items) -> [Assessment]:
     """
     Load assessments from a single tabulator csv file
@@ -48,111 +130,207 @@ def load_assessments_file(file, subjects: [Subject], load_sum, load_ica, load_ia
     :param load_items: True to load items, False to ignore item data
     :return: loaded assessments
     """
-    assessments = []
+    compiled = compile_assessments_file(file, load_items)
+    if not compiled:
+        return []
+    return build_assessments(compiled[0], compiled[1], subjects, load_sum, load_ica, load_iab, load_items)
 
-    def should_process(subtype):
-        return ((subtype == 'SUM' or subtype == 'summative') and load_sum) \
-               or (subtype == 'ICA' and load_ica) or (subtype == 'IAB' and load_iab)
 
-    asmt = None
+def compile_assessments_file(file, parse_items=True) -> ([dict], {str: list}):
+    """
+    Parse a tabulator csv file into assessment records and item columns.
+    The column indexes are resolved from the header, once per file.
+
+    An assessment record is a dict with:
+        row             the assessment columns (see ASSESSMENT_COLUMNS) of its first row
+        accommodations  the accommodations allowed by any of its rows
+        start, end      the range of its items in the item columns
+
+    :param file: path of file to read
+    :param parse_items: True to parse the items (if the file has item information)
+    :return: (assessment records, item columns by ITEM_FIELDS name or None if there are no items),
+             None if this doesn't look like an assessments file
+    """
+    records = []
+    items = None
     with open(file) as csvfile:
-        reader = csv.DictReader(csvfile)
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
         # get out early if this doesn't look like an assessments file
-        if 'AssessmentId' not in reader.fieldnames:
-            return assessments
+        if not header or 'AssessmentId' not in header:
+            return None
+
+        index = {name: i for i, name in enumerate(header)}
+        width = len(header)
+        id_index = index['AssessmentId']
+        columns = [(column, index[column]) for column in ASSESSMENT_COLUMNS if column in index]
+        accommodations = [(index[column], accommodation) for column, accommodation in ACCOMMODATION_COLUMNS
+                          if column in index]
 
         # adjust item parsing if file appears to not have item information
-        parse_item = load_items and 'ItemId' in reader.fieldnames
+        parse_item = None
+        if parse_items and 'ItemId' in index:
+            items = {field: [] for field in ITEM_FIELDS}
+            parse_item = __item_parser(index, items)
 
+        record = None
+        item_count = 0
         for row in reader:
-            parse_asmt = False
-            id = row['AssessmentId']
-
-            if not asmt or asmt.id != id:
-                # only load requested assessment types
-                subtype = row['AssessmentSubtype']
-                if not should_process(subtype):
-                    print('Skipping assessment {} because type {} is not being loaded'.format(id, subtype))
-                    continue
-
-                # don't load assessments for unknown subjects
-                subject_code = __mapSubject(row['AssessmentSubject'])
-                subject = next((subject for subject in subjects if subject.code.upper() == subject_code.upper()), None)
-                if not subject:
-                    print('Skipping assessment {} for unknown subject {}'.format(id, subject_code))
-                    continue
-
-                asmt = Assessment()
-                asmt.subject = subject
-                assessments.append(asmt)
-                parse_asmt = True
-
-            __load_row(row, asmt, parse_asmt, parse_item)
+            if not row:
+                continue
+            if len(row) < width:
+                row.extend([None] * (width - len(row)))
 
-    return assessments
+            if not record or record['row']['AssessmentId'] != row[id_index]:
+                record = {'row': {column: row[i] for column, i in columns}, 'accommodations': [],
+                          'start': item_count, 'end': item_count}
+                records.append(record)
 
+            # infer allowed accommodations even if not parsing items
+            for i, accommodation in accommodations:
+                if row[i] and accommodation not in record['accommodations']:
+                    record['accommodations'].append(accommodation)
 
-def __load_row(row, asmt: Assessment, parse_asmt, parse_item):
-    if parse_asmt:
-        asmt.id = row['AssessmentId']
-        asmt.name = row['AssessmentName']
-        asmt.grade = __mapGrade(row['AssessmentGrade'])
-        asmt.type = __mapAssessmentType(row['AssessmentType'], row['AssessmentSubtype'])
-        asmt.version = row['AssessmentVersion']
-        asmt.year = int(row['AcademicYear'])
+            if parse_item:
+                parse_item(row)
+                item_count += 1
+                record['end'] = item_count
 
-        asmt.effective_date = datetime.date(asmt.year - 1, 8, 15)
-        asmt.from_date = asmt.effective_date
-        asmt.to_date = cfg.ASMT_TO_DATE
+    return records, items
 
-        asmt.overall = __getScorable(row, 'Scaled', 'Overall', 'Overall')
 
-        # there may be up to 6 alt scores for an assessment
-        if asmt.subject.alts:
-            asmt.alts = [__getScorable(row, 'Alt' + str(i), alt_def.code, alt_def.name, alt_def.weight)
-                         for (i, alt_def) in enumerate(asmt.subject.alts, start=1)]
+def build_assessments(records: [dict], items: {str: list}, subjects: [Subject], load_sum, load_ica, load_iab,
+                      load_items) -> [Assessment]:
+    """
+    Build assessments from compiled assessment records and item columns (see compile_assessments_file)
+
+    :param records: assessment records
+    :param items: item columns, None if there are no items
+    :param subjects: subject definitions, correlated to assessments by subject code
+    :param load_sum: True to load summative assessments
+    :param load_ica: True to load ICAs
+    :param load_iab: True to load IABs
+    :param load_items: True to load items, False to ignore item data
+    :return: assessments
+    """
+    assessments = []
 
-        # claims
-        if asmt.is_iab() or not asmt.subject.claims:
-            asmt.claims = []
-        else:
-            asmt.claims = [__copyScorable(claim_def, asmt.overall.score_min, asmt.overall.score_max)
-                           for claim_def in asmt.subject.claims]
+    def should_process(subtype):
+        return ((subtype == 'SUM' or subtype == 'summative') and load_sum) \
+               or (subtype == 'ICA' and load_ica) or (subtype == 'IAB' and load_iab)
 
-        # if items are being parsed, create segment and list
+    subjects_by_code = {}
+    for subject in subjects:
+        subjects_by_code.setdefault(subject.code.upper(), subject)
+
+    parse_item = load_items and items is not None
+    for record in records:
+        row = record['row']
+        id = row['AssessmentId']
+
+        # only load requested assessment types
+        subtype = row['AssessmentSubtype']
+        if not should_process(subtype):
+            print('Skipping assessment {} because type {} is not being loaded'.format(id, subtype))
+            continue
+
+        # don't load assessments for unknown subjects
+        subject_code = __mapSubject(row['AssessmentSubject'])
+        subject = subjects_by_code.get(subject_code.upper())
+        if not subject:
+            print('Skipping assessment {} for unknown subject {}'.format(id, subject_code))
+            continue
+
+        asmt = Assessment()
+        asmt.subject = subject
+        __load_assessment(row, asmt, parse_item)
+        asmt.accommodations.update(record['accommodations'])
         if parse_item:
-            asmt.segment = AssessmentSegment()
-            asmt.segment.id = IDGen.get_uuid()
-            asmt.item_bank = []
-            asmt.item_total_score = 0
-
-    # infer allowed accommodations even if not parsing items
-    if 'ASL' in row and len(row['ASL']) > 0:
-        asmt.accommodations.add('AmericanSignLanguage')
-    if 'Braille' in row and len(row['Braille']) > 0:
-        asmt.accommodations.add('Braille')
-    if 'AllowCalculator' in row and len(row['AllowCalculator']) > 0:
-        asmt.accommodations.add('Calculator')
-    if 'Spanish' in row and len(row['Spanish']) > 0:
-        asmt.accommodations.add('Spanish')
+            __load_items(items, record['start'], record['end'], asmt)
+        assessments.append(asmt)
+
+    return assessments
+
+
+def __load_assessment(row, asmt: Assessment, parse_item):
+    asmt.id = row['AssessmentId']
+    asmt.name = row['AssessmentName']
+    asmt.grade = __mapGrade(row['AssessmentGrade'])
+    asmt.type = __mapAssessmentType(row['AssessmentType'], row['AssessmentSubtype'])
+    asmt.version = row['AssessmentVersion']
+    asmt.year = int(row['AcademicYear'])
+
+    asmt.effective_date = datetime.date(asmt.year - 1, 8, 15)
+    asmt.from_date = asmt.effective_date
+    asmt.to_date = cfg.ASMT_TO_DATE
+
+    asmt.overall = __getScorable(row, 'Scaled', 'Overall', 'Overall')
+
+    # there may be up to 6 alt scores for an assessment
+    if asmt.subject.alts:
+        asmt.alts = [__getScorable(row, 'Alt' + str(i), alt_def.code, alt_def.name, alt_def.weight)
+                     for (i, alt_def) in enumerate(asmt.subject.alts, start=1)]
 
+    # claims
+    if asmt.is_iab() or not asmt.subject.claims:
+        asmt.claims = []
+    else:
+        asmt.claims = [__copyScorable(claim_def, asmt.overall.score_min, asmt.overall.score_max)
+                       for claim_def in asmt.subject.claims]
+
+    # if items are being parsed, create segment and list
     if parse_item:
-        item = AssessmentItem()
-        item.bank_key = row['BankKey']
-        item.item_key = row['ItemId']
-        item.type = row['ItemType']
-        item.position = __getInt(row['ItemPosition'], 0)
-        item.segment_id = asmt.segment.id
-        item.max_score = int(row['MaxPoints'])
-        item.dok = int(row['DOK'])
-        item.difficulty = float(row['avg_b'])
-        item.operational = '0' if row['IsFieldTest'] == 'true' else '1'
-        item.answer_key = row['AnswerKey'] if 'AnswerKey' in row else None
-        item.options_count = int(row['NumberOfAnswerOptions']) if 'NumberOfAnswerOptions' in row else 0
-        # these are messy in tabulator output so split, strip, rejoin
-        item.target = '|'.join(t.strip() for t in row['ClaimContentTarget'].split('|')) if 'ClaimContentTarget' in row else None
+        asmt.segment = AssessmentSegment()
+        asmt.segment.id = IDGen.get_uuid()
+        asmt.item_bank = []
+        asmt.item_total_score = 0
+
+
+def __item_parser(index: {str: int}, items: {str: list}):
+    """
+    :param index: column indexes by name
+    :param items: item columns to append to
+    :return: function that parses the item in a row (a list of values) and appends it to the item columns
+    """
+    bank_key, item_key, type, position, max_score, dok, difficulty, is_field_test = (
+        index['BankKey'], index['ItemId'], index['ItemType'], index['ItemPosition'], index['MaxPoints'],
+        index['DOK'], index['avg_b'], index['IsFieldTest'])
+    answer_key = index.get('AnswerKey')
+    options_count = index.get('NumberOfAnswerOptions')
+    target = index.get('ClaimContentTarget')
+    appends = [items[field].append for field in ITEM_FIELDS]
+
+    def parse(row):
+        values = (
+            row[bank_key],
+            row[item_key],
+            row[type],
+            __getInt(row[position], 0),
+            int(row[max_score]),
+            int(row[dok]),
+            float(row[difficulty]),
+            '0' if row[is_field_test] == 'true' else '1',
+            row[answer_key] if answer_key is not None else None,
+            int(row[options_count]) if options_count is not None else 0,
+            ITEMS.target(row[target]) if target is not None else None)
+        for append, value in zip(appends, values):
+            append(value)
+
+    return parse
+
+
+def __load_items(items: {str: list}, start, end, asmt: Assessment):
+    columns = [items[field][start:end] for field in ITEM_FIELDS]
+    segment_id = asmt.segment.id
+    for bank_key, item_key, type, position, max_score, dok, difficulty, operational, answer_key, options_count, \
+            target in zip(*columns):
+        item = AssessmentItem(ITEMS.get(bank_key, item_key, type, max_score, dok, difficulty, answer_key,
+                                        options_count, target))
+        item.position = position
+        item.segment_id = segment_id
+        item.operational = operational
         asmt.item_bank.append(item)
-        asmt.item_total_score += item.max_score
+        asmt.item_total_score += max_score
 
 
 def __mapAssessmentType(type, subtype):
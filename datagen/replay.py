@@ -0,0 +1,36 @@
+"""
+Replay generated TRT files against the RDW import service, for load testing.
+
+"""
+
+import argparse
+import itertools
+
+from datagen.util.import_client import STUB_TOKEN, TokenProvider
+from datagen.util.replay import Replay, iter_files
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay generated TRT files against the import service.',
+                                     epilog='Example arguments:' +
+                                            '\n  --source ./out --rate 50 --concurrency 16'
+                                            '\n  --source ./out.tar.gz --url https://import.example.org/exams/imports'
+                                     )
+
+    parser.add_argument('-s', '--source', dest='source', action='store', default='out', help='Output folder (STATE/DISTRICT/SCHOOL/*.xml) or a tar/zip archive of one (default=out)')
+    parser.add_argument('-u', '--url', dest='url', action='store', default='http://localhost:8080/exams/imports', help='Import service endpoint (default=http://localhost:8080/exams/imports)')
+    parser.add_argument('-r', '--rate', dest='rate', action='store', type=float, default=None, help='Target submissions per second (default is as fast as possible)')
+    parser.add_argument('-c', '--concurrency', dest='concurrency', action='store', type=int, default=8, help='Number of concurrent connections (default=8)')
+    parser.add_argument('-n', '--limit', dest='limit', action='store', type=int, default=None, help='Max number of files to submit')
+    parser.add_argument('-t', '--token', dest='token', action='store', default=STUB_TOKEN, help='Access token (default is the stub token service token)')
+    parser.add_argument('-tu', '--token_url', dest='token_url', action='store', default=None, help='OAuth2 token endpoint; if set, the token is fetched (and refreshed) from it')
+    parser.add_argument('-td', '--token_data', dest='token_data', action='store', default=None, help='Form data for the token request')
+
+    args, unknown = parser.parse_known_args()
+
+    files = iter_files(args.source)
+    if args.limit:
+        files = itertools.islice(files, args.limit)
+
+    replay = Replay(args.url, TokenProvider(args.token, args.token_url, args.token_data), args.rate, args.concurrency)
+    stats = replay.run(files)
+    print(stats.report())
@@ -0,0 +1,50 @@
+"""
+An index of the loaded assessments by year, grade and type.
+
+Outcomes are generated school by school, grade by grade, for every year; the index is built once
+so each grade's assessments (and their subjects) are looked up instead of filtered from all of them.
+"""
+from datagen.model.assessment import Assessment
+
+
+class AssessmentIndex:
+    """
+    Assessments by (year, grade) and (year, grade, type), in the order they were loaded, with the
+    years, grades and subject codes they cover.
+    """
+
+    def __init__(self, assessments: [Assessment]):
+        """
+        :param assessments: assessments
+        """
+        self.assessments = assessments
+        self.years = sorted(set(asmt.year for asmt in assessments))             # e.g. [2015, 2016, 2017]
+        self.grades = set(asmt.grade for asmt in assessments)                   # e.g. {3, 4, 11}
+        self.subject_codes = sorted(set(asmt.subject.code for asmt in assessments))    # e.g. ['ELA', 'Math']
+
+        self._by_grade = {}
+        self._by_type = {}
+        for asmt in assessments:
+            self._by_grade.setdefault((asmt.year, asmt.grade), []).append(asmt)
+            self._by_type.setdefault((asmt.year, asmt.grade, asmt.type), []).append(asmt)
+        self._subject_codes = {key: sorted(set(asmt.subject.code for asmt in asmts))
+                               for key, asmts in self._by_grade.items()}
+
+    def get(self, year: int, grade: int, type: str = None) -> [Assessment]:
+        """
+        :param year: year
+        :param grade: grade
+        :param type: SUM, ICA or IAB, None for all types
+        :return: the assessments for the year and grade (of the type), an empty list if there are none
+        """
+        asmts = self._by_grade.get((year, grade)) if type is None else self._by_type.get((year, grade, type))
+        return asmts if asmts else []
+
+    def get_subject_codes(self, year: int, grade: int) -> [str]:
+        """
+        :return: sorted list of the subject codes of the assessments for the year and grade, e.g. ['ELA', 'Math']
+        """
+        return self._subject_codes.get((year, grade), [])
+
+    def __len__(self):
+        return len(self.assessments)
@@ -1,3 +1,4 @@
+import bisect
 import itertools
 import math
 import random
@@ -5,7 +6,7 @@ from functools import partial, reduce
 from operator import mul
 
 from datagen.util.stats import normalize
-from datagen.util.weighted_choice import weighted_choice
+from datagen.util.weighted_choice import SAMPLERS, WeightedChooser
 
 product = partial(reduce, mul)
 
@@ -80,6 +81,7 @@ class RandomLevelByDemographics:
                  level_breakdowns: GradeLevels):
         self.demographics = demographics
         self.level_breakdowns = level_breakdowns
+        self._distributions = {}
 
     def _p_demo_is_val_given_level(self,
                                    demo_name: str,
@@ -118,6 +120,15 @@ class RandomLevelByDemographics:
         # normalize (instead of computing the denominator, which is fixed)
         return normalize(probs)
 
+    def cached_distribution(self, entity: dict) -> [float]:
+        """
+        Same as distribution, but computed only once for each combination of demographic values.
+        """
+        key = tuple(entity.items())
+        if key not in self._distributions:
+            self._distributions[key] = self.distribution(entity)
+        return self._distributions[key]
+
     def random_level(self,
                      entity: dict,
                      rng: random.Random = random.Random(),
@@ -125,22 +136,37 @@ class RandomLevelByDemographics:
         """
         Given a student, return a random level chosen according to their demographic values
         """
-        probs = {i: prob for i, prob in enumerate(self.distribution(entity))}
+        sampler = self.sampler(entity)
 
-        if all(prob == 0.0 for prob in probs.values()):
+        if sampler is None:
             # the demographics say this student doesn't exist...
-            return rng.choice(list(probs.keys()))
+            if seed is not None:
+                rng.seed(seed)
+            return rng.randrange(self.level_breakdowns.num_levels)
+
+        return sampler.choose(seed=seed, rng=rng)
+
+    def sampler(self, entity: dict) -> WeightedChooser:
+        """
+        The level sampler for a student, compiled once for each combination of demographic values.
+
+        @returns the sampler, None if the demographics say this student doesn't exist
+        """
+        def weights():
+            probs = {i: prob for i, prob in enumerate(self.cached_distribution(entity))}
+            return None if all(prob == 0.0 for prob in probs.values()) else probs
 
-        return weighted_choice(probs, rng=rng, seed=seed)
+        return SAMPLERS.get((self.demographics, self.level_breakdowns), weights, tuple(entity.items()))
 
 
-def random_capability(distribution: [float], adj: float = 0.0) -> float:
+def random_capability(distribution: [float], adj: float = 0.0, uniform=random.uniform) -> float:
     """
     Given a distribution, e.g. [0.04,0.32,0.57,0.07] this will return the fractional level of a
     random value. The return will be 0-N where N is the number of values in the distribution.
 
     :param distribution: normalized distribution (i.e. adds up to 1)
     :param adj: optional capability adjustment (-1, +1) (gamma correction so negative reduces capability)
+    :param uniform: uniform random number function, e.g. of a seeded random.Random
     :return: fractional value 0-N
     """
     # in theory this can be any size distribution but we know it is for performance levels so should be 4
@@ -149,7 +175,7 @@ def random_capability(distribution: [float], adj: float = 0.0) -> float:
 
     # accumulate values and stick a leading 0 in there
     values = [0.0] + list(itertools.accumulate(distribution))
-    value = random.uniform(0, values[-1])
+    value = uniform(0, values[-1])
     for i in range(0, n):
         if value < values[i + 1]:
             return adjust_capability(i + ((value - values[i]) / (values[i + 1] - values[i])), adj)
@@ -191,6 +217,46 @@ def score_given_capability(capability: float, cuts: [int]) -> (int, int):
     return score, level
 
 
+def scores_given_capabilities(capabilities: [float], cuts: [int]) -> ([int], [int]):
+    """
+    Batch version of score_given_capability, scoring a list of capabilities against the same cut points.
+
+    :param capabilities: float values [0.0, 4.0)
+    :param cuts: the cut points for the levels, inc. min and max
+    :return: list of scores between min-max from cuts, list of levels based on cuts
+    """
+    score_min, score_max = cuts[0], cuts[-1]
+    scale = (score_max - score_min) / 4.0
+    # sigma by level (level 0 is never used)
+    sigmas = [0.0] + [(cuts[level] - cuts[level - 1]) / 8.0 for level in range(1, len(cuts))]
+    gauss = random.gauss
+
+    scores = []
+    for capability in capabilities:
+        mu = int(score_min + capability * scale)
+        sigma = sigmas[performance_level(mu, cuts)]
+        scores.append(min(score_max - 1, max(score_min, int(gauss(mu, sigma)))))
+    return scores, performance_levels(scores, cuts)
+
+
+def performance_levels(scores: [float], cuts: [int]) -> [int]:
+    """
+    Batch version of performance_level.
+
+    :param scores: scores
+    :param cuts: the cut points for the levels, inc. min and max
+    :return: performance level for each score based on cuts
+    """
+    score_min, score_max = cuts[0], cuts[-1]
+    levels = []
+    for score in scores:
+        if score < score_min or score > score_max:
+            raise ValueError('invalid score {} given cut-points {}'.format(score, cuts))
+        # same as performance_level if score == max
+        levels.append(bisect.bisect_right(cuts, score) if score < score_max else len(cuts) - 2)
+    return levels
+
+
 def performance_level(score: float, cuts: [int]) -> int:
     """
     Compare the score against the cut-points to determine the performance level.
@@ -214,41 +280,63 @@ def random_subscores(score: int, weights: [float], score_min: int, score_max: in
     """
     generate random sub scores such that score == sum(weight[i] * subscore[i] for i in NUMBER_OF_CLAIMS)
     """
+    return random_subscores_batch([score], weights, score_min, score_max)[0]
+
+
+def random_subscores_batch(scores: [int], weights: [float], score_min: int, score_max: int) -> [[int]]:
+    """
+    Batch version of random_subscores, generating sub scores for a list of scores with the same weights.
+    Each set of sub scores satisfies score == sum(weight[i] * subscore[i] for i in NUMBER_OF_CLAIMS), +/- 1
+    """
     assert .999 < sum(weights) < 1.001
 
-    # shuffle the order of subscores to try to even out the distribution
-    # note: I don't think this actually produces a uniform distribution, but at least it doesn't
-    # treat subscores with the same weight differently depending on their order
-    ordered = list(enumerate(weights))
-    random.shuffle(ordered)
-    order, weights = zip(*ordered)
+    n = len(weights)
+    indexes = list(range(n))
+    floor, ceil, triangular, randint, shuffle = math.floor, math.ceil, random.triangular, random.randint, random.shuffle
+
+    results = []
+    for score in scores:
+        # shuffle the order of subscores to try to even out the distribution
+        # note: I don't think this actually produces a uniform distribution, but at least it doesn't
+        # treat subscores with the same weight differently depending on their order
+        shuffle(indexes)
+
+        subscores = [0] * n
+        remaining_weight = 1.0
+        remaining_score = score
+        for i in indexes:
+            claim_weight = weights[i]
+            remaining_weight -= claim_weight
 
-    subscores = []
-    remaining_weight = 1.0
+            min_ = min(score_max, max(score_min, int(floor((remaining_score - remaining_weight * score_max) / claim_weight))))
+            max_ = max(score_min, min(score_max, int(ceil((remaining_score - remaining_weight * score_min) / claim_weight))))
 
-    remaining_score = score
+            assert min_ <= max_, '{} {}'.format(min_, max_)
 
-    for claim_weight in weights:
-        remaining_weight -= claim_weight
+            # try to lean towards the score for each claim
+            claim = int(triangular(min_, max_, score)) if min_ < score < max_ else randint(min_, max_)
 
-        min_ = min(score_max,
-                   max(score_min, int(math.floor((remaining_score - remaining_weight * score_max) / claim_weight))))
-        max_ = max(score_min,
-                   min(score_max, int(math.ceil((remaining_score - remaining_weight * score_min) / claim_weight))))
+            subscores[i] = claim
+            remaining_score -= claim * claim_weight
 
-        assert min_ <= max_, '{} {}'.format(min_, max_)
+        assert score - 1 <= sum(subscores[i] * weights[i] for i in range(n)) <= score + 1
 
-        # try to lean towards the score for each claim
-        claim = int(random.triangular(min_, max_, score)) if min_ < score < max_ else random.randint(min_, max_)
+        results.append(tuple(subscores))
 
-        subscores.append(claim)
+    return results
 
-        remaining_score -= claim * claim_weight
 
-    assert score - 1 <= sum(subscores[i] * weights[i] for i in range(len(weights))) <= score + 1
+def random_stderrs(claim_scores: [int], claim_min: int, claim_max: int) -> [int]:
+    """Batch version of random_stderr.
 
-    # unshuffle the claims
-    return tuple(subscores[order.index(i)] for i in range(len(weights)))
+    :param claim_scores: scores
+    :param claim_min: min possible score
+    :param claim_max: max possible score
+    :return: std error for each score
+    """
+    claim_range = claim_max - claim_min
+    randint = random.randint
+    return [25 + randint(0, 60 + round(120 * (claim_max - claim_score) / claim_range)) for claim_score in claim_scores]
 
 
 def random_stderr(claim_score: int, claim_min: int, claim_max: int):
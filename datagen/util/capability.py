@@ -0,0 +1,120 @@
+"""
+The student capability model.
+
+A student's capability in a subject is a fractional performance level, 0.0 <= value < 4.0, that is
+used to generate their scores. It is initialised from a level distribution (see RandomLevelByDemographics)
+and a gamma adjustment (see adjust_capability), and adjusted when the student advances or changes school.
+
+The engine applies these to a batch of students at once. CapabilityEngine is the reference, pure-Python,
+backend; the NumPy backend (see capability_numpy) works on a (students x subjects) array. The backend
+is selected with use_engine; numpy is an optional dependency, imported only if its backend is used.
+Either way, the capabilities are stored in each student's capability dict, which is what is queried
+when generating outcomes.
+"""
+import random
+
+import datagen.config.cfg as cfg
+from datagen.generators.subject import get_el_adjacent
+from datagen.model.student import Student
+from datagen.util.assessment_stats import random_capability
+
+BACKENDS = ['python', 'numpy']
+
+
+class CapabilityEngine:
+    def __init__(self, seed=None):
+        """
+        :param seed: random seed, None to use the shared random generator
+        """
+        self.rng = random.Random(seed) if seed is not None else random
+
+    def initialize(self, students: [Student], subject_codes: [str], distributions: [[[float]]],
+                   adjustments: [[float]]):
+        """ Initialise the capabilities of a batch of students.
+
+        :param students: students
+        :param subject_codes: subject codes
+        :param distributions: level distribution, by student then subject, e.g. [0.04, 0.32, 0.57, 0.07]
+        :param adjustments: capability adjustment (-1, +1), by student then subject
+        """
+        uniform = self.rng.uniform
+        for student, student_distributions, student_adjustments in zip(students, distributions, adjustments):
+            capability = student.capability
+            for subject_code, distribution, adj in zip(subject_codes, student_distributions, student_adjustments):
+                capability[subject_code] = random_capability(distribution, adj, uniform)
+
+    def adjust(self, students: [Student], exponents: [float]):
+        """ Adjust the capabilities of a batch of students, in all subjects.
+
+        :param students: students
+        :param exponents: gamma exponent for each student, see combine_adjustments
+        """
+        for student, exponent in zip(students, exponents):
+            capability = student.capability
+            for subject_code, value in capability.items():
+                capability[subject_code] = 4.0 * pow(value / 4.0, exponent)
+
+    def capabilities(self, students: [Student], subject_code: str) -> [float]:
+        """
+        :return: capability of each student in the subject
+        """
+        return [student.capability[subject_code] for student in students]
+
+    def matrix(self, students: [Student], subject_codes: [str]):
+        """
+        :return: capabilities, as rows (one per student) of values (one per subject)
+        """
+        return [[student.capability[subject_code] for subject_code in subject_codes] for student in students]
+
+
+def el_adjustment(student: Student, subject_code: str) -> float:
+    """
+    Make performance in EL-related subjects reflect the student's english-learner status.
+
+    :return: capability adjustment, 0.0 if none
+    """
+    if get_el_adjacent(subject_code) and student.elas == 'EL':
+        level = cfg.LEP_PROFICIENCY_LEVELS.index(student.lang_prof_level)
+        if level < 3:
+            return 0.4 * (level - 3)
+    return 0.0
+
+
+def combine_adjustments(adjustments: [float]) -> float:
+    """
+    Combine capability adjustments into a single exponent, see adjust_capability:
+    4 * ((4 * (c / 4) ^ (1 - a1)) / 4) ^ (1 - a2) = 4 * (c / 4) ^ ((1 - a1) * (1 - a2))
+    """
+    exponent = 1.0
+    for adj in adjustments:
+        assert -10.0 < adj < +1.0
+        exponent *= 1 - adj
+    return exponent
+
+
+def get_engine(backend: str = 'python', seed=None) -> CapabilityEngine:
+    """
+    :param backend: python or numpy
+    :param seed: random seed, None to use the shared random generator (python) or a fresh one (numpy)
+    :return: new capability engine
+    """
+    if backend == 'python':
+        return CapabilityEngine(seed)
+    if backend == 'numpy':
+        # numpy is an optional dependency, only needed for this backend
+        from datagen.util.capability_numpy import NumpyCapabilityEngine
+        return NumpyCapabilityEngine(seed)
+    raise ValueError("Unknown capability engine '{}' (expected one of {})".format(backend, ', '.join(BACKENDS)))
+
+
+def use_engine(backend: str = 'python', seed=None) -> CapabilityEngine:
+    """ Set the capability engine used for generating students.
+
+    :return: the engine
+    """
+    global ENGINE
+    ENGINE = get_engine(backend, seed)
+    return ENGINE
+
+
+ENGINE = CapabilityEngine()
@@ -0,0 +1,70 @@
+"""
+The NumPy capability engine backend, see capability.
+
+Capabilities for a batch are drawn and adjusted as a (students x subjects) float array, then stored
+in the students' capability dicts. This requires numpy, which is imported only if this backend is used.
+"""
+import numpy as np
+
+from datagen.model.student import Student
+from datagen.util.capability import CapabilityEngine
+
+
+class NumpyCapabilityEngine(CapabilityEngine):
+    def __init__(self, seed=None):
+        """
+        :param seed: random seed, None for an unpredictable seed
+        """
+        super().__init__(seed)
+        self.generator = np.random.default_rng(seed)
+
+    def initialize(self, students: [Student], subject_codes: [str], distributions: [[[float]]],
+                   adjustments: [[float]]):
+        if not students or not subject_codes:
+            return
+        # (students x subjects x levels) distributions and (students x subjects) adjustments
+        distributions = np.asarray(distributions, dtype=float)
+        adjustments = np.asarray(adjustments, dtype=float)
+        assert distributions.shape[-1] == 4
+        assert ((-10.0 < adjustments) & (adjustments < 1.0)).all()
+
+        # pick a random value in the cumulative distribution, the capability is its fractional level
+        cumulative = np.cumsum(distributions, axis=-1)
+        values = self.generator.uniform(0.0, cumulative[..., -1])
+        levels = np.minimum((cumulative <= values[..., np.newaxis]).sum(axis=-1), 3)[..., np.newaxis]
+        upper = np.take_along_axis(cumulative, levels, axis=-1)[..., 0]
+        widths = np.take_along_axis(distributions, levels, axis=-1)[..., 0]
+        capabilities = levels[..., 0] + (values - (upper - widths)) / widths
+
+        # apply the (gamma) adjustments
+        capabilities = 4.0 * np.power(capabilities / 4.0, 1.0 - adjustments)
+
+        for student, row in zip(students, capabilities.tolist()):
+            student.capability.update(zip(subject_codes, row))
+
+    def adjust(self, students: [Student], exponents: [float]):
+        # students usually have the same subjects, adjust each group of them as a single array
+        by_subjects = {}
+        for student, exponent in zip(students, exponents):
+            group = by_subjects.setdefault(tuple(student.capability), ([], []))
+            group[0].append(student)
+            group[1].append(exponent)
+
+        for subject_codes, (group, group_exponents) in by_subjects.items():
+            if not subject_codes:
+                continue
+            capabilities = self.matrix(group, subject_codes)
+            capabilities = 4.0 * np.power(capabilities / 4.0, np.asarray(group_exponents)[:, np.newaxis])
+            for student, row in zip(group, capabilities.tolist()):
+                student.capability.update(zip(subject_codes, row))
+
+    def capabilities(self, students: [Student], subject_code: str) -> [float]:
+        return np.fromiter((student.capability[subject_code] for student in students), dtype=float,
+                           count=len(students))
+
+    def matrix(self, students: [Student], subject_codes: [str]):
+        """
+        :return: (students x subjects) array of capabilities
+        """
+        return np.array([[student.capability[subject_code] for subject_code in subject_codes]
+                         for student in students], dtype=float).reshape(len(students), len(subject_codes))
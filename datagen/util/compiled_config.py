@@ -0,0 +1,83 @@
+"""
+Configuration compiled for the generators.
+
+The configuration modules are nested dicts keyed by strings, which are easy to read and edit but slow to
+consult while generating students. A school type's configuration is compiled into a frozen SchoolType,
+and a demographics configuration into a tuple indexed by (integer) grade, once per configuration object.
+Compiled forms are cached by the identity of the configuration, so (as for SAMPLERS) configuration must
+not be modified once it has been compiled.
+"""
+from types import MappingProxyType
+
+
+class SchoolType:
+    """
+    A school type's configuration (see hierarchy.SCHOOL_TYPES), compiled.
+    """
+
+    __slots__ = ('type', 'grades', 'grade_set', 'student_min', 'student_max', 'student_avg', 'group_size',
+                 'adjust_pld')
+
+    def __init__(self, config: dict):
+        """
+        :param config: school type configuration
+        """
+        students = config['students']
+        smin, smax = students['min'], students['max']
+        init = object.__setattr__
+        init(self, 'type', config.get('type'))                              # e.g. 'High School'
+        init(self, 'grades', tuple(sorted(config['grades'])))               # ordered low to high
+        init(self, 'grade_set', frozenset(config['grades']))                # for membership tests
+        init(self, 'student_min', smin)                                     # students in a grade
+        init(self, 'student_max', smax)
+        init(self, 'student_avg', students.get('avg', ((smax - smin) // 2) + smin))
+        init(self, 'group_size', config.get('group_size'))                  # average group size
+        init(self, 'adjust_pld', students.get('adjust_pld', 0.0))            # capability adjustment
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SchoolType is immutable, can't set '{}'".format(name))
+
+
+class ConfigCompiler:
+    """
+    Compiled configuration, keyed by the identity of the configuration object.
+    The compiler holds a reference to the configuration so its identity can't be reused.
+    """
+
+    def __init__(self):
+        self._compiled = {}
+
+    def school_type(self, config: dict) -> SchoolType:
+        """
+        :param config: school type configuration, e.g. hierarchy.SCHOOL_TYPES['High School']
+        :return: compiled school type
+        """
+        return self._get(config, SchoolType)
+
+    def demographics(self, config: dict) -> (MappingProxyType,):
+        """
+        :param config: demographics configuration by grade ('0' - '12'), e.g. population.DEMOGRAPHICS['california']
+        :return: tuple of read-only grade configurations, indexed by grade (None for grades not configured);
+                 the characteristics (e.g. 'gender') are the configuration's own dicts, so SAMPLERS work with them
+        """
+        return self._get(config, _compile_demographics)
+
+    def _get(self, config, compile):
+        if config is None:
+            return None
+        key = (id(config), compile)
+        entry = self._compiled.get(key)
+        if entry is None:
+            entry = self._compiled[key] = (config, compile(config))
+        return entry[1]
+
+    def clear(self):
+        self._compiled.clear()
+
+
+def _compile_demographics(config: dict) -> (MappingProxyType,):
+    grades = {int(grade): MappingProxyType(grade_config) for grade, grade_config in config.items()}
+    return tuple(grades.get(grade) for grade in range(max(grades) + 1)) if grades else ()
+
+
+COMPILED = ConfigCompiler()
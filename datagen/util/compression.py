@@ -0,0 +1,189 @@
+"""
+Compressed output streams shared by the output workers.
+
+An OutputCompression is configured once per run (codec, level, buffer size) and handed to the workers,
+which use it to open their output files. With no codec, files are written as-is. gzip uses the standard
+library; zstd and lz4 need the zstandard and lz4 packages respectively, and are imported only when used.
+
+When threaded, compression and disk writes happen on a single background thread fed through a bounded
+queue, so the generators aren't blocked on it. Writes for a given stream are applied in order; errors
+are raised from close().
+"""
+import gzip
+import io
+import queue
+import threading
+
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst', 'lz4': '.lz4'}
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+class OutputCompression:
+    def __init__(self, codec: str = None, level: int = None, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 threaded: bool = False, queue_size: int = 256):
+        """
+        :param codec: None (no compression), 'gzip', 'zstd' or 'lz4'
+        :param level: codec-specific compression level, None for the codec default
+        :param buffer_size: size of the file buffer underneath the compressor
+        :param threaded: True to compress and write on a background thread
+        :param queue_size: max number of pending writes when threaded
+        """
+        if codec is not None and codec not in EXTENSIONS:
+            raise ValueError("Unknown compression '{}' (expected one of {})".format(codec, ', '.join(EXTENSIONS)))
+        self.codec = codec
+        self.level = level
+        self.buffer_size = buffer_size
+        self._module = _load_module(codec)
+
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if threaded:
+            self._queue = queue.Queue(queue_size)
+            self._thread = threading.Thread(target=self._run, name='output-compression', daemon=True)
+            self._thread.start()
+
+    @property
+    def extension(self):
+        return EXTENSIONS[self.codec] if self.codec else ''
+
+    def path(self, path: str) -> str:
+        """ Return the actual path for an output file, i.e. with the codec extension appended.
+        """
+        return path + self.extension
+
+    def open(self, path: str):
+        """ Open an output stream, the codec extension is appended to the path.
+        The stream accepts str (encoded as UTF-8) or bytes and must be closed.
+        """
+        stream = _OutputStream(self._open_raw(self.path(path)))
+        return _ThreadedStream(self, stream) if self._queue else stream
+
+    def write_file(self, path: str, data):
+        """ Write a whole file, the codec extension is appended to the path.
+        """
+        if self._queue:
+            self._submit(lambda: self._write_file(path, data))
+        else:
+            self._write_file(path, data)
+
+    def open_read(self, path: str):
+        """ Open a previously written output file for reading (text), the codec extension is appended to the path.
+        """
+        path = self.path(path)
+        if self.codec == 'gzip':
+            return gzip.open(path, 'rt', encoding='utf-8')
+        if self.codec == 'zstd':
+            return io.TextIOWrapper(self._module.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True),
+                                    encoding='utf-8')
+        if self.codec == 'lz4':
+            return self._module.open(path, 'rt', encoding='utf-8')
+        return open(path, 'r', encoding='utf-8')
+
+    def close(self):
+        """ Wait for any pending writes to complete and stop the background thread.
+        Raises the first error encountered by the background thread, if any.
+        """
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._queue = None
+        self._raise_error()
+
+    def _write_file(self, path, data):
+        with _OutputStream(self._open_raw(self.path(path))) as stream:
+            stream.write(data)
+
+    def _open_raw(self, path):
+        raw = open(path, 'wb', buffering=self.buffer_size)
+        if self.codec == 'gzip':
+            return gzip.GzipFile(filename='', fileobj=raw, mode='wb', mtime=0,
+                                 compresslevel=self.level if self.level is not None else 6), raw
+        if self.codec == 'zstd':
+            compressor = self._module.ZstdCompressor(level=self.level if self.level is not None else 3)
+            return compressor.stream_writer(raw, closefd=False), raw
+        if self.codec == 'lz4':
+            return self._module.LZ4FrameFile(raw, mode='wb',
+                                             compression_level=self.level if self.level is not None else 0), raw
+        return raw, None
+
+    def _submit(self, job):
+        self._raise_error()
+        self._queue.put(job)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if self._error is None:
+                try:
+                    job()
+                except Exception as ex:
+                    self._error = ex
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+
+class _OutputStream:
+    """ A (possibly compressing) output stream over a raw file.
+    """
+
+    def __init__(self, streams):
+        self._stream, self._raw = streams
+
+    def write(self, data):
+        self._stream.write(data.encode('utf-8') if isinstance(data, str) else data)
+
+    def close(self):
+        self._stream.close()
+        if self._raw:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ThreadedStream:
+    """ An output stream whose writes are applied on the compression thread.
+    """
+
+    def __init__(self, compression: OutputCompression, stream: _OutputStream):
+        self._compression = compression
+        self._stream = stream
+
+    def write(self, data):
+        self._compression._submit(lambda: self._stream.write(data))
+
+    def close(self):
+        self._compression._submit(self._stream.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _load_module(codec):
+    if codec == 'zstd':
+        try:
+            import zstandard
+            return zstandard
+        except ImportError:
+            raise ValueError('zstd compression requires the zstandard package')
+    if codec == 'lz4':
+        try:
+            import lz4.frame
+            return lz4.frame
+        except ImportError:
+            raise ValueError('lz4 compression requires the lz4 package')
+    return None
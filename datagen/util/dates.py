@@ -0,0 +1,101 @@
+"""
+Dates as integer day ordinals (see datetime.date.toordinal), with a bounded cache of the date
+objects and their ISO strings.
+
+A run only uses a few thousand distinct dates (birth dates, entry dates, test dates) but millions
+of records refer to them. Random dates are drawn as integer day offsets from a start date, and the
+date object for a day is created (and formatted) only once; records share the cached objects.
+"""
+import datetime
+import random
+
+
+class DateTable:
+    """
+    Cache of ordinals, date objects and ISO strings. Each cache is cleared when it reaches max_size.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._ordinals = {}
+        self._dates = {}
+        self._isos = {}
+
+    def ordinal(self, year: int, month: int = 1, day: int = 1) -> int:
+        """
+        :return: ordinal of the given date
+        """
+        key = (year, month, day)
+        value = self._ordinals.get(key)
+        if value is None:
+            if len(self._ordinals) >= self.max_size:
+                self._ordinals.clear()
+            value = self._ordinals[key] = datetime.date(year, month, day).toordinal()
+        return value
+
+    def date(self, ordinal: int) -> datetime.date:
+        """
+        :return: date for the given ordinal
+        """
+        value = self._dates.get(ordinal)
+        if value is None:
+            if len(self._dates) >= self.max_size:
+                self._dates.clear()
+            value = self._dates[ordinal] = datetime.date.fromordinal(ordinal)
+        return value
+
+    def get(self, year: int, month: int = 1, day: int = 1) -> datetime.date:
+        """
+        :return: date object for the given date
+        """
+        return self.date(self.ordinal(year, month, day))
+
+    def offset(self, value: datetime.date, days: int) -> datetime.date:
+        """
+        :return: date that is the given number of days after (or before) the given date
+        """
+        return self.date(value.toordinal() + days)
+
+    def random_dates(self, start: int, low: int, high: int, n: int) -> [datetime.date]:
+        """ Draw dates uniformly from a range of days.
+
+        :param start: ordinal of the start date
+        :param low: min day offset from the start date
+        :param high: max day offset from the start date (inclusive)
+        :param n: number of dates
+        :return: list of dates
+        """
+        return [self.date(start + offset) for offset in random.choices(range(low, high + 1), k=n)]
+
+    def iso(self, value) -> str:
+        """ Format a date in ISO format (YYYY-MM-DD), the same as value.isoformat().
+        Dates are cached; datetimes (which are rarely repeated) are just formatted.
+
+        :param value: date, datetime or None
+        :return: ISO string, None if value is None
+        """
+        if value is None:
+            return None
+        if type(value) is not datetime.date:
+            return value.isoformat()
+        iso = self._isos.get(value)
+        if iso is None:
+            if len(self._isos) >= self.max_size:
+                self._isos.clear()
+            iso = self._isos[value] = value.isoformat()
+        return iso
+
+    def clear(self):
+        self._ordinals.clear()
+        self._dates.clear()
+        self._isos.clear()
+
+
+def weekday(ordinal: int) -> int:
+    """
+    :return: day of the week of the ordinal, Monday is 0 and Sunday is 6 (as date.weekday)
+    """
+    return (ordinal + 6) % 7
+
+
+DATES = DateTable()
@@ -2,14 +2,20 @@
 This module provides utility functions for hierarchy operations.
 """
 
+import copy
 import csv
+import hashlib
+import json
+import os
 import random
 
+import datagen.config.cfg as cfg
 import datagen.config.hierarchy as hier_config
 import datagen.config.population as pop_config
 import datagen.config.state_types as state_config
 import datagen.generators.hierarchy as hier_gen
 from datagen.model.district import District
+from datagen.model.districtgroup import DistrictGroup
 from datagen.model.school import School
 from datagen.model.state import State
 from datagen.util.id_gen import IDGen
@@ -19,6 +25,12 @@ CsvFieldNames = [
     'district_id', 'district_name', 'district_type',
     'school_id', 'school_name', 'school_type', 'school_interims'
 ]
+# the district's group, empty if the district is directly under the state; optional when reading
+GroupFieldNames = ['district_group_id', 'district_group_name']
+GuidFieldNames = ['state_guid', 'district_group_guid', 'district_guid', 'school_guid']
+
+# the most errors listed when reading an invalid hierarchy
+MAX_ERRORS = 20
 
 
 def convert_config_school_count_to_ratios(config):
@@ -39,13 +51,39 @@ def convert_config_school_count_to_ratios(config):
         config['school_types_and_ratios'][st] = count / ratio_count
 
 
-def generate_hierarchy(type, name, code, id_gen: IDGen):
+def generate_hierarchy(type, name, code, id_gen: IDGen, seed=None):
+    """
+    Generate a state's hierarchy.
+
+    :param type: state type, e.g. california
+    :param name: state name
+    :param code: state code
+    :param id_gen: id generator
+    :param seed: random seed, to generate the same hierarchy (apart from GUIDs) every time;
+                 the random generator's state is restored afterwards
+    :return: state, districts, schools
+    """
+    if seed is not None:
+        random_state = random.getstate()
+        random.seed(seed)
+        try:
+            return generate_hierarchy(type, name, code, id_gen)
+        finally:
+            random.setstate(random_state)
+
     state = hier_gen.generate_state(type, name, code, id_gen)
     districts = []
     schools = []
+
+    # optionally, put (most) districts in groups
+    group_count, group_rate = state.config.get('district_groups', (0, 0.0))
+    groups = [hier_gen.generate_district_group(state, id_gen) for _ in range(group_count)]
+
     for district_type, dist_type_count in state.config['district_types_and_counts']:
         for _ in range(dist_type_count):
             district = hier_gen.generate_district(district_type, state, id_gen)
+            if groups and random.random() < group_rate:
+                district.group = random.choice(groups)
             districts.append(district)
 
             # Create the schools for the district
@@ -62,45 +100,206 @@ def generate_hierarchy(type, name, code, id_gen: IDGen):
     return state, districts, schools
 
 
-def write_hierarchy(file: str, schools: [School]):
-    with open(file, "w") as f:
-        writer = csv.DictWriter(f, CsvFieldNames)
+def cached_hierarchy(cache_dir: str, type, name, code, id_gen: IDGen, seed=None) -> (State, [District], [School]):
+    """
+    Generate a state's hierarchy, or load it from the cache if it was generated before.
+    The cache is a folder of hierarchy CSV files (with GUIDs) named for their key, see hierarchy_cache_key,
+    so a cached hierarchy keeps its ids and GUIDs from run to run.
+
+    :param cache_dir: cache folder, created if necessary
+    :param type: state type, e.g. california
+    :param name: state name
+    :param code: state code
+    :param id_gen: id generator
+    :param seed: random seed, see generate_hierarchy
+    :return: state, districts, schools
+    """
+    file = os.path.join(cache_dir, hierarchy_cache_key(type, name, code, seed) + '.csv')
+    if os.path.isfile(file):
+        print('Loading cached hierarchy {}'.format(file))
+        with open(file) as f:
+            return hierarchy_from_rows(csv.DictReader(f), first_line=2)
+
+    state, districts, schools = generate_hierarchy(type, name, code, id_gen, seed)
+    os.makedirs(cache_dir, exist_ok=True)
+    # write and rename, so a concurrent run never reads a partial file
+    tmp_file = '{}.{}'.format(file, os.getpid())
+    with open(tmp_file, 'w') as f:
+        writer = csv.DictWriter(f, CsvFieldNames + GroupFieldNames + GuidFieldNames)
         writer.writeheader()
         for school in schools:
-            writer.writerow(_school_to_row(school))
+            writer.writerow(school_to_row(school))
+    os.replace(tmp_file, file)
+    print('Cached generated hierarchy {}'.format(file))
+    return state, districts, schools
+
+
+def hierarchy_cache_key(type, name, code, seed) -> str:
+    """
+    The key of a generated hierarchy: a hash of the arguments and of the configuration used to generate it,
+    so changing the configuration (e.g. the district types and counts of the state type) changes the key.
+
+    :return: key, e.g. california-3f786850e387550fdab836ed7e6dc881de23001b
+    """
+    district_types = copy.deepcopy(hier_config.DISTRICT_TYPES)
+    for config in district_types.values():
+        # generating converts these in place, so hash them converted
+        convert_config_school_count_to_ratios(config)
+    content = json.dumps({'args': [type, name, code, seed],
+                          'state_type': state_config.STATE_TYPES.get(type),
+                          'district_types': district_types,
+                          'school_types': hier_config.SCHOOL_TYPES,
+                          'interim_asmt_rate': cfg.INTERIM_ASMT_RATE}, sort_keys=True, default=str)
+    return '{}-{}'.format(type, hashlib.sha1(content.encode('utf-8')).hexdigest())
+
+
+def write_hierarchy(file: str, schools: [School]):
+    with HierarchyWriter(file) as writer:
+        writer.write(schools)
+
+
+class HierarchyWriter:
+    """
+    Writes a hierarchy CSV incrementally: schools are appended as they are written, and a school
+    that is already in the file is skipped.
+    """
+
+    def __init__(self, file: str, append: bool = False):
+        """
+        :param file: file name
+        :param append: True to append to the file if it exists, False to overwrite it
+        """
+        self._school_ids = set()
+        header = append and os.path.isfile(file) and os.path.getsize(file) > 0
+        if header:
+            with open(file) as f:
+                reader = csv.DictReader(f)
+                if reader.fieldnames != CsvFieldNames + GroupFieldNames:
+                    raise ValueError("Can't append to '{}', expected fieldnames {}"
+                                     .format(file, CsvFieldNames + GroupFieldNames))
+                self._school_ids.update(row['school_id'] for row in reader)
+        self._file = open(file, 'a' if header else 'w')
+        self._writer = csv.DictWriter(self._file, CsvFieldNames + GroupFieldNames)
+        if not header:
+            self._writer.writeheader()
+
+    def write(self, schools: [School]):
+        for school in schools:
+            if school.id not in self._school_ids:
+                self._school_ids.add(school.id)
+                self._writer.writerow(_school_to_row(school))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
 
 def read_hierarchy(file: str) -> (State, [District], [School]):
-    state = None
-    districts = []
-    schools = []
+    """
+    Read a hierarchy CSV. The rows are streamed, and may be in any order.
 
-    district = None     # current district
-    school = None
+    :param file: file name
+    :return: state, districts, schools
+    :raises ValueError: if the file is invalid, listing all the errors found
+    """
     with open(file) as f:
         reader = csv.DictReader(f)
-        if len(set(CsvFieldNames).difference(reader.fieldnames)) > 0:
+        if not reader.fieldnames or len(set(CsvFieldNames).difference(reader.fieldnames)) > 0:
             raise ValueError("Invalid fieldnames, expected " + str(CsvFieldNames))
 
-        for row in reader:
-            old_state = state
-            state, new_state = _extract_state(row, state)
-            if old_state and new_state:
-                raise ValueError("State mismatch, it must be the same for all rows")
+        # the first row is on line 2, after the header
+        return hierarchy_from_rows(reader, first_line=2)
 
-            district, new_district = _extract_district(row, district, state)
-            if new_district:
-                districts.append(district)
 
-            school, new_school = _extract_school(row, school, district)
-            if new_school:
-                schools.append(school)
+def hierarchy_from_rows(rows, first_line: int = 1) -> (State, [District], [School]):
+    """
+    Build the hierarchy from rows (dicts) with the CsvFieldNames fields, in any order.
+    Districts and schools are indexed by id; a row for a school that was already read is ignored.
+    A district is in a group if the rows have (non-empty) GroupFieldNames fields, groups are indexed by id too.
+    If the rows have the GuidFieldNames fields they are used, otherwise new GUIDs are assigned.
 
-    return state, districts, schools
+    All rows are validated before failing, so all errors are reported at once.
+
+    :param rows: iterable of rows
+    :param first_line: line number of the first row, for error messages
+    :return: state, districts, schools (in the order they first appear)
+    :raises ValueError: if any row is invalid, listing all the errors
+    """
+    state = None
+    state_key = None
+    groups = {}         # by id
+    districts = {}      # by id, False if invalid
+    schools = {}        # by id, False if invalid
+    errors = []
+
+    for line, row in enumerate(rows, start=first_line):
+        key = (row['state_id'], row['state_code'], row['state_name'], row['state_type'])
+        if state_key is None:
+            state_key = key
+            state = _try(_new_state, errors, line, row)
+        elif key != state_key:
+            errors.append('line {}: State mismatch, it must be the same for all rows'.format(line))
+            continue
+        if not state:
+            continue
+
+        group = None
+        group_id = row.get('district_group_id')
+        if group_id:
+            group = groups.get(group_id)
+            if group is None:
+                group = groups[group_id] = _new_group(row, state)
+            elif group.name != row.get('district_group_name'):
+                errors.append("line {}: District group '{}' doesn't match an earlier row".format(line, group.id))
+                continue
+
+        district = districts.get(row['district_id'])
+        if district is None:
+            district = districts[row['district_id']] = _try(_new_district, errors, line, row, state)
+            if district:
+                district.group = group
+        elif district and (district.type_str != row['district_type'] or district.name != row['district_name']
+                           or district.group is not group):
+            errors.append("line {}: District '{}' doesn't match an earlier row".format(line, district.id))
+            continue
+        if not district:
+            continue
+
+        school = schools.get(row['school_id'])
+        if school is None:
+            schools[row['school_id']] = _try(_new_school, errors, line, row, district)
+        elif school and (school.district is not district or school.type_str != row['school_type']
+                         or school.name != row['school_name']):
+            errors.append("line {}: School '{}' doesn't match an earlier row".format(line, school.id))
+
+    if errors:
+        raise ValueError('Invalid hierarchy, {} errors:\n  '.format(len(errors)) + '\n  '.join(
+            errors[:MAX_ERRORS] + (['...'] if len(errors) > MAX_ERRORS else [])))
+
+    return state, [d for d in districts.values() if d], [s for s in schools.values() if s]
+
+
+def school_to_row(school: School) -> dict:
+    """
+    :return: row with the CsvFieldNames, GroupFieldNames and GuidFieldNames fields
+    """
+    row = _school_to_row(school)
+    row['state_guid'] = school.district.state.guid
+    row['district_group_guid'] = school.district.group.guid if school.district.group else None
+    row['district_guid'] = school.district.guid
+    row['school_guid'] = school.guid
+    return row
 
 
 def _school_to_row(school: School) -> dict:
     district = school.district
+    group = district.group
     state = district.state
 
     return {
@@ -114,66 +313,77 @@ def _school_to_row(school: School) -> dict:
         'school_id': school.id,
         'school_name': school.name,
         'school_type': school.type_str,
-        'school_interims': school.takes_interim_asmts
+        'school_interims': school.takes_interim_asmts,
+        'district_group_id': group.id if group else None,
+        'district_group_name': group.name if group else None
     }
 
 
-def _extract_state(row: dict, cur: State) -> (State, bool):
+def _try(new, errors: [str], line: int, *args):
+    try:
+        return new(*args)
+    except ValueError as e:
+        errors.append('line {}: {}'.format(line, e))
+        return False
+
+
+def _new_state(row: dict) -> State:
     s = State()
     s.type_str = row['state_type']
     s.id = row['state_id']
     s.code = row['state_code']
     s.name = row['state_name']
 
-    if cur and cur.type_str == s.type_str and cur.id == s.id and cur.code == s.code and cur.name == s.name:
-        return cur, False
-
     if s.type_str not in state_config.STATE_TYPES:
         raise ValueError("State type '" + s.type_str + "' not found")
 
     s.config = state_config.STATE_TYPES[s.type_str]
     s.demo_config = pop_config.DEMOGRAPHICS[s.config['demographics']]
-    s.guid = IDGen.get_uuid()
+    s.guid = row.get('state_guid') or IDGen.get_uuid()
 
-    return s, True
+    return s
 
 
-def _extract_district(row: dict, cur: District, state: State) -> (District, bool):
+def _new_group(row: dict, state: State) -> DistrictGroup:
+    g = DistrictGroup()
+    g.id = row['district_group_id']
+    g.name = row.get('district_group_name')
+    g.state = state
+    g.guid = row.get('district_group_guid') or IDGen.get_uuid()
+
+    return g
+
+
+def _new_district(row: dict, state: State) -> District:
     d = District()
     d.type_str = row['district_type']
     d.id = row['district_id']
     d.name = row['district_name']
 
-    if cur and cur.type_str == d.type_str and cur.id == d.id and cur.name == d.name:
-        return cur, False
-
     if d.type_str not in hier_config.DISTRICT_TYPES:
         raise ValueError("District type '" + d.type_str + "' not found")
 
     d.config = hier_config.DISTRICT_TYPES[d.type_str]
     d.demo_config = state.demo_config
     d.state = state
-    d.guid = IDGen.get_uuid()
+    d.guid = row.get('district_guid') or IDGen.get_uuid()
 
-    return d, True
+    return d
 
 
-def _extract_school(row: dict, cur: School, district: District) -> (School, bool):
+def _new_school(row: dict, district: District) -> School:
     s = School()
     s.type_str = row['school_type']
     s.id = row['school_id']
     s.name = row['school_name']
 
-    if cur and cur.type_str == s.type_str and cur.id == s.id and cur.name == s.name:
-        return cur, False
-
     if s.type_str not in hier_config.SCHOOL_TYPES:
         raise ValueError("School type '" + s.type_str + "' not found")
 
     s.config = hier_config.SCHOOL_TYPES[s.type_str]
     s.demo_config = district.demo_config
     s.district = district
-    s.guid = IDGen.get_uuid()
+    s.guid = row.get('school_guid') or IDGen.get_uuid()
     s.takes_interim_asmts = str(row['school_interims']).lower() in ['1', 't', 'y', 'true', 'yes']
 
-    return s, True
+    return s
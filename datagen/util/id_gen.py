@@ -3,14 +3,13 @@ Generate IDs that conform to student registration (SBAC) requirements.
 
 """
 
-import multiprocessing
-
+import threading
 from random import randrange
 from uuid import uuid4
 
 
 class IDGen():
-    def __init__(self, lock=multiprocessing.Lock()):
+    def __init__(self, lock=threading.Lock()):
         self._rec_id_lock = lock
         self._rec_id_dict = {}
 
@@ -30,6 +29,23 @@ class IDGen():
             self._rec_id_dict[type_str] += inc
         return nid
 
+    def __get_next_rec_ids(self, type_str, count, init=1000000000, inc=1):
+        """
+        Safely reserve a block of ids.
+
+        :param type_str: label for id, e.g. 'student'
+        :param count: number of ids
+        :param init: initial value for id
+        :param inc: id increment
+        :return: range of the ids
+        """
+        with self._rec_id_lock:
+            if type_str not in self._rec_id_dict:
+                self._rec_id_dict[type_str] = init
+            nid = self._rec_id_dict[type_str]
+            self._rec_id_dict[type_str] += inc * count
+        return range(nid, nid + inc * count, inc)
+
     def get_rec_id(self, type_str):
         """
         Get the next integer record ID within the system for the given type string.
@@ -39,6 +55,16 @@ class IDGen():
         """
         return self.__get_next_rec_id(type_str)
 
+    def get_rec_ids(self, type_str, count):
+        """
+        Get a block of the next integer record IDs for the given type string, in a single call.
+
+        @param type_str: The type string to get record IDs for
+        @param count: The number of IDs
+        @returns: range of the IDs
+        """
+        return self.__get_next_rec_ids(type_str, count)
+
     def get_group_id(self, type_str):
         """
         Helper to get group id: starts at 100 and increments by 100.
@@ -48,6 +74,16 @@ class IDGen():
         """
         return self.__get_next_rec_id(type_str, 100, 100)
 
+    def get_group_ids(self, type_str, count):
+        """
+        Get a block of the next group ids (see get_group_id) in a single call.
+
+        @param type_str: The type string to get group IDs for
+        @param count: The number of IDs
+        @returns: range of the IDs
+        """
+        return self.__get_next_rec_ids(type_str, count, 100, 100)
+
     def get_district_id(self, state_id):
         """
         Get the next district id, based on next record id for districts.
@@ -61,6 +97,16 @@ class IDGen():
         """
         return "{s}{d:05}".format(s=state_id, d=self.__get_next_rec_id(state_id, 1))
 
+    def get_district_group_id(self, state_id):
+        """
+        Get the next district group id. There is no NCES scheme for these, so the format is the
+        2 digit state code, a G and a 4 digit unique-within-state id, e.g. 06G0001.
+
+        :param state_id: group's state's id
+        :return: next district group id
+        """
+        return "{s}G{g:04}".format(s=state_id, g=self.__get_next_rec_id(state_id + 'G', 1))
+
     def get_school_id(self, district_id):
         """
         Get the next school id. For NCES, the school id is the district id plus a 5 digit number.
@@ -0,0 +1,261 @@
+"""
+A client for the RDW import service, i.e. the equivalent of scripts/submit_xml.sh:
+
+    curl -X POST --header "Authorization:Bearer ${ACCESS_TOKEN}" -F file=@"${xml}" ${HOST}/exams/imports
+
+Connections are kept alive and pooled so a submission doesn't pay for a new TCP (and TLS) connection;
+the client is thread-safe, with at most pool_size connections open at a time. Failed submissions
+(connection errors, 429 and 5xx responses) are retried with exponential backoff. A 401 response
+refreshes the access token and resubmits.
+"""
+import http.client
+import json
+import posixpath
+import queue
+import threading
+import time
+import urllib.parse
+import uuid
+
+# the token accepted by the "stub" token service used in development environments
+STUB_TOKEN = 'sbac;dwtest@example.com;|SBAC|ASMTDATALOAD|CLIENT|SBAC||||||||||||||'
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class ImportResult:
+    __slots__ = ('file', 'id', 'status', 'http_status', 'attempts', 'elapsed', 'error')
+
+    def __init__(self, file):
+        self.file = file
+        self.id = None
+        self.status = None
+        self.http_status = None
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.http_status is not None and 200 <= self.http_status < 300
+
+    def to_dict(self):
+        return {'file': self.file, 'id': self.id, 'status': self.status, 'http_status': self.http_status,
+                'attempts': self.attempts, 'elapsed': round(self.elapsed, 4), 'error': self.error}
+
+
+class TokenProvider:
+    """
+    Supplies the bearer token. Either a fixed token, or one fetched from an OAuth2 token endpoint
+    using the given form data (e.g. grant_type=password&username=...&client_id=...), which is
+    refreshed when it expires or when the import service rejects it.
+    """
+
+    def __init__(self, token: str = STUB_TOKEN, token_url: str = None, token_data: str = None,
+                 refresh_margin: float = 30.0):
+        """
+        :param token: fixed access token, used if there is no token_url
+        :param token_url: OAuth2 token endpoint
+        :param token_data: url-encoded form data posted to the token endpoint
+        :param refresh_margin: seconds before expiry at which the token is refreshed
+        """
+        self.token_url = token_url
+        self.token_data = token_data
+        self.refresh_margin = refresh_margin
+        self._token = token if not token_url else None
+        self._expires = None
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        with self._lock:
+            if self._token is None or (self._expires is not None and time.monotonic() >= self._expires):
+                self._fetch()
+            return self._token
+
+    def refresh(self, rejected: str):
+        """ Refresh the token after it was rejected; a no-op if another thread already refreshed it.
+        """
+        with self._lock:
+            if self.token_url and self._token == rejected:
+                self._fetch()
+
+    def _fetch(self):
+        url = urllib.parse.urlsplit(self.token_url)
+        conn = _connection(url)
+        try:
+            conn.request('POST', _request_path(url), body=(self.token_data or '').encode('utf-8'),
+                         headers={'Content-Type': 'application/x-www-form-urlencoded'})
+            response = conn.getresponse()
+            body = response.read()
+            if response.status != 200:
+                raise ValueError('Token request failed: {} {}'.format(response.status, body[:200]))
+        finally:
+            conn.close()
+        data = json.loads(body.decode('utf-8'))
+        if not isinstance(data, dict) or not data.get('access_token'):
+            raise ValueError('Token response has no access_token: {}'.format(body[:200]))
+        self._token = data['access_token']
+        expires_in = data.get('expires_in')
+        self._expires = time.monotonic() + float(expires_in) - self.refresh_margin if expires_in else None
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of keep-alive connections to a single host.
+    """
+
+    def __init__(self, url: str, size: int = 8, timeout: float = 60.0):
+        self.url = urllib.parse.urlsplit(url)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self) -> http.client.HTTPConnection:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return _connection(self.url, self.timeout)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn: http.client.HTTPConnection, reuse: bool = True):
+        if reuse:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class ImportClient:
+    def __init__(self, url: str, tokens: TokenProvider = None, pool_size: int = 8, retries: int = 3,
+                 backoff: float = 0.5, timeout: float = 60.0):
+        """
+        :param url: import endpoint, e.g. http://localhost:8080/exams/imports
+        :param tokens: access token provider, defaults to the stub token
+        :param pool_size: max number of open connections (and so concurrent requests)
+        :param retries: max number of retries for a failed submission
+        :param backoff: delay (seconds) before the first retry, doubled for each subsequent retry
+        :param timeout: socket timeout (seconds)
+        """
+        split = urllib.parse.urlsplit(url)
+        if split.scheme not in ('http', 'https'):
+            raise ValueError("Unsupported URL scheme '{}' (expected http or https): {}".format(split.scheme, url))
+        self.url = url
+        self.path = _request_path(split)
+        self.tokens = tokens if tokens else TokenProvider()
+        self.pool = ConnectionPool(url, pool_size, timeout)
+        self.retries = retries
+        self.backoff = backoff
+
+    def submit(self, file: str, data) -> ImportResult:
+        """ Submit a file, retrying as necessary. This doesn't raise, failures are reported in the result.
+
+        :param file: file name (path) of the submission; only the base name is sent to the import service
+        :param data: file content, str or bytes
+        :return: result of the submission
+        """
+        result = ImportResult(file)
+        content_type, body = multipart_body('file', posixpath.basename(file), data)
+        start = time.perf_counter()
+        token_refreshed = False
+        rejected = None
+        while True:
+            result.attempts += 1
+            try:
+                if rejected is not None:
+                    self.tokens.refresh(rejected)
+                    rejected = None
+                token = self.tokens.get()
+                result.http_status, response = self._post(body, content_type, token)
+                result.error = None
+            except (OSError, ValueError, http.client.HTTPException) as ex:
+                result.http_status, response = None, None
+                result.error = '{}: {}'.format(type(ex).__name__, ex)
+
+            if result.http_status == 401 and not token_refreshed and self.tokens.token_url:
+                # refreshed (in the try) before the next attempt, so a failing token endpoint is reported too
+                rejected = token
+                token_refreshed = True
+                continue
+            if (result.http_status is None or result.http_status in RETRY_STATUS) and result.attempts <= self.retries:
+                time.sleep(self.backoff * 2 ** (result.attempts - 1))
+                continue
+            break
+
+        result.elapsed = time.perf_counter() - start
+        if response is not None:
+            _parse_response(result, response)
+        return result
+
+    def close(self):
+        self.pool.close()
+
+    def _post(self, body, content_type, token):
+        conn = self.pool.acquire()
+        reuse = False
+        try:
+            conn.request('POST', self.path, body=body, headers={
+                'Authorization': 'Bearer ' + token,
+                'Content-Type': content_type,
+            })
+            response = conn.getresponse()
+            data = response.read()
+            reuse = not response.will_close
+            return response.status, data
+        finally:
+            self.pool.release(conn, reuse)
+
+
+def multipart_body(field: str, file: str, data) -> (str, bytes):
+    """ Encode a single file as multipart/form-data, the same as curl -F field=@file
+
+    :return: content type (with boundary), body
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        '--{}\r\n'.format(boundary).encode('ascii'),
+        'Content-Disposition: form-data; name="{}"; filename="{}"\r\n'.format(field, file).encode('utf-8'),
+        b'Content-Type: application/xml\r\n\r\n',
+        data,
+        '\r\n--{}--\r\n'.format(boundary).encode('ascii'),
+    ])
+    return 'multipart/form-data; boundary=' + boundary, body
+
+
+def _parse_response(result: ImportResult, response: bytes):
+    try:
+        data = json.loads(response.decode('utf-8'))
+    except ValueError:
+        if not result.ok and not result.error:
+            result.error = response[:200].decode('utf-8', 'replace')
+        return
+    if isinstance(data, dict):
+        result.id = data.get('id')
+        result.status = data.get('status')
+        if not result.ok and not result.error:
+            result.error = data.get('message') or data.get('error')
+
+
+def _request_path(url: urllib.parse.SplitResult) -> str:
+    return (url.path or '/') + ('?' + url.query if url.query else '')
+
+
+def _connection(url: urllib.parse.SplitResult, timeout: float = 60.0) -> http.client.HTTPConnection:
+    if url.scheme == 'https':
+        return http.client.HTTPSConnection(url.hostname, url.port, timeout=timeout)
+    if url.scheme == 'http':
+        return http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+    raise ValueError("Unsupported URL scheme '{}' (expected http or https)".format(url.scheme))
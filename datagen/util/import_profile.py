@@ -0,0 +1,129 @@
+"""
+Profile the start up of a run: the time spent importing modules, summarised per datagen module.
+
+Python's -X importtime reports every module imported, with its own time and its time including the modules it
+imports. The profile runs a fresh interpreter (so nothing is imported yet) and attributes the modules outside
+datagen (standard library and third party) to the datagen module that imported them, so it shows what each
+datagen module costs every run before anything is generated.
+"""
+import os
+import re
+import subprocess
+import sys
+
+# import time:       self [us] |  cumulative | imported package
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+PACKAGE = 'datagen'
+
+
+class ModuleImport:
+    """
+    The import of a module, as reported by -X importtime.
+    """
+
+    __slots__ = ('name', 'self_us', 'cumulative_us', 'children')
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int):
+        self.name = name
+        self.self_us = self_us                  # importing the module itself, in microseconds
+        self.cumulative_us = cumulative_us      # including the modules it imports (first)
+        self.children = []                      # the modules it imports (first)
+
+    @property
+    def in_package(self) -> bool:
+        return self.name == PACKAGE or self.name.startswith(PACKAGE + '.')
+
+
+class ModuleProfile:
+    """
+    The start up cost of a datagen module: its own import and the (outside) modules it imports first.
+    """
+
+    __slots__ = ('name', 'self_us', 'imports_us', 'largest_import')
+
+    def __init__(self, module: ModuleImport):
+        outside = [child for child in module.children if not child.in_package]
+        largest = max(outside, key=lambda child: child.cumulative_us) if outside else None
+        self.name = module.name
+        self.self_us = module.self_us
+        self.imports_us = sum(child.cumulative_us for child in outside)
+        self.largest_import = largest.name if largest else None
+
+    @property
+    def total_us(self) -> int:
+        return self.self_us + self.imports_us
+
+
+def parse_import_times(lines: [str]) -> [ModuleImport]:
+    """
+    Parse the output of -X importtime into a tree.
+
+    :param lines: lines of the output (other lines are ignored)
+    :return: the top level imports, in the order they were imported
+    """
+    # a module is reported after the modules it imports, which are indented one more level
+    pending = []
+    for line in lines:
+        match = IMPORT_TIME.match(line.rstrip())
+        if not match:
+            continue
+        depth = len(match.group(3))
+        module = ModuleImport(match.group(4), int(match.group(1)), int(match.group(2)))
+        while pending and pending[-1][0] > depth:
+            module.children.insert(0, pending.pop()[1])
+        pending.append((depth, module))
+    return [module for _, module in pending]
+
+
+def profile_imports(module: str = 'datagen.generate_data') -> [ModuleImport]:
+    """
+    Import a module in a fresh interpreter, with -X importtime.
+
+    :param module: module to import
+    :return: the top level imports, in the order they were imported
+    """
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            stderr=subprocess.PIPE, env=env, universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError('Importing {} failed:\n{}'.format(module, result.stderr))
+    return parse_import_times(result.stderr.splitlines())
+
+
+def package_profile(imports: [ModuleImport]) -> [ModuleProfile]:
+    """
+    :param imports: the top level imports, see profile_imports
+    :return: the profiles of the datagen modules, the most expensive first
+    """
+    profiles = []
+    stack = list(imports)
+    while stack:
+        module = stack.pop()
+        if module.in_package:
+            profiles.append(ModuleProfile(module))
+            stack.extend(module.children)
+    return sorted(profiles, key=lambda profile: -profile.total_us)
+
+
+def import_profile_report(module: str = 'datagen.generate_data', top: int = 20) -> str:
+    """
+    :param module: module to import, e.g. the script of a run
+    :param top: number of (most expensive) datagen modules to list, None for all
+    :return: the report, e.g. for printing
+    """
+    imports = profile_imports(module)
+    profiles = package_profile(imports)
+    total_us = sum(imported.cumulative_us for imported in imports)
+    package_us = sum(imported.cumulative_us for imported in imports if imported.in_package)
+
+    lines = ['Import profile of {}: {:.1f} ms, {:.1f} ms of it importing {} ({} modules)'.format(
+                 module, total_us / 1000, package_us / 1000, PACKAGE, len(profiles)),
+             '  {:<44} {:>8} {:>10} {:>9}  {}'.format('module', 'self ms', 'imports ms', 'total ms', 'largest import')]
+    for profile in profiles[:top]:
+        lines.append('  {:<44} {:>8.1f} {:>10.1f} {:>9.1f}  {}'.format(
+            profile.name, profile.self_us / 1000, profile.imports_us / 1000, profile.total_us / 1000,
+            profile.largest_import or ''))
+    return '\n'.join(lines)
@@ -0,0 +1,87 @@
+"""
+A registry of items, shared by all the loaded assessment packages.
+
+The same item (bank key and item id) is in many assessments, e.g. in IABs and in the ICA and
+summative of a grade, and packages for several years repeat them again. The registry keeps one
+Item (metadata) per distinct item, and the assessments' AssessmentItems refer to it with their own
+position, segment and operational flag. The metadata strings (types, bank keys, answer keys,
+targets) are shared, and a raw tabulator target is normalized once.
+"""
+from datagen.model.item import Item
+
+
+class ItemRegistry:
+    """
+    Items by bank key and item id, shared strings, and normalized targets by raw target.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._variants = {}
+        self._strings = {}
+        self._targets = {}
+
+    def get(self, bank_key: str, item_key: str, type: str, max_score: int, dok: int, difficulty: float,
+            answer_key: str, options_count: int, target: str) -> Item:
+        """ Get the item with the given metadata, creating it if necessary.
+        An item id with different metadata (e.g. in packages for different years) is a different item.
+
+        :return: item
+        """
+        key = (bank_key, item_key)
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = self._new(bank_key, item_key, type, max_score, dok, difficulty, answer_key,
+                                                options_count, target)
+        elif item.type != type or item.max_score != max_score or item.dok != dok or item.difficulty != difficulty \
+                or item.answer_key != answer_key or item.options_count != options_count or item.target != target:
+            # the few variants are keyed by all their metadata
+            key = (bank_key, item_key, type, max_score, dok, difficulty, answer_key, options_count, target)
+            item = self._variants.get(key)
+            if item is None:
+                item = self._variants[key] = self._new(*key)
+        return item
+
+    def _new(self, bank_key, item_key, type, max_score, dok, difficulty, answer_key, options_count, target) -> Item:
+        item = Item()
+        item.bank_key = self.intern(bank_key)
+        item.item_key = self.intern(item_key)
+        item.type = self.intern(type)
+        item.max_score = max_score
+        item.dok = dok
+        item.difficulty = difficulty
+        item.answer_key = self.intern(answer_key)
+        item.options_count = options_count
+        item.target = self.intern(target)
+        return item
+
+    def intern(self, value: str) -> str:
+        """
+        :return: the registry's copy of the string, None if value is None
+        """
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def target(self, raw: str) -> str:
+        """
+        :param raw: target as in tabulator output, e.g. '3 | G-SRT | A'
+        :return: normalized target, e.g. '3|G-SRT|A'
+        """
+        target = self._targets.get(raw)
+        if target is None:
+            # these are messy in tabulator output so split, strip, rejoin
+            target = self._targets[raw] = self.intern('|'.join(t.strip() for t in raw.split('|')))
+        return target
+
+    def clear(self):
+        self._items.clear()
+        self._variants.clear()
+        self._strings.clear()
+        self._targets.clear()
+
+    def __len__(self):
+        return len(self._items) + len(self._variants)
+
+
+ITEMS = ItemRegistry()
@@ -4,30 +4,53 @@ Define a couple helper classes for name generation.
 """
 
 import random
+from collections import Counter
 
 FREQUENCY_OFFSET = 0.01
 
 
 class PeopleNames():
-    """Singleton Class
+    """Pools of people names, read and generated the first time they are used (not when the module defining
+    them is imported, since that is most of the start up time of a run).
 
     Instance variables:
       - male_names -- list of 1,000,000 male names appearing based on frequency
       - female_names -- list of 1,000,000 female names appearing based on frequency
       - last_names -- list of 1,000,000 last names appearing based on frequency
     """
-    _instance = None
 
-    def __new__(cls, males_first, females_first, all_last, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super(PeopleNames, cls).__new__(cls, *args, **kwargs)
+    def __init__(self, males_first, females_first, all_last):
+        """Constructor
+
+        :param males_first: Path to male first names
+        :param females_first: Path to female first names
+        :param all_last: Path to last names
+        """
+        self._files = (males_first, females_first, all_last)
+        self._names = None
+
+    @property
+    def loaded(self):
+        """True once the names have been read and generated
+        """
+        return self._names is not None
+
+    @property
+    def male_names(self):
+        return self._load()[0]
+
+    @property
+    def female_names(self):
+        return self._load()[1]
 
-            male_list, female_list, last_list = _read_name_files(males_first, females_first, all_last)
+    @property
+    def last_names(self):
+        return self._load()[2]
 
-            cls._instance.male_names = male_list
-            cls._instance.female_names = female_list
-            cls._instance.last_names = last_list
-        return cls._instance
+    def _load(self):
+        if self._names is None:
+            self._names = _read_name_files(*self._files)
+        return self._names
 
 
 class NameInfo():
@@ -130,23 +153,14 @@ def _generate_names(total_num, all_names, scale):
             count += num
 
     # Generate enough people to fill remaining slots (total_num - count)
-    ks = list(generated_names.keys())
-    ks_size = len(ks)
-    add_count = 0
+    ks = list(generated_names.keys()) if generated_names else [name.name for name in all_names]
 
     remaining_slots = total_num - count
 
-    # Fill in remaining open spaces in the array with random names already added
-    if remaining_slots >= 0:
-        for i in range(remaining_slots):
-            rnd_key = ks[random.randint(0, ks_size - 1)] if ks_size > 0 else all_names[
-                random.randint(0, len(all_names) - 1)].name
-
-            if rnd_key in generated_names:
-                generated_names[rnd_key] += 1
-            else:
-                generated_names = 1
-            add_count += 1
+    # Fill in remaining open spaces in the array with random names already added, drawn all at once
+    if remaining_slots > 0:
+        for name, num in Counter(random.choices(ks, k=remaining_slots)).items():
+            generated_names[name] = generated_names.get(name, 0) + num
 
     return generated_names
 
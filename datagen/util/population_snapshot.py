@@ -0,0 +1,297 @@
+"""
+A snapshot of a generated student population, so a later run can generate outcomes (e.g. for new
+assessment packages) without regenerating the hierarchy and the students' multi-year history.
+
+A snapshot is a folder (by default out_dir/population) of Arrow IPC files, which are columnar and
+are memory-mapped when loaded:
+
+    hierarchy.arrow     the schools, with their district and state
+    students.arrow      the students' demographics, one row per student
+    enrollments.arrow   for every year, school and grade, the students with their grade, record id,
+                        capabilities and groups that year
+    population.json     the years, grades and subjects, and the registration systems
+
+Students and enrollments are written in record batches by district and year, so a district's
+population can be loaded without reading (or indexing) the rest of the snapshot.
+
+pyarrow is required; this module is imported only when a snapshot is saved or loaded.
+"""
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import datagen.util.hierarchy as hier_util
+from datagen.model.district import District
+from datagen.model.registrationsystem import RegistrationSystem
+from datagen.model.school import School
+from datagen.model.state import State
+from datagen.model.student import Student
+from datagen.model.studentgroup import StudentGroup
+
+VERSION = 1
+
+HIERARCHY_SCHEMA = pa.schema([(name, pa.bool_() if name == 'school_interims' else pa.string())
+                              for name in hier_util.CsvFieldNames + hier_util.GroupFieldNames
+                              + hier_util.GuidFieldNames])
+
+# the student attributes that don't change from year to year
+STUDENT_FIELDS = [
+    ('guid', pa.string()),
+    ('id', pa.string()),
+    ('external_ssid', pa.string()),
+    ('gender', pa.string()),
+    ('first_name', pa.string()),
+    ('middle_name', pa.string()),
+    ('last_name', pa.string()),
+    ('dob', pa.date32()),
+    ('email', pa.string()),
+    ('address_line_1', pa.string()),
+    ('address_line_2', pa.string()),
+    ('address_city', pa.string()),
+    ('address_zip', pa.int32()),
+    ('eth_white', pa.bool_()),
+    ('eth_black', pa.bool_()),
+    ('eth_hispanic', pa.bool_()),
+    ('eth_asian', pa.bool_()),
+    ('eth_filipino', pa.bool_()),
+    ('eth_pacific', pa.bool_()),
+    ('eth_amer_ind', pa.bool_()),
+    ('eth_multi', pa.bool_()),
+    ('eth_none', pa.bool_()),
+    ('prg_iep', pa.bool_()),
+    ('prg_sec504', pa.bool_()),
+    ('prg_lep', pa.bool_()),
+    ('prg_econ_disad', pa.bool_()),
+    ('school_entry_date', pa.date32()),
+    ('prg_migrant', pa.bool_()),
+    ('prg_idea', pa.bool_()),
+    ('lang_code', pa.string()),
+    ('lang_prof_level', pa.string()),
+    ('lang_title_3_prg', pa.string()),
+    ('prg_lep_entry_date', pa.date32()),
+    ('prg_lep_exit_date', pa.date32()),
+    ('elas', pa.string()),
+    ('elas_start_date', pa.date32()),
+    ('prg_primary_disability', pa.string()),
+    ('military_connected', pa.string()),
+    ('derived_demographic', pa.int32()),
+]
+STUDENT_SCHEMA = pa.schema([('district_guid', pa.string())] + STUDENT_FIELDS)
+
+ENROLLMENT_FIELDS = [
+    ('year', pa.int16()),
+    ('district_guid', pa.string()),
+    ('school_guid', pa.string()),
+    ('grade', pa.int8()),
+    ('student_guid', pa.string()),
+    ('rec_id', pa.int64()),
+    ('held_back', pa.bool_()),
+    ('transfer', pa.bool_()),
+]
+
+
+def _enrollment_schema(subject_codes: [str]) -> pa.Schema:
+    fields = list(ENROLLMENT_FIELDS)
+    for subject_code in subject_codes:
+        fields.append(('capability.' + subject_code, pa.float64()))
+        fields.append(('group_id.' + subject_code, pa.int64()))
+        fields.append(('group_name.' + subject_code, pa.string()))
+    return pa.schema(fields)
+
+
+class PopulationWriter:
+    """
+    Writes a snapshot as the population is generated. Enrollments are buffered and written when a
+    district's year is done (see flush).
+    """
+
+    def __init__(self, path: str, subject_codes: [str]):
+        """
+        :param path: snapshot folder, created if necessary; an existing snapshot is overwritten
+        :param subject_codes: the subjects for which students have capabilities
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.subject_codes = subject_codes
+        self.manifest = {'version': VERSION, 'subjects': subject_codes, 'years': [], 'grades': [],
+                         'registration_systems': {}}
+        self._enrollment_schema = _enrollment_schema(subject_codes)
+        self._students = ipc.new_file(os.path.join(path, 'students.arrow'), STUDENT_SCHEMA)
+        self._enrollments = ipc.new_file(os.path.join(path, 'enrollments.arrow'), self._enrollment_schema)
+        self._student_rows = {name: [] for name in STUDENT_SCHEMA.names}
+        self._enrollment_rows = {name: [] for name in self._enrollment_schema.names}
+        self._written = set()
+        self._grades = set()
+
+    def write_hierarchy(self, schools: [School]):
+        rows = [hier_util.school_to_row(school) for school in schools]
+        for row in rows:
+            row['school_interims'] = bool(row['school_interims'])
+        with ipc.new_file(os.path.join(self.path, 'hierarchy.arrow'), HIERARCHY_SCHEMA) as writer:
+            writer.write_table(pa.Table.from_pylist(rows, schema=HIERARCHY_SCHEMA))
+
+    def write_registration_systems(self, rs_by_year: {int: RegistrationSystem}):
+        self.manifest['years'] = sorted(rs_by_year)
+        self.manifest['registration_systems'] = {str(year): vars(rs) for year, rs in rs_by_year.items()}
+
+    def add_enrollment(self, year: int, school: School, grade: int, students: [Student]):
+        """ Record the students in a school grade for a year, as they are that year.
+        """
+        self._grades.add(grade)
+        rows = self._enrollment_rows
+        district_guid = school.district.guid
+        for student in students:
+            if student.guid not in self._written:
+                self._written.add(student.guid)
+                self._add_student(student, district_guid)
+            rows['year'].append(year)
+            rows['district_guid'].append(district_guid)
+            rows['school_guid'].append(school.guid)
+            rows['grade'].append(grade)
+            rows['student_guid'].append(student.guid)
+            rows['rec_id'].append(student.rec_id)
+            rows['held_back'].append(student.held_back)
+            rows['transfer'].append(student.transfer)
+            for subject_code in self.subject_codes:
+                group = student.groups.get(subject_code)
+                rows['capability.' + subject_code].append(student.capability.get(subject_code))
+                rows['group_id.' + subject_code].append(group.id if group else None)
+                rows['group_name.' + subject_code].append(group.name if group else None)
+
+    def _add_student(self, student: Student, district_guid: str):
+        rows = self._student_rows
+        rows['district_guid'].append(district_guid)
+        for name, _ in STUDENT_FIELDS:
+            rows[name].append(getattr(student, name))
+
+    def flush(self):
+        """ Write the buffered students and enrollments as record batches; call after each district's year.
+        """
+        if self._student_rows['guid']:
+            self._students.write_batch(pa.record_batch(list(self._student_rows.values()), schema=STUDENT_SCHEMA))
+            self._student_rows = {name: [] for name in STUDENT_SCHEMA.names}
+        if self._enrollment_rows['year']:
+            self._enrollments.write_batch(pa.record_batch(list(self._enrollment_rows.values()),
+                                                          schema=self._enrollment_schema))
+            self._enrollment_rows = {name: [] for name in self._enrollment_schema.names}
+
+    def close(self):
+        self.flush()
+        self._students.close()
+        self._enrollments.close()
+        self.manifest['grades'] = sorted(self._grades)
+        with open(os.path.join(self.path, 'population.json'), 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+
+
+class PopulationReader:
+    """
+    Loads a snapshot. The files are memory-mapped, and students are loaded by district as they are needed.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: snapshot folder
+        """
+        manifest_file = os.path.join(path, 'population.json')
+        if not os.path.isfile(manifest_file):
+            raise ValueError("No population snapshot found in '{}'".format(path))
+        with open(manifest_file) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != VERSION:
+            raise ValueError("Unsupported population snapshot version '{}' in '{}'"
+                             .format(self.manifest.get('version'), path))
+        self.path = path
+        self.years = self.manifest['years']
+        self.grades = set(self.manifest['grades'])
+        self.subject_codes = self.manifest['subjects']
+
+        self._students = self._open('students.arrow')
+        self._enrollments = self._open('enrollments.arrow')
+        # record batches by district (students) and by district and year (enrollments)
+        self._student_batches = {}
+        for i in range(self._students.num_record_batches):
+            batch = self._students.get_batch(i)
+            self._student_batches.setdefault(batch.column(0)[0].as_py(), []).append(i)
+        self._enrollment_batches = {}
+        for i in range(self._enrollments.num_record_batches):
+            batch = self._enrollments.get_batch(i)
+            key = (batch.column('district_guid')[0].as_py(), batch.column('year')[0].as_py())
+            self._enrollment_batches.setdefault(key, []).append(i)
+
+        self._schools = {}
+        self._district = None
+        self._district_students = {}
+
+    def _open(self, name):
+        return ipc.open_file(pa.memory_map(os.path.join(self.path, name)))
+
+    def hierarchy(self) -> (State, [District], [School]):
+        """
+        :return: state, districts, schools (with the GUIDs they had when the snapshot was saved)
+        """
+        table = self._open('hierarchy.arrow').read_all()
+        state, districts, schools = hier_util.hierarchy_from_rows(table.to_pylist())
+        self._schools = {school.guid: school for school in schools}
+        return state, districts, schools
+
+    def registration_systems(self) -> {int: RegistrationSystem}:
+        rs_by_year = {}
+        for year, values in self.manifest['registration_systems'].items():
+            rs = RegistrationSystem()
+            for name, value in values.items():
+                setattr(rs, name, value)
+            rs_by_year[int(year)] = rs
+        return rs_by_year
+
+    def enrollments(self, district: District, year: int, reg_sys: RegistrationSystem = None) -> {School: {int: [Student]}}:
+        """ Load the students of a district for a year, as they were that year. Call hierarchy first.
+        A student is the same object in every year, so (as when generating) load the years in order.
+
+        :param district: district
+        :param year: year
+        :param reg_sys: registration system to set for the students
+        :return: dict of school to dict of grade to list of students, in the order they were saved
+        """
+        if district.guid != self._district:
+            self._load_students(district)
+
+        schools_with_grades = {}
+        groups = {}
+        for i in self._enrollment_batches.get((district.guid, year), []):
+            columns = self._enrollments.get_batch(i).to_pydict()
+            for j, student_guid in enumerate(columns['student_guid']):
+                student = self._district_students[student_guid]
+                student.school = self._schools[columns['school_guid'][j]]
+                student.grade = columns['grade'][j]
+                student.rec_id = columns['rec_id'][j]
+                student.held_back = columns['held_back'][j]
+                student.transfer = columns['transfer'][j]
+                student.reg_sys = reg_sys
+                student.groups = {}
+                for subject_code in self.subject_codes:
+                    capability = columns['capability.' + subject_code][j]
+                    if capability is not None:
+                        student.capability[subject_code] = capability
+                    group_id = columns['group_id.' + subject_code][j]
+                    if group_id is not None:
+                        key = (subject_code, group_id)
+                        if key not in groups:
+                            groups[key] = StudentGroup(subject_code, group_id, columns['group_name.' + subject_code][j])
+                        student.groups[subject_code] = groups[key]
+                schools_with_grades.setdefault(student.school, {}).setdefault(student.grade, []).append(student)
+        return schools_with_grades
+
+    def _load_students(self, district: District):
+        self._district = district.guid
+        self._district_students = {}
+        for i in self._student_batches.get(district.guid, []):
+            for row in self._students.get_batch(i).to_pylist():
+                student = Student()
+                for name, _ in STUDENT_FIELDS:
+                    setattr(student, name, row[name])
+                student.district = district
+                student.state = district.state
+                self._district_students[student.guid] = student
@@ -0,0 +1,264 @@
+"""
+Replay generated TRT files against the import service, for load testing.
+
+Files are read from an output folder (STATE/DISTRICT/SCHOOL/*.xml, compressed files are
+decompressed) or from an archive of one (tar, optionally compressed, or zip). They are submitted
+with asyncio: a scheduler releases files at the target rate and a fixed number of workers, each
+with its own keep-alive connection, post them. Unlike the ImportClient, failed submissions are
+not retried; they are counted so the error rate can be reported with the latencies.
+"""
+import asyncio
+import bisect
+import glob
+import gzip
+import math
+import os
+import tarfile
+import time
+import urllib.parse
+import zipfile
+
+from datagen.util.compression import EXTENSIONS, OutputCompression
+from datagen.util.import_client import TokenProvider, multipart_body
+
+# latency histogram bucket upper bounds (seconds), roughly logarithmic
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf]
+
+
+class LatencyStats:
+    """
+    Latencies of successful and failed requests, by status.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self._sorted = True
+        self.errors = 0
+        self.statuses = {}
+        self.elapsed = 0.0
+
+    def record(self, latency: float, status):
+        """
+        :param latency: request latency (seconds)
+        :param status: HTTP status, or the exception name for a failed request
+        """
+        self.latencies.append(latency)
+        self._sorted = False
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not isinstance(status, int) or not 200 <= status < 300:
+            self.errors += 1
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    @property
+    def error_rate(self):
+        return self.errors / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """ Nearest-rank percentile of the latencies.
+
+        :param p: percentile, 0-100
+        """
+        if not self.latencies:
+            return 0.0
+        self._sort()
+        rank = max(1, math.ceil(p / 100.0 * len(self.latencies)))
+        return self.latencies[rank - 1]
+
+    def histogram(self) -> [(float, int)]:
+        """
+        :return: list of (bucket upper bound, count) for each bucket
+        """
+        self._sort()
+        counts = []
+        start = 0
+        for bound in BUCKETS:
+            end = bisect.bisect_right(self.latencies, bound)
+            counts.append((bound, end - start))
+            start = end
+        return counts
+
+    def _sort(self):
+        if not self._sorted:
+            self.latencies.sort()
+            self._sorted = True
+
+    def report(self) -> str:
+        self._sort()
+        lines = ['Requests:   {}'.format(self.count),
+                 'Errors:     {} ({:.2%})'.format(self.errors, self.error_rate),
+                 'Elapsed:    {:.1f}s'.format(self.elapsed),
+                 'Throughput: {:.1f}/s'.format(self.count / self.elapsed if self.elapsed else 0),
+                 'Latency:    p50={:.1f}ms p95={:.1f}ms p99={:.1f}ms max={:.1f}ms'.format(
+                     self.percentile(50) * 1000, self.percentile(95) * 1000, self.percentile(99) * 1000,
+                     (self.latencies[-1] if self.latencies else 0) * 1000),
+                 'Status:     ' + ', '.join('{}={}'.format(k, v) for k, v in sorted(self.statuses.items(), key=str)),
+                 'Histogram:']
+        for bound, count in self.histogram():
+            lines.append('  {:>10} {:8} {}'.format('<= {:g}s'.format(bound) if bound != math.inf else '> 10s',
+                                                   count, '#' * int(50 * count / self.count) if self.count else ''))
+        return '\n'.join(lines)
+
+
+def iter_files(source: str):
+    """ Iterate over the TRT files in an output folder or archive.
+
+    :param source: output folder, or a tar/zip archive of one
+    :return: generator of (file name, content bytes)
+    """
+    if os.path.isdir(source):
+        for ext in [''] + list(EXTENSIONS.values()):
+            for path in sorted(glob.glob(os.path.join(source, '*', '*', '*', '*.xml' + ext))):
+                name = os.path.relpath(path, source)
+                yield name[:len(name) - len(ext)], _read_file(path, ext)
+    elif os.path.isfile(source) and zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for name in archive.namelist():
+                if name.endswith('.xml'):
+                    yield name, archive.read(name)
+    elif os.path.isfile(source) and tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith('.xml'):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError("Replay source '{}' is not a folder or a tar/zip archive".format(source))
+
+
+def _read_file(path, ext):
+    if not ext:
+        with open(path, 'rb') as f:
+            return f.read()
+    if ext == EXTENSIONS['gzip']:
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    codec = next(codec for codec, e in EXTENSIONS.items() if e == ext)
+    with OutputCompression(codec).open_read(path[:-len(ext)]) as f:
+        return f.read().encode('utf-8')
+
+
+class Replay:
+    def __init__(self, url: str, tokens: TokenProvider = None, rate: float = None, concurrency: int = 8,
+                 timeout: float = 60.0):
+        """
+        :param url: import endpoint, e.g. http://localhost:8080/exams/imports
+        :param tokens: access token provider, defaults to the stub token
+        :param rate: target submissions per second, None for as fast as the concurrency allows
+        :param concurrency: number of concurrent connections
+        :param timeout: request timeout (seconds)
+        """
+        self.url = urllib.parse.urlsplit(url)
+        if self.url.scheme not in ('http', 'https'):
+            raise ValueError("Unsupported URL scheme '{}' (expected http or https)".format(self.url.scheme))
+        self.path = (self.url.path or '/') + ('?' + self.url.query if self.url.query else '')
+        self.port = self.url.port or (443 if self.url.scheme == 'https' else 80)
+        self.tokens = tokens if tokens else TokenProvider()
+        self.rate = rate
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.stats = LatencyStats()
+        self._token = None
+
+    def run(self, files) -> LatencyStats:
+        """ Submit the files, blocking until done.
+
+        :param files: iterable of (file name, content), e.g. from iter_files
+        :return: statistics
+        """
+        return asyncio.run(self.replay(files))
+
+    async def replay(self, files) -> LatencyStats:
+        loop = asyncio.get_running_loop()
+        self._token = await loop.run_in_executor(None, self.tokens.get)
+        queue = asyncio.Queue(self.concurrency * 2)
+        workers = [asyncio.ensure_future(self._worker(queue)) for _ in range(self.concurrency)]
+        start = time.perf_counter()
+        interval = 1.0 / self.rate if self.rate else 0.0
+        for i, (file, data) in enumerate(files):
+            if interval:
+                delay = start + i * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await queue.put((file, data))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        self.stats.elapsed = time.perf_counter() - start
+        return self.stats
+
+    async def _worker(self, queue: asyncio.Queue):
+        connection = None
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                file, data = item
+                content_type, body = multipart_body('file', os.path.basename(file), data)
+                start = time.perf_counter()
+                try:
+                    if connection is None:
+                        connection = await asyncio.wait_for(self._connect(), self.timeout)
+                    token = self._token
+                    status, keep_alive = await asyncio.wait_for(
+                        self._post(connection, body, content_type, token), self.timeout)
+                    if not keep_alive:
+                        connection = _close(connection)
+                    if status == 401 and self.tokens.token_url:
+                        await asyncio.get_running_loop().run_in_executor(None, self._refresh, token)
+                except Exception as ex:
+                    # any error (e.g. a malformed response) fails the request, not the replay
+                    status = type(ex).__name__
+                    connection = _close(connection)
+                self.stats.record(time.perf_counter() - start, status)
+        finally:
+            _close(connection)
+
+    def _refresh(self, rejected):
+        self.tokens.refresh(rejected)
+        self._token = self.tokens.get()
+
+    async def _connect(self):
+        return await asyncio.open_connection(self.url.hostname, self.port, ssl=self.url.scheme == 'https' or None)
+
+    async def _post(self, connection, body: bytes, content_type: str, token: str):
+        reader, writer = connection
+        head = ('POST {} HTTP/1.1\r\n'
+                'Host: {}\r\n'
+                'Authorization: Bearer {}\r\n'
+                'Content-Type: {}\r\n'
+                'Content-Length: {}\r\n'
+                '\r\n').format(self.path, self.url.netloc, token, content_type, len(body))
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+        status_line = await reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        else:
+            await reader.read()
+            return status, False
+        return status, headers.get('connection', '').lower() != 'close'
+
+
+def _close(connection):
+    if connection is not None:
+        connection[1].close()
+    return None
@@ -0,0 +1,232 @@
+"""
+A run configuration file, as an alternative to (or together with) command line arguments.
+
+A configuration is a YAML or JSON document with these sections, all optional:
+
+    state:        name, code, type
+    state_types:  state types to add to (or replace in) state_types.STATE_TYPES, by name
+    hierarchy:    source ('generate' or a CSV file), cache
+    subjects:     source ('generate' or a glob)
+    packages:     source (glob), cache, sum, ica, iab, items
+    years:        the package years to generate, e.g. [2018, 2019] (default all)
+    rates:        generation rates overriding the configuration modules, see RATES
+    outputs:      dir, xml, parquet, arrow, csv, tsv, http, http_url, http_token, http_token_url,
+                  http_token_data, http_retries, http_log, compress, compress_level, compress_buffer_size
+    population:   save, load, dir
+    parallelism:  pkg_processes, http_concurrency, compress_threaded, capability_engine
+    seeds:        hierarchy, generation
+
+For example:
+
+    state: {name: Pern, code: PN, type: county}
+    state_types:
+      county:
+        district_types_and_counts: [[Big Average, 2], [Small Average, 6]]
+        district_groups: [2, 1.0]
+        subject_skip_percentages: {Math: .04, ELA: .03}
+        demographics: california
+    packages: {source: ./in/2019v2.*.csv, ica: true, iab: true}
+    rates: {interim_asmt: 1.0, transfer: 0.1}
+    outputs: {dir: /tmp/out, xml: false, csv: true, compress: gzip}
+    parallelism: {pkg_processes: 4, compress_threaded: true}
+    seeds: {hierarchy: 42, generation: 42}
+
+Settings map to the command line arguments (see ARGS), which override them. The configuration is
+validated as a whole before anything is generated, and all the errors are reported at once.
+"""
+import json
+import os
+
+import datagen.config.cfg as cfg
+import datagen.config.hierarchy as hier_config
+import datagen.config.population as pop_config
+import datagen.config.state_types as state_config
+from datagen.util.compression import EXTENSIONS
+
+# the settings by section, with their command line argument (dest) and type
+ARGS = {
+    'state': {'name': ('state_name', str), 'code': ('state_code', str), 'type': ('state_type', str)},
+    'hierarchy': {'source': ('hier_source', str), 'cache': ('hier_cache', str)},
+    'subjects': {'source': ('subject_source', str)},
+    'packages': {'source': ('pkg_source', str), 'cache': ('pkg_cache', str), 'sum': ('gen_sum', bool),
+                 'ica': ('gen_ica', bool), 'iab': ('gen_iab', bool), 'items': ('gen_item', bool)},
+    'outputs': {'dir': ('out_dir', str), 'xml': ('xml_out', bool), 'parquet': ('parquet_out', bool),
+                'arrow': ('arrow_out', bool), 'csv': ('csv_out', bool), 'tsv': ('tsv_out', bool),
+                'http': ('http_out', bool), 'http_url': ('http_url', str), 'http_token': ('http_token', str),
+                'http_token_url': ('http_token_url', str), 'http_token_data': ('http_token_data', str),
+                'http_retries': ('http_retries', int), 'http_log': ('http_log', str),
+                'compress': ('compress', str), 'compress_level': ('compress_level', int),
+                'compress_buffer_size': ('compress_buffer_size', int)},
+    'population': {'save': ('save_population', bool), 'load': ('load_population', bool),
+                   'dir': ('population_dir', str)},
+    'parallelism': {'pkg_processes': ('pkg_processes', int), 'http_concurrency': ('http_concurrency', int),
+                    'compress_threaded': ('compress_threaded', bool), 'capability_engine': ('capability_engine', str)},
+    'seeds': {'hierarchy': ('hier_seed', int), 'generation': ('seed', int)},
+}
+
+# the rates a configuration can set, with the configuration module attribute they override
+RATES = {
+    'interim_asmt': (cfg, 'INTERIM_ASMT_RATE'),             # schools taking interim assessments
+    'iab_student': (cfg, 'IAB_STUDENT_RATE'),               # students taking an IAB, in those schools
+    'asmt_retake': (cfg, 'ASMT_RETAKE_RATE'),
+    'asmt_delete': (cfg, 'ASMT_DELETE_RATE'),
+    'asmt_update': (cfg, 'ASMT_UPDATE_RATE'),
+    'student_registration': (cfg, 'HAS_ASMT_RESULT_IN_SR_FILE_RATE'),
+    'hold_back': (pop_config, 'STUDENT_HOLD_BACK_RATE'),
+    'drop_out': (pop_config, 'STUDENT_DROP_OUT_RATE'),
+    'transfer': (pop_config, 'STUDENT_TRANSFER_RATE'),
+}
+
+STATE_TYPE_KEYS = {'district_types_and_counts', 'subject_skip_percentages', 'demographics'}
+
+ENGINES = ('python', 'numpy')
+
+
+def load_run_config(file: str) -> dict:
+    """
+    Load a run configuration, YAML unless the file name ends with .json.
+
+    :param file: file name
+    :return: configuration
+    :raises ValueError: if the file isn't a valid configuration, listing all the errors
+    """
+    with open(file) as f:
+        if file.endswith('.json'):
+            config = json.load(f)
+        else:
+            # PyYAML is an optional dependency, only needed for YAML run configurations
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError('YAML run configurations require the PyYAML package (or use JSON)')
+            config = yaml.safe_load(f)
+    config = config if config is not None else {}
+
+    errors = validate_run_config(config)
+    if errors:
+        raise ValueError("Invalid run configuration '{}', {} errors:\n  ".format(file, len(errors)) +
+                         '\n  '.join(errors))
+    return config
+
+
+def validate_run_config(config: dict) -> [str]:
+    """
+    :param config: configuration
+    :return: the errors, an empty list if the configuration is valid
+    """
+    if not isinstance(config, dict):
+        return ['expected a mapping of sections, e.g. state, packages, outputs']
+
+    errors = []
+    for section, values in config.items():
+        if section in ARGS:
+            if not _check(errors, section, values, dict):
+                continue
+            for name, value in values.items():
+                arg = ARGS[section].get(name)
+                if arg is None:
+                    errors.append("{}: unknown setting '{}', expected one of {}".format(
+                        section, name, ', '.join(ARGS[section])))
+                elif value is not None:
+                    _check(errors, section + '.' + name, value, arg[1])
+        elif section == 'state_types':
+            if _check(errors, section, values, dict):
+                for name, state_type in values.items():
+                    _validate_state_type(errors, 'state_types.' + str(name), state_type)
+        elif section == 'years':
+            if _check(errors, section, values, list):
+                for year in values:
+                    _check(errors, section, year, int)
+        elif section == 'rates':
+            if _check(errors, section, values, dict):
+                for name, rate in values.items():
+                    if name not in RATES:
+                        errors.append("rates: unknown rate '{}', expected one of {}".format(name, ', '.join(RATES)))
+                    elif _check(errors, 'rates.' + name, rate, float) and not 0.0 <= rate <= 1.0:
+                        errors.append('rates.{}: {} is not between 0 and 1'.format(name, rate))
+        else:
+            errors.append("unknown section '{}', expected one of {}".format(
+                section, ', '.join(list(ARGS) + ['state_types', 'years', 'rates'])))
+
+    # settings with a fixed set of values
+    state_types = set(state_config.STATE_TYPES).union(config.get('state_types') or {})
+    state_type = (config.get('state') or {}).get('type')
+    if isinstance(state_type, str) and state_type not in state_types:
+        errors.append("state.type: unknown state type '{}'".format(state_type))
+    codec = (config.get('outputs') or {}).get('compress')
+    if isinstance(codec, str) and codec not in EXTENSIONS:
+        errors.append("outputs.compress: unknown codec '{}', expected one of {}".format(codec, ', '.join(EXTENSIONS)))
+    engine = (config.get('parallelism') or {}).get('capability_engine')
+    if isinstance(engine, str) and engine not in ENGINES:
+        errors.append("parallelism.capability_engine: unknown engine '{}', expected one of {}".format(
+            engine, ', '.join(ENGINES)))
+    source = (config.get('hierarchy') or {}).get('source')
+    if isinstance(source, str) and source != 'generate' and not os.path.isfile(source):
+        errors.append("hierarchy.source: file '{}' not found".format(source))
+    return errors
+
+
+def _validate_state_type(errors: [str], path: str, state_type):
+    if not _check(errors, path, state_type, dict):
+        return
+    missing = STATE_TYPE_KEYS.difference(state_type)
+    if missing:
+        errors.append('{}: missing {}'.format(path, ', '.join(sorted(missing))))
+    for entry in state_type.get('district_types_and_counts') or []:
+        if not isinstance(entry, (list, tuple)) or len(entry) != 2 or not isinstance(entry[1], int):
+            errors.append('{}.district_types_and_counts: expected [district type, count], not {}'.format(path, entry))
+        elif entry[0] not in hier_config.DISTRICT_TYPES:
+            errors.append("{}.district_types_and_counts: unknown district type '{}'".format(path, entry[0]))
+    demographics = state_type.get('demographics')
+    if demographics is not None and demographics not in pop_config.DEMOGRAPHICS:
+        errors.append("{}.demographics: unknown demographics '{}'".format(path, demographics))
+    groups = state_type.get('district_groups')
+    if groups is not None and (not isinstance(groups, (list, tuple)) or len(groups) != 2):
+        errors.append('{}.district_groups: expected [count, rate], not {}'.format(path, groups))
+
+
+def _check(errors: [str], path: str, value, type) -> bool:
+    # ints are valid floats, bools aren't valid ints
+    valid = isinstance(value, (int, float)) and not isinstance(value, bool) if type is float else \
+        isinstance(value, type) and not (type is int and isinstance(value, bool))
+    if not valid:
+        errors.append('{}: expected {}, not {}'.format(path, type.__name__, json.dumps(value, default=str)))
+    return valid
+
+
+def run_config_args(config: dict) -> dict:
+    """
+    :param config: (valid) configuration
+    :return: the command line argument values (by dest) it sets, including 'years'
+    """
+    args = {}
+    for section, settings in ARGS.items():
+        for name, value in (config.get(section) or {}).items():
+            args[settings[name][0]] = value
+    if 'years' in config:
+        args['years'] = config['years']
+    return args
+
+
+def apply_run_config(config: dict):
+    """
+    Add the configuration's state types and set its rates in the configuration modules.
+
+    :param config: (valid) configuration
+    """
+    for name, state_type in (config.get('state_types') or {}).items():
+        state_type = dict(state_type)
+        state_type['district_types_and_counts'] = [tuple(entry) for entry in state_type['district_types_and_counts']]
+        if 'district_groups' in state_type:
+            state_type['district_groups'] = tuple(state_type['district_groups'])
+        state_config.STATE_TYPES[name] = state_type
+    apply_rates(config.get('rates') or {})
+
+
+def apply_rates(rates: {str: float}):
+    """
+    :param rates: rates by name, see RATES
+    """
+    for name, rate in rates.items():
+        module, attr = RATES[name]
+        setattr(module, attr, rate)
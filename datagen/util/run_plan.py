@@ -0,0 +1,111 @@
+"""
+The plan of a run: for every school, the grades generated and the assessments taken each year, with
+the expected number of students, outcomes and item responses.
+
+The plan is compiled from the hierarchy and the loaded assessments before anything is generated, so a
+run can be checked (and sized) first, e.g. with --plan, and the generation uses its per-school work.
+The estimates are expectations from the configuration (student counts, interim and skip rates); the
+generated volumes vary around them.
+"""
+import datagen.config.cfg as cfg
+import datagen.config.population as pop_config
+from datagen.model.school import School
+from datagen.model.state import State
+from datagen.util.assessment_index import AssessmentIndex
+
+# the grades students are generated for, in addition to those of the assessments
+STANDARD_GRADES = {3, 4, 5, 6, 7, 8, 11}
+
+
+class SchoolWork:
+    """
+    A school's work for the whole run.
+    """
+
+    __slots__ = ('school', 'grades', 'students', 'outcomes', 'item_responses')
+
+    def __init__(self, school: School, grades: (int,)):
+        self.school = school
+        self.grades = grades            # the grades generated, ordered low to high
+        self.students = 0.0             # expected students per year
+        self.outcomes = 0.0             # expected outcomes, all years
+        self.item_responses = 0.0       # expected item responses, all years
+
+
+class RunPlan:
+    def __init__(self, state: State, schools: [School], index: AssessmentIndex, gen_item: bool = False,
+                 years: [int] = None):
+        """
+        :param state: state
+        :param schools: schools
+        :param index: the loaded assessments
+        :param gen_item: True if item responses are generated
+        :param years: the years to generate, None for all the assessments' years
+        :raises ValueError: if a year has no assessments
+        """
+        missing_years = sorted(set(years).difference(index.years)) if years else []
+        if missing_years:
+            raise ValueError('No assessment packages for years {}, the packages are for {}'
+                             .format(missing_years, index.years))
+        self.years = sorted(years) if years else index.years
+        self.grades = STANDARD_GRADES.union(index.grades)
+
+        skip_rates = state.config['subject_skip_percentages']
+        additional = sum(pop_config.REPOPULATE_ADDITIONAL_STUDENTS) / len(pop_config.REPOPULATE_ADDITIONAL_STUDENTS)
+        # the expected outcomes and item responses of an assessment, per student, by interim flag
+        per_student = {}
+
+        self.schools = []
+        for school in schools:
+            work = SchoolWork(school, tuple(grade for grade in school.grades if grade in self.grades))
+            students = _expected_students(school) + additional
+            work.students = students * len(work.grades)
+            for year in self.years:
+                for grade in work.grades:
+                    for asmt in index.get(year, grade):
+                        key = (asmt.guid, school.takes_interim_asmts)
+                        if key not in per_student:
+                            per_student[key] = _expected_outcomes(asmt, school.takes_interim_asmts, skip_rates,
+                                                                  gen_item)
+                        outcomes, item_responses = per_student[key]
+                        work.outcomes += students * outcomes
+                        work.item_responses += students * item_responses
+            self.schools.append(work)
+
+        self.students = sum(work.students for work in self.schools)
+        self.outcomes = sum(work.outcomes for work in self.schools)
+        self.item_responses = sum(work.item_responses for work in self.schools)
+
+    def summary(self, top: int = 5) -> str:
+        """
+        :param top: number of (largest) schools to list
+        :return: summary of the plan, e.g. for printing
+        """
+        lines = ['Run plan: {} schools, years {}, grades {}'.format(len(self.schools), self.years, sorted(self.grades)),
+                 '  expected students/year: {:,.0f}'.format(self.students),
+                 '  expected outcomes:      {:,.0f}'.format(self.outcomes),
+                 '  expected item responses: {:,.0f}'.format(self.item_responses)]
+        if top and self.schools:
+            lines.append('  largest schools (outcomes):')
+            for work in sorted(self.schools, key=lambda w: -w.outcomes)[:top]:
+                lines.append('    {} {} ({}), grades {}: {:,.0f} students/year, {:,.0f} outcomes'.format(
+                    work.school.id, work.school.name, work.school.type_str, list(work.grades), work.students,
+                    work.outcomes))
+        return '\n'.join(lines)
+
+
+def _expected_students(school: School) -> float:
+    # repopulate_school_grade draws from a triangular distribution, whose mean is the mean of its parameters
+    if school.student_count_min < school.student_count_max:
+        return (school.student_count_min + school.student_count_max + school.student_count_avg) / 3
+    return school.student_count_min
+
+
+def _expected_outcomes(asmt, interims: bool, skip_rates: {str: float}, gen_item: bool) -> (float, float):
+    if asmt.is_iab():
+        outcomes = cfg.IAB_STUDENT_RATE if interims else 0.0
+    else:
+        skip_rate = skip_rates.get(asmt.subject.code, skip_rates.get('Math', cfg.ASMT_SKIP_RATE))
+        # a retake or an update adds an outcome; they're drawn from the same random number, the larger rate applies
+        outcomes = (1.0 - skip_rate) * (1.0 + max(cfg.ASMT_RETAKE_RATE, cfg.ASMT_UPDATE_RATE))
+    return outcomes, outcomes * len(asmt.item_bank) if gen_item and asmt.item_bank else 0.0
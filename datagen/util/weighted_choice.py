@@ -2,6 +2,7 @@
 Method for choosing an object randomly, given weights.
 
 If many choices are to be made using the same weights, WeightedChooser might be more efficient.
+For weights that come from configuration, use SAMPLERS to get a chooser that is compiled only once.
 
 """
 import bisect
@@ -37,14 +38,62 @@ class WeightedChooser:
                  weights_by_object: {object: float},
                  rng: random.Random = random.Random()):
         self.elements, weights = zip(*weights_by_object.items())
+        assert (all(weight >= 0 for weight in weights))
         self.breaks = tuple(itertools.accumulate(weights))
         self.rng = rng
 
-    def choose(self, seed=None):
+    def choose(self, seed=None, rng: random.Random = None):
+        rng = rng if rng else self.rng
         if seed is not None:
-            self.rng.seed(seed)
+            rng.seed(seed)
 
-        value = self.rng.uniform(0, self.breaks[-1])  # a random float between 0 and the sum of the weights
+        value = rng.random() * self.breaks[-1]  # a random float between 0 and the sum of the weights
         i = bisect.bisect(self.breaks, value)  # the index
 
         return self.elements[i]
+
+    def sample(self, n: int, rng: random.Random = None) -> list:
+        """ Choose n items (with replacement).
+        """
+        return (rng if rng else self.rng).choices(self.elements, cum_weights=self.breaks, k=n)
+
+
+class SamplerRegistry:
+    """
+    Choosers compiled from configuration, keyed by the identity of the configuration object(s).
+    Since the key is the identity, configuration must not be modified once it has been sampled.
+    The registry holds a reference to the configuration so its identity can't be reused.
+    """
+
+    def __init__(self):
+        self._choosers = {}
+        self.rng = random.Random()      # shared by the choosers, see seed
+
+    def seed(self, seed):
+        """ Seed the random generator of the choosers, to sample the same values every time.
+        """
+        self.rng.seed(seed)
+
+    def get(self, configs, weights, key=None) -> WeightedChooser:
+        """ Get the chooser for some configuration, compiling it the first time.
+
+        :param configs: configuration object, or tuple of objects, the weights are derived from
+        :param weights: function returning the {object: weight} mapping (or None), only called the first time
+        :param key: additional (hashable) key, if more than one chooser is derived from the configuration
+        :return: chooser (or None if weights returned None)
+        """
+        if not isinstance(configs, tuple):
+            configs = (configs,)
+        registry_key = (tuple(id(config) for config in configs), key)
+        entry = self._choosers.get(registry_key)
+        if entry is None or any(a is not b for a, b in zip(entry[0], configs)):
+            mapping = weights()
+            entry = (configs, WeightedChooser(mapping, self.rng) if mapping is not None else None)
+            self._choosers[registry_key] = entry
+        return entry[1]
+
+    def clear(self):
+        self._choosers.clear()
+
+
+SAMPLERS = SamplerRegistry()
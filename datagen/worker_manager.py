@@ -1,5 +1,4 @@
 import copy
-import datetime
 import os
 import random
 import sys
@@ -7,10 +6,13 @@ import sys
 import pyprind
 
 import datagen.config.cfg as cfg
+import datagen.config.population as pop_config
+import datagen.generators.assessment as gen_asmt_generator
 import datagen.generators.hierarchy as hier_gen
 import datagen.generators.iab_assessment as iab_asmt_gen
 import datagen.generators.population as pop_gen
 import datagen.generators.summative_or_ica_assessment as asmt_gen
+import datagen.util.capability as capability
 import datagen.util.hierarchy as hier_util
 from datagen.generators.subject import generate_default_subjects
 from datagen.model.assessment import Assessment
@@ -18,11 +20,17 @@ from datagen.model.district import District
 from datagen.model.registrationsystem import RegistrationSystem
 from datagen.model.school import School
 from datagen.model.state import State
+from datagen.outputworkers.csv_worker import CsvWorker
 from datagen.outputworkers.worker import Worker
 from datagen.outputworkers.xml_worker import XmlWorker
 from datagen.readers.subject_reader import load_subjects
 from datagen.readers.tabulator_reader import load_assessments
+from datagen.util.assessment_index import AssessmentIndex
+from datagen.util.compression import OutputCompression
+from datagen.util.dates import DATES, weekday
 from datagen.util.id_gen import IDGen
+from datagen.util.run_plan import RunPlan, SchoolWork
+from datagen.util.weighted_choice import SAMPLERS
 
 
 class WorkerManager(Worker):
@@ -35,9 +43,31 @@ class WorkerManager(Worker):
         self.state_cfg = {'name': args.state_name, 'code': args.state_code, 'type': args.state_type}
         self.hier_source = args.hier_source
 
+        self.compression = OutputCompression(args.compress, args.compress_level, args.compress_buffer_size,
+                                             args.compress_threaded)
+
         self.workers = []
         if args.xml_out:
-            self.workers.append(XmlWorker(self.out_path_root))
+            self.workers.append(XmlWorker(self.out_path_root, self.compression))
+        if args.parquet_out or args.arrow_out:
+            # pyarrow is an optional dependency, only needed for columnar output
+            from datagen.outputworkers.columnar_worker import ColumnarWorker
+            if args.parquet_out:
+                self.workers.append(ColumnarWorker(self.out_path_root, 'parquet', compression=self.compression))
+            if args.arrow_out:
+                self.workers.append(ColumnarWorker(self.out_path_root, 'arrow', compression=self.compression))
+        if args.csv_out:
+            self.workers.append(CsvWorker(self.out_path_root, 'csv', compression=self.compression))
+        if args.tsv_out:
+            self.workers.append(CsvWorker(self.out_path_root, 'tsv', compression=self.compression))
+        if args.http_out:
+            # only imported for submitting, http.client and the executors are slow to import
+            from datagen.outputworkers.http_worker import HttpWorker
+            from datagen.util.import_client import STUB_TOKEN, ImportClient, TokenProvider
+            tokens = TokenProvider(args.http_token or STUB_TOKEN, args.http_token_url, args.http_token_data)
+            client = ImportClient(args.http_url, tokens, pool_size=args.http_concurrency, retries=args.http_retries)
+            self.workers.append(HttpWorker(client, args.http_concurrency,
+                                           os.path.join(self.out_path_root, args.http_log)))
 
         self.subject_source = args.subject_source
 
@@ -48,11 +78,33 @@ class WorkerManager(Worker):
         self.gen_iab = args.gen_iab
         self.gen_item = args.gen_item
 
+        # random seed for generating the population and outcomes, to generate the same data every time
+        if args.seed is not None:
+            random.seed(args.seed)
+            SAMPLERS.seed(args.seed)
+
+        # capability engine backend, numpy is an optional dependency
+        capability.use_engine(args.capability_engine, args.seed)
+
+        # population snapshot, either saved (with the generated population) or loaded (instead of generating it)
+        if args.save_population and args.load_population:
+            raise ValueError('Specify either --save_population or --load_population, not both')
+        self.population_path = os.path.join(self.out_path_root, args.population_dir)
+        self.population_writer = None
+        self.population_reader = None
+        if args.load_population:
+            # pyarrow is an optional dependency, only needed for population snapshots
+            from datagen.util.population_snapshot import PopulationReader
+            self.population_reader = PopulationReader(self.population_path)
+
         self.id_gen = IDGen()
 
     def cleanup(self):
         for worker in self.workers:
             worker.cleanup()
+        self.compression.close()
+        if self.population_writer:
+            self.population_writer.close()
 
     def prepare(self):
         for worker in self.workers:
@@ -69,11 +121,34 @@ class WorkerManager(Worker):
             print('No subject definitions found')
             return
 
-        assessments = load_assessments(self.pkg_source, subjects, self.gen_sum, self.gen_ica, self.gen_iab, self.gen_item)
+        assessments = load_assessments(self.pkg_source, subjects, self.gen_sum, self.gen_ica, self.gen_iab, self.gen_item,
+                                       self._args.pkg_cache, self._args.pkg_processes)
         if len(assessments) == 0:
             print('No assessment packages found')
             return
 
+        index = AssessmentIndex(assessments)
+
+        # compile (and check) the plan of the run before generating anything
+        try:
+            plan = RunPlan(state, schools, index, self.gen_item, self._args.years)
+        except ValueError as e:
+            print(e)
+            self.cleanup()
+            exit(1)
+        print(plan.summary())
+        if self._args.plan:
+            return
+
+        self.__write_hierarchies(schools)
+
+        if self.population_reader:
+            self.__check_population(plan, index)
+        elif self._args.save_population:
+            from datagen.util.population_snapshot import PopulationWriter
+            self.population_writer = PopulationWriter(self.population_path, index.subject_codes)
+            self.population_writer.write_hierarchy(schools)
+
         # generate and emit inferred command line from args
         cl = ' '.join([('--' + k + ' ' + str(v)) for (k, v) in vars(self._args).items()])
         print(cl)
@@ -81,7 +156,7 @@ class WorkerManager(Worker):
             f.write(cl)
 
         # Process the state
-        self.__generate_state_data(state, districts, schools, assessments)
+        self.__generate_state_data(state, districts, plan, index)
 
     def __hierarchy(self):
         """
@@ -89,53 +164,60 @@ class WorkerManager(Worker):
 
         :return:
         """
-        if self.hier_source == 'generate':
-            state, districts, schools = hier_util.generate_hierarchy(self.state_cfg['type'], self.state_cfg['name'], self.state_cfg['code'], self.id_gen)
+        if self.population_reader:
+            state, districts, schools = self.population_reader.hierarchy()
+        elif self.hier_source == 'generate' and self._args.hier_cache:
+            state, districts, schools = hier_util.cached_hierarchy(self._args.hier_cache, self.state_cfg['type'], self.state_cfg['name'], self.state_cfg['code'], self.id_gen, self._args.hier_seed)
+        elif self.hier_source == 'generate':
+            state, districts, schools = hier_util.generate_hierarchy(self.state_cfg['type'], self.state_cfg['name'], self.state_cfg['code'], self.id_gen, self._args.hier_seed)
         else:
             state, districts, schools = hier_util.read_hierarchy(self.hier_source)
 
-        # call hook for workers to write hierarchies
-        hierarchies = [hier_gen.generate_institution_hierarchy(school.district.state, school.district, school, self.id_gen) for school in schools]
-        for worker in self.workers:
-            worker.write_hierarchies(hierarchies)
-        del hierarchies
-
         return state, districts, schools
 
-    def __years(self, assessments: [Assessment]):
-        """
-        Return the sorted list of years represented by assessment packages.
-        :param assessments: assessments
-        :return: sorted list of years, e.g. [2015, 2016, 2017]
+    def __write_hierarchies(self, schools: [School]):
         """
-        return sorted(set(map(lambda asmt: asmt.year, assessments)))
+        Call the hook for workers to write hierarchies
 
-    def __subject_codes(self, assessments: [Assessment]):
+        :param schools: schools
         """
-        Return the sorted list of subject codes represented by assessment packages.
-        :param assessments: assessments
-        :return: sorted list of subject codes, e.g. ['ELA', 'Math']
-        """
-        return sorted(set(map(lambda asmt: asmt.subject.code, assessments)))
+        hierarchies = [hier_gen.generate_institution_hierarchy(school.district.state, school.district, school, self.id_gen) for school in schools]
+        for worker in self.workers:
+            worker.write_hierarchies(hierarchies)
+        del hierarchies
 
-    def __grades(self, assessments: [Assessment]):
-        """
-        Return the set of grades represented by assessment packages.
-        :param assessments: assessments
-        :return: set of grades, e.g. {1, 2, 6}
+    def __check_population(self, plan: RunPlan, index: AssessmentIndex):
         """
-        return set(map(lambda asmt: asmt.grade, assessments))
+        Check that a loaded population snapshot has the years and subjects of the assessment packages.
 
-    def __generate_state_data(self, state: State, districts: [District], schools: [School], assessments: [Assessment]):
+        :param plan: plan of the run
+        :param index: assessments
+        """
+        missing_years = set(plan.years).difference(self.population_reader.years)
+        if missing_years:
+            raise ValueError('Population snapshot {} has no students for years {}'
+                             .format(self.population_path, sorted(missing_years)))
+        missing_subjects = set(index.subject_codes).difference(self.population_reader.subject_codes)
+        if missing_subjects:
+            raise ValueError('Population snapshot {} has no capabilities for subjects {}'
+                             .format(self.population_path, sorted(missing_subjects)))
+        missing_grades = index.grades.difference(self.population_reader.grades)
+        if missing_grades:
+            print('Population snapshot {} has no students for grades {}, their assessments will have no outcomes'
+                  .format(self.population_path, sorted(missing_grades)))
+
+    def __generate_state_data(self, state: State, districts: [District], plan: RunPlan, index: AssessmentIndex):
         """
         Generate an entire data set for a single state.
 
         @param state: State to generate data for
+        @param plan: plan of the run, the schools' work
+        @param index: assessments, by year and grade
         """
         print('Creating results for state: {}'.format(state.name))
 
         # build registration system by years
-        rs_by_year = self.__build_registration_system(self.__years(assessments))
+        rs_by_year = self.__build_registration_system(plan.years)
 
         # Build the districts
         student_avg_count = 0
@@ -143,11 +225,11 @@ class WorkerManager(Worker):
         for district in districts:
             print('\nCreating results for district {} ({} District)'.format(district.name, district.type_str))
 
-            # collect schools for the district
-            district_schools = [s for s in schools if s.district == district]
+            # collect the schools' work for the district
+            district_work = [work for work in plan.schools if work.school.district == district]
 
             # Generate the district data set
-            avg_year, unique = self.__generate_district_data(district_schools, rs_by_year, assessments)
+            avg_year, unique = self.__generate_district_data(district_work, plan.years, rs_by_year, index)
 
             # Print completion of district
             print('District results created with average of {} students/year and {} total unique'
@@ -170,6 +252,14 @@ class WorkerManager(Worker):
         if len(years) == 0:
             raise ValueError('Number of specified years is zero')
 
+        # Use the registration systems of a loaded population
+        if self.population_reader:
+            rs_by_year = self.population_reader.registration_systems()
+            for year in years:
+                for worker in self.workers:
+                    worker.write_student_registration_config(year, rs_by_year[year])
+            return rs_by_year
+
         # Build the registration systems for every year
         rs_by_year = {}
         start_year = years[0] - 1
@@ -186,17 +276,23 @@ class WorkerManager(Worker):
             for worker in self.workers:
                 worker.write_student_registration_config(year, rs)
 
+        if self.population_writer:
+            self.population_writer.write_registration_systems(rs_by_year)
+
         # Return the generated GUIDs
         return rs_by_year
 
-    def __generate_district_data(self, schools: [School], reg_sys_by_year: {str: RegistrationSystem}, assessments: [Assessment]):
+    def __generate_district_data(self, work: [SchoolWork], years: [int], reg_sys_by_year: {str: RegistrationSystem},
+                                 index: AssessmentIndex):
         """
         Generate an entire data set for all schools in a single district.
 
-        @param schools: schools for the district
-        @param assessments: Dictionary of all assessment objects
+        @param work: the planned work of the schools for the district
+        @param years: years to generate
+        @param index: assessments, by year and grade
         """
         # Sort the schools
+        schools = [school_work.school for school_work in work]
         schools_by_grade = hier_gen.sort_schools_by_grade(schools)
 
         # Begin processing the years for data
@@ -204,33 +300,34 @@ class WorkerManager(Worker):
         students = {}
         student_count = 0
 
-        # get range of years from assessment packages
-        years = self.__years(assessments)
-
-        # start with "standard" SB grades and add any grade found in the assessments
-        hierarchy_grades = {3, 4, 5, 6, 7, 8, 11}
-        hierarchy_grades.update(self.__grades(assessments))
-
         # calculate the progress bar max and start the progress
-        progress_max = len(hier_gen.set_up_schools_with_grades(schools, hierarchy_grades)) * len(years)
+        progress_max = len(work) * len(years)
         bar = pyprind.ProgBar(progress_max, stream=sys.stdout, title='Generating assessments outcome for schools')
 
         for year in years:
             # Prepare output file names
             reg_system = reg_sys_by_year[year]
 
-            # Set up a dictionary of schools and their grades
-            schools_with_grades = hier_gen.set_up_schools_with_grades(schools, hierarchy_grades)
-
-            # Advance the students forward in the grades
-            for guid, student in students.items():
-                # Assign the registration system and bump up the record ID
-                student.reg_sys = reg_system
-                student.rec_id = self.id_gen.get_rec_id('student')
-
-                # Move the student forward (false from the advance method means the student disappears)
+            if self.population_reader:
+                # Load the schools' students as they were this year
+                schools_with_grades = self.population_reader.enrollments(schools[0].district, year, reg_system) \
+                    if schools else {}
+            else:
+                # Set up a dictionary of schools and their grades
+                schools_with_grades = {school_work.school: {grade: [] for grade in school_work.grades}
+                                       for school_work in work}
+
+                # Assign the registration system and bump up the record IDs
+                cohort = list(students.values())
+                for student, rec_id in zip(cohort, self.id_gen.get_rec_ids('student', len(cohort))):
+                    student.reg_sys = reg_system
+                    student.rec_id = rec_id
+
+                # Advance the students forward in the grades (students that disappear are not returned)
                 # If the student is now in a grade that isn't a concern (i.e. no assessments) leave them out
-                if pop_gen.advance_student(student, schools_by_grade):
+                for student in pop_gen.advance_students(cohort, schools_by_grade, pop_config.STUDENT_HOLD_BACK_RATE,
+                                                        pop_config.STUDENT_DROP_OUT_RATE,
+                                                        pop_config.STUDENT_TRANSFER_RATE):
                     if student.grade in schools_with_grades[student.school]:
                         schools_with_grades[student.school][student.grade].append(student)
 
@@ -238,9 +335,12 @@ class WorkerManager(Worker):
             # and create assessments with outcomes for the students
             for school, grades in schools_with_grades.items():
                 # Process the whole school
-                student_count += self.__process_school(grades, school, students, unique_students, reg_system, year, assessments)
+                student_count += self.__process_school(grades, school, students, unique_students, reg_system, year, index)
                 bar.update()
 
+            if self.population_writer:
+                self.population_writer.flush()
+
         unique_student_count = len(unique_students)
 
         # Some explicit garbage collection
@@ -251,13 +351,13 @@ class WorkerManager(Worker):
         # Return the average student count
         return int(student_count // len(years)), unique_student_count
 
-    def __process_school(self, grades, school, students, unique_students, reg_system: RegistrationSystem, year, assessments: [Assessment]):
+    def __process_school(self, grades, school, students, unique_students, reg_system: RegistrationSystem, year, index: AssessmentIndex):
 
         district = school.district
         state = district.state
 
         # get all subjects represented by assessment packages
-        subject_codes = self.__subject_codes(assessments)
+        subject_codes = index.subject_codes
 
         # Grab the assessment rates by subjects
         asmt_skip_rates_by_subject = state.config['subject_skip_percentages']
@@ -267,6 +367,8 @@ class WorkerManager(Worker):
                 asmt_skip_rates_by_subject[subject_code] = asmt_skip_rates_by_subject['Math']
 
         # Process the whole school
+        # sessions are per date and student group, and groups are (re)assigned every school-year
+        gen_asmt_generator.SESSIONS.clear()
         assessment_results = {}
         iab_results = {}
         sr_students = []
@@ -274,31 +376,38 @@ class WorkerManager(Worker):
         student_count = 0
 
         for grade, grade_students in grades.items():
-            # Potentially re-populate the student population
-            pop_gen.repopulate_school_grade(school, grade, grade_students, self.id_gen, reg_system, year, subject_codes)
-            student_count += len(grade_students)
-
             # collect any assessments for this year and grade
-            asmts = list(filter(lambda asmt: asmt.year == year and asmt.grade == grade, assessments))
+            asmts = index.get(year, grade)
 
-            # note: only use subjects for the assessments for this year and grade
-            pop_gen.assign_student_groups(school, grade, grade_students, self.id_gen, self.__subject_codes(asmts))
+            # a loaded population already has its students and groups
+            if not self.population_reader:
+                # Potentially re-populate the student population
+                pop_gen.repopulate_school_grade(school, grade, grade_students, self.id_gen, reg_system, year, subject_codes)
+
+                # note: only use subjects for the assessments for this year and grade
+                pop_gen.assign_student_groups(school, grade, grade_students, self.id_gen, index.get_subject_codes(year, grade))
+
+                if self.population_writer:
+                    self.population_writer.add_enrollment(year, school, grade, grade_students)
+            student_count += len(grade_students)
 
             for asmt in asmts:
                 date_taken = self.__date_taken_for_asmt(asmt)
+                if asmt.is_iab():
+                    if school.takes_interim_asmts:
+                        iab_students = [s for s in grade_students if random.random() < cfg.IAB_STUDENT_RATE]
+                        iab_asmt_gen.create_iab_outcome_objects(date_taken, iab_students, asmt, self.id_gen,
+                                                                iab_results, gen_item=self.gen_item)
+                else:
+                    asmt_gen.create_assessment_outcome_objects(date_taken, grade_students, asmt, self.id_gen,
+                                                               assessment_results,
+                                                               asmt_skip_rates_by_subject[asmt.subject.code],
+                                                               cfg.ASMT_RETAKE_RATE, cfg.ASMT_DELETE_RATE,
+                                                               cfg.ASMT_UPDATE_RATE, gen_item=self.gen_item)
+
+            # Make sure we have the students for the next run and for metrics
+            if asmts:
                 for student in grade_students:
-                    if asmt.is_iab():
-                        if school.takes_interim_asmts and random.random() < cfg.IAB_STUDENT_RATE:
-                            iab_asmt_gen.create_iab_outcome_object(date_taken, student, asmt, self.id_gen, iab_results,
-                                                                   gen_item=self.gen_item)
-                    else:
-                        asmt_gen.create_assessment_outcome_object(date_taken, student, asmt, self.id_gen,
-                                                                  assessment_results,
-                                                                  asmt_skip_rates_by_subject[asmt.subject.code],
-                                                                  gen_item=self.gen_item)
-
-                    # Make sure we have the student for the next run and for metrics
-                    # (bit repetitive to do it in the inner loop but probably okay for now)
                     if student.guid not in students:
                         students[student.guid] = student
                         dim_students.append(student)
@@ -354,24 +463,24 @@ class WorkerManager(Worker):
         :return: date taken
         """
         if asmt.is_iab():
-            date_taken = datetime.date(asmt.year - 1, 9, 15) + datetime.timedelta(days=random.randint(0, 180))
+            date_taken = DATES.ordinal(asmt.year - 1, 9, 15) + random.randint(0, 180)
         elif asmt.is_summative():
-            date_taken = datetime.date(asmt.year, 5, 10)
+            date_taken = DATES.ordinal(asmt.year, 5, 10)
         else:
-            date_taken = datetime.date(asmt.year, 1, 21)
-        return self.__weekday_near(date_taken)
+            date_taken = DATES.ordinal(asmt.year, 1, 21)
+        return DATES.date(self.__weekday_near(date_taken))
 
-    def __weekday_near(self, value: datetime.date):
+    def __weekday_near(self, value: int):
         """
         Generates a random date that is near the given target date and is a weekday.
         For now this is simple: shift date randomly +-3, then make sure it's not a weekend.
 
-        :param value: date to be near
-        :return: new date
+        :param value: ordinal of the date to be near
+        :return: ordinal of the new date
         """
-        value += datetime.timedelta(days=random.randint(-3, 3))
-        if value.weekday() == 5:
-            value += datetime.timedelta(days=-1)  # Sat -> Fri
-        elif value.weekday() == 6:
-            value += datetime.timedelta(days=+1)  # Sun -> Mon
+        value += random.randint(-3, 3)
+        if weekday(value) == 5:
+            value -= 1  # Sat -> Fri
+        elif weekday(value) == 6:
+            value += 1  # Sun -> Mon
         return value
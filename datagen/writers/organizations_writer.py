@@ -0,0 +1,123 @@
+"""
+A writer producing the organizations.json file, the state's groups of districts, districts and
+institutions (schools) as entities:
+
+    {
+      "groupofdistricts": [
+        {"entityId": .., "entityName": .., "entityType": "GROUPOFDISTRICTS", "parentEntityType": "STATE", ..},
+      ],
+      "districts": [
+        {"entityId": .., "entityName": .., "entityType": "DISTRICT", "parentEntityType": "GROUPOFDISTRICTS", ..},
+      ],
+      "institutions": [
+        {"entityId": .., "entityName": .., "entityType": "INSTITUTION", "parentEntityType": "DISTRICT", ..},
+      ]
+    }
+
+A district that isn't in a group has the state as parent; groupofdistricts is omitted if there are none.
+
+Schools are written as they come, district by district, so the writer doesn't hold (or re-read) the
+institutions: they are streamed to a temporary file and copied after the groups and districts on close.
+The output is formatted as json.dump with indent=2.
+"""
+import json
+import os
+import tempfile
+
+from datagen.model.district import District
+from datagen.model.districtgroup import DistrictGroup
+from datagen.model.school import School
+from datagen.util.compression import OutputCompression
+
+
+class OrganizationsWriter:
+    def __init__(self, file: str, compression: OutputCompression = None):
+        """
+        :param file: file name, it is overwritten on close; if output is compressed, the codec extension is added
+        :param compression: output compression
+        """
+        self.file = file
+        self.compression = compression if compression else OutputCompression()
+        self._groups = {}           # entity by id
+        self._districts = {}        # entity by id
+        self._school_ids = set()
+        self._institutions = tempfile.TemporaryFile('w+', encoding='utf-8', dir=os.path.dirname(file) or None)
+
+    def write(self, schools: [School]):
+        """ Add the schools, with their district and group; entities that were already added are skipped.
+        """
+        for school in schools:
+            if school.id in self._school_ids:
+                continue
+            self._school_ids.add(school.id)
+            district = school.district
+            if district.id not in self._districts:
+                self._districts[district.id] = self._district_entity(district)
+            if district.group and district.group.id not in self._groups:
+                self._groups[district.group.id] = self._group_entity(district.group)
+            self._institutions.write(',\n' if len(self._school_ids) > 1 else '\n')
+            self._institutions.write(_format(_entity(school.id, school.name, 'INSTITUTION', 'DISTRICT', district.id)))
+
+    def close(self):
+        """ Write the file.
+        """
+        with self.compression.open(self.file) as out:
+            out.write('{')
+            if self._groups:
+                out.write('\n  "groupofdistricts": ')
+                out.write(_format_list(self._groups.values()))
+                out.write(',')
+            out.write('\n  "districts": ')
+            out.write(_format_list(self._districts.values()))
+            out.write(',\n  "institutions": [')
+            if self._school_ids:
+                self._institutions.seek(0)
+                # copy in chunks, so the institutions are never all in memory
+                for chunk in iter(lambda: self._institutions.read(1024 * 1024), ''):
+                    out.write(chunk)
+                out.write('\n  ')
+            out.write(']\n}')
+        self._institutions.close()
+
+    @staticmethod
+    def _group_entity(group: DistrictGroup) -> dict:
+        return _entity(group.id, group.name, 'GROUPOFDISTRICTS', 'STATE', group.state.code)
+
+    @staticmethod
+    def _district_entity(district: District) -> dict:
+        if district.group:
+            return _entity(district.id, district.name, 'DISTRICT', 'GROUPOFDISTRICTS', district.group.id)
+        return _entity(district.id, district.name, 'DISTRICT', 'STATE', district.state.code)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write_organizations(file: str, schools: [School], compression: OutputCompression = None):
+    with OrganizationsWriter(file, compression) as writer:
+        writer.write(schools)
+
+
+def _entity(id, name, type, parent_type, parent_id) -> dict:
+    # same order as the org hierarchy
+    return {
+        'entityId': id,
+        'entityName': name,
+        'entityType': type,
+        'parentEntityType': parent_type,
+        'parentEntityId': parent_id
+    }
+
+
+def _format(entity: dict) -> str:
+    # an entity as a list element, indented as json.dumps(..., indent=2) would at this depth
+    return '    ' + json.dumps(entity, indent=2).replace('\n', '\n    ')
+
+
+def _format_list(entities) -> str:
+    if not entities:
+        return '[]'
+    return '[\n' + ',\n'.join(_format(entity) for entity in entities) + '\n  ]'
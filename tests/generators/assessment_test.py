@@ -4,6 +4,7 @@ Unit tests for the assessment module.
 """
 
 import datetime
+import hashlib
 from random import choice, sample, random
 from string import ascii_uppercase
 
@@ -14,12 +15,14 @@ import datagen.generators.hierarchy as hier_gen
 import datagen.generators.population as pop_gen
 import datagen.generators.summative_or_ica_assessment as asmt_gen
 import datagen.model.itemdata as item_lvl_data
-from datagen.generators.assessment import generate_response, _pick_accommodation_code
+from datagen.generators import names
+from datagen.generators.assessment import generate_response, _pick_accommodation_code, SessionRegistry
 from datagen.generators.subject import generate_default_subjects
 from datagen.model.assessment import Assessment
 from datagen.model.item import AssessmentItem
 from datagen.model.scorable import Scorable
 from datagen.model.segment import AssessmentSegment
+from datagen.model.studentgroup import StudentGroup
 from datagen.util.id_gen import IDGen
 
 ID_GEN = IDGen()
@@ -188,6 +191,32 @@ def test_pick_default_accommodation_code_four():
     assert 4 <= _pick_accommodation_code(4) <= 26
 
 
+def test_session_registry():
+    sessions = SessionRegistry()
+    date = datetime.date(2015, 5, 15)
+    group = StudentGroup('ELA', 100, 'G3-100')
+
+    hexdigest = hashlib.sha1((str(date) + group.name).encode()).hexdigest()
+    expected = names.PEOPLE_NAMES.last_names[int(hexdigest[-4:], 16)][:3].upper() + '-' + hexdigest[:4]
+    assert sessions.get(date, group) == expected
+    assert sessions.get(date, StudentGroup('ELA', 100, 'G3-100')) == expected
+    assert len(sessions) == 1
+
+    assert sessions.get(date, None) != expected
+    assert sessions.get(None, group) != expected
+    assert len(sessions) == 3
+    sessions.clear()
+    assert len(sessions) == 0
+
+
+def test_session_registry_max_size():
+    sessions = SessionRegistry(max_size=2)
+    date = datetime.date(2015, 5, 15)
+    for i in range(5):
+        sessions.get(date, StudentGroup('ELA', i, 'G3-' + str(i)))
+        assert len(sessions) <= 2
+
+
 def test_create_assessment_outcome_object_item_data():
     # Create objects
     asmt = generate_assessment('SUM', 2015, 'ELA', 3, ID_GEN)
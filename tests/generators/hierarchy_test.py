@@ -10,6 +10,7 @@ import pytest
 
 import datagen.generators.hierarchy as hier_gen
 from datagen.model.district import District
+from datagen.model.districtgroup import DistrictGroup
 from datagen.model.school import School
 from datagen.model.state import State
 from datagen.util.id_gen import IDGen
@@ -35,6 +36,19 @@ def test_generate_state_invalid_type():
         hier_gen.generate_state('unknown', 'Example State', 'ES', ID_GEN)
 
 
+def test_generate_district_group():
+    state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
+    group = hier_gen.generate_district_group(state, ID_GEN)
+    other = hier_gen.generate_district_group(state, ID_GEN)
+
+    # Tests
+    assert isinstance(group, DistrictGroup)
+    assert group.state == state
+    assert re.match(state.id + 'G[0-9]{4}', group.id)
+    assert group.id != other.id
+    assert group.name
+
+
 def test_generate_district():
     # Create objects
     state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
@@ -3,6 +3,7 @@ Unit tests for the population module.
 
 """
 
+import copy
 import re
 
 import datagen.config.cfg as cfg
@@ -10,6 +11,7 @@ import datagen.generators.hierarchy as hier_gen
 import datagen.generators.population as pop_gen
 from datagen.model.staff import TeachingStaff
 from datagen.model.student import Student
+from datagen.util.assessment_stats import adjust_capability
 from datagen.util.id_gen import IDGen
 
 ID_GEN = IDGen()
@@ -42,6 +44,30 @@ def test_generate_student():
     assert student.school_entry_date.month in [8, 9]
 
 
+def test_generate_students():
+    # Create objects
+    state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
+    district = hier_gen.generate_district('Big Average', state, ID_GEN)
+    school = hier_gen.generate_school('Elementary School', district, ID_GEN)
+    students = pop_gen.generate_students(school, 3, 4000, ID_GEN, 2015, ['ELA', 'Math'])
+
+    # Tests
+    assert len(students) == 4000
+    assert len({s.id for s in students}) == 4000
+    assert all(s.school == school and s.grade == 3 for s in students)
+    assert all(0.0 <= s.capability['ELA'] < 4.0 and 0.0 <= s.capability['Math'] < 4.0 for s in students)
+
+    # marginal distributions match the configuration
+    config = school.demo_config['3']
+    female = sum(1 for s in students if s.gender == 'female') / len(students)
+    assert abs(female - config['gender']['female']['perc']) < 0.04
+    iep = sum(1 for s in students if s.prg_iep) / len(students)
+    assert abs(iep - config['iep']['perc']) < 0.04
+    multi = [s for s in students if s.eth_multi]
+    assert abs(len(multi) / len(students) - config['ethnicity']['multi']['perc']) < 0.04
+    assert all(s.derived_demographic != -1 for s in students)
+
+
 def test_advance_student_advanced():
     # Create objects
     state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
@@ -78,13 +104,53 @@ def test_advance_student_drop_out():
     assert not pop_gen.advance_student(student, schools_by_grade, hold_back_rate=1, drop_out_rate=1)
 
 
+def test_advance_students():
+    # Create objects
+    state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
+    district = hier_gen.generate_district('Big Average', state, ID_GEN)
+    elem_school = hier_gen.generate_school('Elementary School', district, ID_GEN)
+    midl_school = hier_gen.generate_school('Middle School', district, ID_GEN)
+    schools_by_grade = hier_gen.sort_schools_by_grade([elem_school, midl_school])
+    top_grade = max(elem_school.grades)
+    students = pop_gen.generate_students(elem_school, top_grade, 1000, ID_GEN, 2015, ['ELA', 'Math'])
+    capabilities = [dict(s.capability) for s in students]
+
+    remaining = pop_gen.advance_students(students, schools_by_grade, hold_back_rate=0.2, drop_out_rate=0.5,
+                                         transfer_rate=0)
+
+    # Tests
+    held_back = [s for s in students if s.held_back]
+    assert 100 < len(held_back) < 300
+    assert 0.3 < 1 - len([s for s in held_back if s in remaining]) / len(held_back) < 0.7
+    for student, capability in zip(students, capabilities):
+        if student.held_back:
+            assert student.grade == top_grade and student.school == elem_school
+            assert student.capability == capability
+        else:
+            # forced to transfer to the middle school, capability adjusted the same as before
+            assert student in remaining
+            assert student.grade == top_grade + 1 and student.school == midl_school and student.transfer
+            adj = [pop_gen.inverse_adjustment(elem_school.type_config.adjust_pld),
+                   midl_school.type_config.adjust_pld, 0.1]
+            for subject_code, value in capability.items():
+                for a in adj:
+                    value = adjust_capability(value, a)
+                assert abs(student.capability[subject_code] - value) < 1e-9
+
+
+def _set_student_counts(school, count):
+    # compiled configuration is frozen, so give the school a configuration of its own
+    config = copy.deepcopy(school.config)
+    config['students'].update(min=count, max=count, avg=count)
+    school.config = config
+
+
 def test_repopulate_school_grade_empty():
     # Create objects
     state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
     district = hier_gen.generate_district('Big Average', state, ID_GEN)
     elem_school = hier_gen.generate_school('Elementary School', district, ID_GEN)
-    elem_school.config['students']['min'], elem_school.config['students']['max'] = 100, 100
-    elem_school.config['students']['avg'] = 100
+    _set_student_counts(elem_school, 100)
     students = []
     pop_gen.repopulate_school_grade(elem_school, 3, students, ID_GEN, None, 2015, ['Math', 'ELA'], additional_student_choice=[0])
 
@@ -97,8 +163,7 @@ def test_repopulate_school_grade_empty_with_additional():
     state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
     district = hier_gen.generate_district('Big Average', state, ID_GEN)
     elem_school = hier_gen.generate_school('Elementary School', district, ID_GEN)
-    elem_school.config['students']['min'], elem_school.config['students']['max'] = 100, 100
-    elem_school.config['students']['avg'] = 100
+    _set_student_counts(elem_school, 100)
     students = []
     pop_gen.repopulate_school_grade(elem_school, 3, students, ID_GEN, None, 2015, ['Math', 'ELA'], additional_student_choice=[3])
 
@@ -111,8 +176,7 @@ def test_repopulate_school_grade_full_no_additional():
     state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
     district = hier_gen.generate_district('Big Average', state, ID_GEN)
     elem_school = hier_gen.generate_school('Elementary School', district, ID_GEN)
-    elem_school.config['students']['min'], elem_school.config['students']['max'] = 100, 100
-    elem_school.config['students']['avg'] = 100
+    _set_student_counts(elem_school, 100)
     students = []
     for _ in range(100):
         students.append(pop_gen.generate_student(elem_school, 4, ID_GEN, 2015, ['ELA', 'Math']))
@@ -127,8 +191,7 @@ def test_repopulate_school_grade_full_additional():
     state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
     district = hier_gen.generate_district('Big Average', state, ID_GEN)
     elem_school = hier_gen.generate_school('Elementary School', district, ID_GEN)
-    elem_school.config['students']['min'], elem_school.config['students']['max'] = 100, 100
-    elem_school.config['students']['avg'] = 100
+    _set_student_counts(elem_school, 100)
     students = []
     for _ in range(100):
         students.append(pop_gen.generate_student(elem_school, 4, ID_GEN, 2015, ['ELA', 'Math']))
@@ -143,8 +206,7 @@ def test_repopulate_school_grade_almost_full_additional():
     state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
     district = hier_gen.generate_district('Big Average', state, ID_GEN)
     elem_school = hier_gen.generate_school('Elementary School', district, ID_GEN)
-    elem_school.config['students']['min'], elem_school.config['students']['max'] = 100, 100
-    elem_school.config['students']['avg'] = 100
+    _set_student_counts(elem_school, 100)
     students = []
     for _ in range(99):
         students.append(pop_gen.generate_student(elem_school, 4, ID_GEN, 2015, ['ELA', 'Math']))
@@ -300,6 +362,29 @@ def test_generate_derived_demographic_white():
     assert pop_gen._generate_derived_demographic(student) == 6
 
 
+def test_assign_student_groups():
+    state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
+    district = hier_gen.generate_district('Big Average', state, ID_GEN)
+    school = hier_gen.generate_school('Elementary School', district, ID_GEN)
+    students = pop_gen.generate_students(school, 3, 2 * school.group_size + 1, ID_GEN, 2015, ['ELA', 'Math'])
+    id_gen = IDGen()
+    pop_gen.assign_student_groups(school, 3, students, id_gen, ['ELA', 'Math'])
+
+    # three groups per subject
+    ela_ids = {s.get_group('ELA').id for s in students}
+    math_ids = {s.get_group('Math').id for s in students}
+    assert ela_ids <= {100, 200, 300}
+    assert math_ids <= {400, 500, 600}
+    assert all(s.get_group('ELA').name == 'G3-' + str(s.get_group('ELA').id) for s in students)
+    assert all(s.get_group('ELA').subject_code == 'ELA' for s in students)
+    assert id_gen.get_group_id('group') == 700
+
+    # reassigning replaces the groups
+    pop_gen.assign_student_groups(school, 3, students, id_gen, ['ELA'])
+    assert all(800 <= s.get_group('ELA').id <= 1000 for s in students)
+    assert all(list(s.groups) == ['ELA', 'Math'] for s in students)
+
+
 def test_set_lang_items_not_lep():
     # Create objects
     state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
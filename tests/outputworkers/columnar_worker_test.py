@@ -0,0 +1,53 @@
+"""
+Unit tests for the columnar (Parquet/Arrow) output worker.
+
+"""
+import os
+
+import pytest
+
+from tests.outputworkers.outcomes import generate_outcomes
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from datagen.outputworkers.columnar_worker import ColumnarWorker
+
+
+def test_parquet_worker(tmpdir):
+    asmt, _, outcomes = generate_outcomes(5)
+    worker = ColumnarWorker(str(tmpdir), 'parquet', batch_size=2)
+    worker.prepare()
+    worker.write_assessment_outcome(outcomes, asmt.guid, 'ES', 'D1')
+    worker.cleanup()
+
+    path = os.path.join(str(tmpdir), 'parquet', 'outcomes', 'year=2015', 'subject=ELA', 'type=ICA', 'part-0.parquet')
+    table = pq.read_table(path)
+    assert table.num_rows == 5
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
+    assert table.column('rec_id').to_pylist() == [o.rec_id for o in outcomes]
+
+    claims = pq.read_table(os.path.join(str(tmpdir), 'parquet', 'claim_scores'))
+    assert claims.num_rows == 5 * len(asmt.claims)
+
+    items = pq.read_table(os.path.join(str(tmpdir), 'parquet', 'items'))
+    assert items.num_rows == sum(len(o.item_data) for o in outcomes)
+
+
+def test_arrow_worker(tmpdir):
+    asmt, _, outcomes = generate_outcomes(3)
+    worker = ColumnarWorker(str(tmpdir), 'arrow')
+    worker.prepare()
+    worker.write_iab_outcome(outcomes, asmt.guid)
+    worker.cleanup()
+
+    path = os.path.join(str(tmpdir), 'arrow', 'outcomes', 'year=2015', 'subject=ELA', 'type=ICA', 'part-0.arrow')
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.num_rows == 3
+    assert table.column('overall_score').to_pylist() == [o.overall.score for o in outcomes]
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        ColumnarWorker('out', 'csv')
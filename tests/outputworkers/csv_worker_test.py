@@ -0,0 +1,70 @@
+"""
+Unit tests for the CSV/TSV bulk load output worker.
+
+"""
+import csv
+import json
+import os
+
+import pytest
+
+from datagen.outputworkers.csv_worker import CsvWorker
+from tests.outputworkers.outcomes import generate_outcomes
+
+
+def test_csv_worker(tmpdir):
+    asmt, students, outcomes = generate_outcomes(4)
+    worker = CsvWorker(str(tmpdir))
+    worker.prepare()
+    worker.write_students_dim(students)
+    worker.write_students_reg(students, 'rs-guid', 2015)
+    worker.write_assessment_outcome(outcomes, asmt.guid, 'ES', 'D1')
+    worker.cleanup()
+
+    with open(os.path.join(str(tmpdir), 'ASMT_OUTCOME_0001.csv')) as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row['rec_id']) for row in rows] == [o.rec_id for o in outcomes]
+
+    with open(os.path.join(str(tmpdir), 'ASMT_OUTCOME_0001.json')) as f:
+        manifest = json.load(f)
+    assert manifest['rows'] == 4
+    assert manifest['file'] == 'ASMT_OUTCOME_0001.csv'
+
+    with open(os.path.join(str(tmpdir), 'STUDENT_REG_0001.csv')) as f:
+        assert len(list(csv.DictReader(f))) == 4
+    with open(os.path.join(str(tmpdir), 'ASMT_CLAIM_SCORE_0001.json')) as f:
+        assert json.load(f)['rows'] == 4 * len(asmt.claims)
+
+
+def test_csv_worker_rotates_files(tmpdir):
+    asmt, students, outcomes = generate_outcomes(6)
+    worker = CsvWorker(str(tmpdir), max_file_size=1, buffer_size=1)
+    worker.prepare()
+    worker.write_iab_outcome(outcomes, asmt.guid)
+    worker.cleanup()
+
+    manifests = sorted(f for f in os.listdir(str(tmpdir)) if f.startswith('ASMT_OUTCOME_') and f.endswith('.json'))
+    assert len(manifests) == 6
+    assert all(os.path.isfile(os.path.join(str(tmpdir), m[:-5] + '.csv')) for m in manifests)
+
+
+def test_tsv_worker_escapes_values(tmpdir):
+    asmt, students, outcomes = generate_outcomes(1)
+    students[0].middle_name = None
+    students[0].last_name = 'Tab\tNew\nLine'
+    worker = CsvWorker(str(tmpdir), 'tsv')
+    worker.prepare()
+    worker.write_students_dim(students)
+    worker.cleanup()
+
+    with open(os.path.join(str(tmpdir), 'STUDENT_0001.tsv')) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 2
+    values = lines[1].split('\t')
+    assert values[9] == '\\N'
+    assert values[10] == 'Tab\\tNew\\nLine'
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        CsvWorker('out', 'xls')
@@ -0,0 +1,152 @@
+"""
+Unit tests for the import service client and HTTP submission worker, using a local stub server.
+
+"""
+import json
+import os
+
+import pytest
+
+from datagen.outputworkers.http_worker import HttpWorker
+from datagen.util.import_client import ImportClient, ImportResult, TokenProvider
+from tests.outputworkers.outcomes import generate_outcomes
+from tests.util.import_stub import ImportStub
+
+
+def test_submit():
+    with ImportStub() as stub:
+        client = ImportClient(stub.url + '/exams/imports', TokenProvider('token-1'))
+        result = client.submit('ES/D1/S1/1.xml', '<TDSReport/>')
+        client.close()
+    assert result.ok
+    assert result.id == 1
+    assert result.status == 'ACCEPTED'
+    assert result.attempts == 1
+    assert b'filename="1.xml"' in stub.imports[0]
+    assert b'<TDSReport/>' in stub.imports[0]
+
+
+def test_submit_reuses_connection():
+    with ImportStub() as stub:
+        client = ImportClient(stub.url + '/exams/imports', TokenProvider('token-1'), pool_size=1)
+        for i in range(5):
+            assert client.submit('{}.xml'.format(i), '<TDSReport/>').ok
+        client.close()
+    assert len(stub.imports) == 5
+    assert len(stub.connections) == 1
+
+
+def test_submit_retries():
+    with ImportStub() as stub:
+        stub.fail_next = 2
+        client = ImportClient(stub.url + '/exams/imports', TokenProvider('token-1'), retries=3, backoff=0.01)
+        result = client.submit('1.xml', '<TDSReport/>')
+    assert result.ok
+    assert result.attempts == 3
+
+
+def test_submit_gives_up():
+    with ImportStub() as stub:
+        stub.fail_next = 10
+        client = ImportClient(stub.url + '/exams/imports', TokenProvider('token-1'), retries=2, backoff=0.01)
+        result = client.submit('1.xml', '<TDSReport/>')
+    assert not result.ok
+    assert result.http_status == 503
+    assert result.attempts == 3
+    assert result.error == 'unavailable'
+
+
+def test_submit_connection_error():
+    client = ImportClient('http://127.0.0.1:1/exams/imports', retries=1, backoff=0.01)
+    result = client.submit('1.xml', '<TDSReport/>')
+    assert not result.ok
+    assert result.http_status is None
+    assert result.attempts == 2
+    assert result.error
+
+
+def test_submit_bad_scheme():
+    with pytest.raises(ValueError):
+        ImportClient('localhost:8080/exams/imports')
+    with pytest.raises(ValueError):
+        ImportClient('ftp://localhost/exams/imports')
+
+
+def test_pool_releases_failed_connection():
+    client = ImportClient('http://localhost/exams/imports', pool_size=2, retries=0)
+    client.pool.url = client.pool.url._replace(scheme='ftp')
+    for i in range(3):
+        result = client.submit('1.xml', '<TDSReport/>')
+        assert not result.ok
+        assert result.error.startswith('ValueError')
+
+
+def test_token_refresh():
+    with ImportStub() as stub:
+        tokens = TokenProvider(token_url=stub.url + '/auth/token', token_data='grant_type=password')
+        client = ImportClient(stub.url + '/exams/imports', tokens)
+        assert client.submit('1.xml', '<TDSReport/>').ok
+        stub.expire_token()
+        result = client.submit('2.xml', '<TDSReport/>')
+    assert result.ok
+    assert result.attempts == 2
+    assert stub.token_requests == 2
+
+
+def test_token_refresh_fails():
+    with ImportStub() as stub:
+        tokens = TokenProvider(token_url=stub.url + '/auth/token', token_data='grant_type=password')
+        client = ImportClient(stub.url + '/exams/imports', tokens, retries=1, backoff=0.01)
+        assert client.submit('1.xml', '<TDSReport/>').ok
+        stub.expire_token()
+        stub.no_access_token = True
+        # doesn't raise, the failure is in the result
+        result = client.submit('2.xml', '<TDSReport/>')
+    assert not result.ok
+    assert result.http_status is None
+    assert 'ValueError: Token response has no access_token' in result.error
+
+
+class _FailingClient:
+    def submit(self, file, data) -> ImportResult:
+        raise KeyError('access_token')
+
+    def close(self):
+        pass
+
+
+def test_http_worker_records_errors(tmpdir):
+    asmt, _, outcomes = generate_outcomes(3)
+    log = os.path.join(str(tmpdir), 'imports.log')
+    worker = HttpWorker(_FailingClient(), concurrency=2, result_log=log)
+    worker.prepare()
+    worker.write_assessment_outcome(outcomes, asmt.guid, 'ES', 'D1')
+    worker.cleanup()
+
+    assert worker.submitted == 3
+    assert worker.failed == 3
+    with open(log) as f:
+        results = [json.loads(line) for line in f]
+    assert len(results) == 3
+    assert all(r['error'] == "KeyError: 'access_token'" and r['http_status'] is None for r in results)
+
+
+def test_http_worker(tmpdir):
+    asmt, _, outcomes = generate_outcomes(6)
+    log = os.path.join(str(tmpdir), 'imports.log')
+    with ImportStub() as stub:
+        stub.fail_next = 1
+        client = ImportClient(stub.url + '/exams/imports', TokenProvider('token-1'), pool_size=2, backoff=0.01)
+        worker = HttpWorker(client, concurrency=2, result_log=log)
+        worker.prepare()
+        worker.write_assessment_outcome(outcomes, asmt.guid, 'ES', 'D1')
+        worker.cleanup()
+
+    assert worker.submitted == 6
+    assert worker.failed == 0
+    assert len(stub.imports) == 6
+    assert not os.path.exists(os.path.join(str(tmpdir), 'ES'))
+    with open(log) as f:
+        results = [json.loads(line) for line in f]
+    assert sorted(r['file'].split('/')[-1] for r in results) == sorted('{}.xml'.format(o.rec_id) for o in outcomes)
+    assert all(r['status'] == 'ACCEPTED' for r in results)
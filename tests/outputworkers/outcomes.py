@@ -0,0 +1,29 @@
+"""
+Assessment outcomes for the output worker tests.
+
+"""
+import datetime
+
+import datagen.generators.hierarchy as hier_gen
+import datagen.generators.population as pop_gen
+import datagen.generators.summative_or_ica_assessment as asmt_gen
+from datagen.util.id_gen import IDGen
+from tests.generators.assessment_test import generate_assessment
+
+ID_GEN = IDGen()
+
+
+def generate_outcomes(count):
+    """
+    Generate ICA outcomes for students of a school.
+
+    :param count: number of students (and outcomes)
+    :return: assessment, students, outcomes
+    """
+    state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
+    district = hier_gen.generate_district('Small Average', state, ID_GEN)
+    school = hier_gen.generate_school('Elementary School', district, ID_GEN)
+    asmt = generate_assessment('ICA', 2015, 'ELA', 3, ID_GEN)
+    students = [pop_gen.generate_student(school, 3, ID_GEN, 2015, ['ELA', 'Math']) for _ in range(count)]
+    outcomes = [asmt_gen.generate_assessment_outcome(datetime.date(2015, 1, 21), s, asmt, ID_GEN) for s in students]
+    return asmt, students, outcomes
@@ -0,0 +1,76 @@
+"""
+Unit tests for the compiled assessment package cache
+
+"""
+import os
+import shutil
+from inspect import getsourcefile
+from os.path import abspath, dirname, join
+
+import pytest
+
+from datagen.generators.subject import generate_default_subjects
+from datagen.readers.tabulator_reader import ITEM_FIELDS, load_assessments, load_assessments_file
+
+pytest.importorskip('pyarrow')
+
+from datagen.readers.package_cache import PackageCache  # noqa: E402
+
+test_data_dir = abspath(join(dirname(abspath(getsourcefile(lambda: 0))), '../../test_data/'))
+
+
+def _items(asmt):
+    return [tuple(getattr(item, field) for field in ITEM_FIELDS) for item in asmt.item_bank]
+
+
+def test_load_assessments_from_cache(tmpdir):
+    subjects = generate_default_subjects()
+    pattern = join(test_data_dir, 'IAB_*.items.csv')
+    cache_dir = str(tmpdir.join('cache'))
+
+    compiled = load_assessments(pattern, subjects, False, False, True, True, cache_dir)
+    assert len(os.listdir(cache_dir)) == 3  # two packages and the index
+    cached = load_assessments(pattern, subjects, False, False, True, True, cache_dir)
+    parsed = load_assessments(pattern, subjects, False, False, True, True)
+
+    assert len(cached) == len(parsed) == 14
+    for c, p in zip(cached, parsed):
+        assert (c.id, c.name, c.grade, c.type, c.year, c.accommodations, c.item_total_score) == \
+               (p.id, p.name, p.grade, p.type, p.year, p.accommodations, p.item_total_score)
+        assert (c.overall.score_min, c.overall.score_max, c.overall.cut_points) == \
+               (p.overall.score_min, p.overall.score_max, p.overall.cut_points)
+        assert _items(c) == _items(p)
+        assert all(item.segment_id == c.segment.id for item in c.item_bank)
+    assert [len(asmt.item_bank) for asmt in compiled] == [len(asmt.item_bank) for asmt in parsed]
+
+
+def test_cache_without_items(tmpdir):
+    subjects = generate_default_subjects()
+    file = join(test_data_dir, 'IAB_Math.items.csv')
+    cache_dir = str(tmpdir.join('cache'))
+
+    load_assessments(file, subjects, False, False, True, True, cache_dir)
+    asmts = load_assessments(file, subjects, False, False, True, False, cache_dir)
+    assert len(asmts) == 5
+    assert asmts[0].item_bank is None
+    assert asmts[0].accommodations == load_assessments_file(file, subjects, False, False, True, False)[0].accommodations
+
+
+def test_cache_key(tmpdir):
+    file = str(tmpdir.join('IAB_Math.items.csv'))
+    shutil.copyfile(join(test_data_dir, 'IAB_Math.items.csv'), file)
+    cache = PackageCache(str(tmpdir.join('cache')))
+
+    key = cache.key(file)
+    assert PackageCache(cache.path).key(file) == key
+    # a copy has the same content, so the same key
+    assert cache.key(join(test_data_dir, 'IAB_Math.items.csv')) == key
+
+    with open(file, 'a') as f:
+        f.write('\n')
+    assert cache.key(file) != key
+
+
+def test_cache_ignores_other_files(tmpdir):
+    cache = PackageCache(str(tmpdir.join('cache')))
+    assert cache.load(join(test_data_dir, 'hierarchy.good.csv')) is None
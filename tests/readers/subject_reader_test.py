@@ -5,7 +5,9 @@ Unit tests for tabulator reader methods
 from inspect import getsourcefile
 from os.path import abspath, dirname, join
 
-from datagen.readers.subject_reader import load_subject_file
+import pytest
+
+from datagen.readers.subject_reader import load_subject_file, load_subjects
 
 # technique for getting current directory regardless of how it is being run
 test_data_dir = abspath(join(dirname(abspath(getsourcefile(lambda: 0))), '../../test_data/'))
@@ -23,5 +25,26 @@ def test_reading_ELPAC():
     assert sum.claim_scoring.perf_levels == 3
 
 
+def test_reading_subject_claims(tmpdir):
+    file = tmpdir.join('subject.xml')
+    file.write('<Subject code="Sci"><AssessmentTypes><AssessmentType code="ica">'
+               '<OverallScoring minScore="1" maxScore="9"><PerformanceLevels><PerformanceLevel level="1"/>'
+               '<PerformanceLevel level="2"/></PerformanceLevels></OverallScoring><AltScoring/>'
+               '</AssessmentType></AssessmentTypes><Claims><Claim code="1" name="One" scorable="No"/>'
+               '<Claim code="2" name="Two"/><Claim code="3" name="Three" scorable="1"/></Claims></Subject>')
+    subject = load_subjects(str(file))[0]
+    assert subject.code == 'Sci'
+    assert subject.alts is None
+    assert [claim.code for claim in subject.claims] == ['2', '3']
+    ica = subject.types['ICA']
+    assert (ica.overall_scoring.perf_levels, ica.overall_scoring.min_score, ica.overall_scoring.max_score) == (2, '1', '9')
+    assert ica.alt_scoring is None
+    assert ica.claim_scoring is None
+
+    file.write('<Subject code="Sci"><Claims><Claim code="1" scorable="maybe"/></Claims></Subject>')
+    with pytest.raises(ValueError):
+        load_subject_file(str(file))
+
+
 if __name__ == '__main__':
     test_reading_ELPAC()
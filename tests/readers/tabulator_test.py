@@ -6,7 +6,8 @@ from inspect import getsourcefile
 from os.path import abspath, dirname, join
 
 from datagen.generators.subject import generate_default_subjects
-from datagen.readers.tabulator_reader import load_assessments_file
+from datagen.readers.tabulator_reader import build_assessments, compile_assessments_file, load_assessments, \
+    load_assessments_file
 
 # technique for getting current directory regardless of how it is being run
 test_data_dir = abspath(join(dirname(abspath(getsourcefile(lambda: 0))), '../../test_data/'))
@@ -38,3 +39,62 @@ def test_reading_math_iab_without_items():
     asmts = load_assessments_file(join(test_data_dir, 'IAB_Math.items.csv'), subjects, False, False, True, False)
     assert len(asmts) == 5
     assert asmts[0].item_bank is None
+
+
+def test_load_assessments_in_parallel(capsys):
+    subjects = generate_default_subjects()
+    pattern = join(test_data_dir, 'IAB_*.items.csv')
+    serial = load_assessments(pattern, subjects, False, False, True, True)
+    parallel = load_assessments(pattern, subjects, False, False, True, True, processes=2)
+    assert sorted(asmt.id for asmt in parallel) == sorted(asmt.id for asmt in serial)
+    assert sum(len(asmt.item_bank) for asmt in parallel) == sum(len(asmt.item_bank) for asmt in serial) == 183
+    assert 'Loaded 14 assessments from 2 files (2 parsed, 0 cached), 183 items' in capsys.readouterr().out
+
+
+def test_load_assessments_counts_loaded_items(capsys):
+    subjects = generate_default_subjects()
+    pattern = join(test_data_dir, 'IAB_*.items.csv')
+    # the files only have IABs, their items aren't counted if IABs aren't loaded
+    assert load_assessments(pattern, subjects, True, True, False, True) == []
+    assert 'Loaded 0 assessments from 2 files (2 parsed, 0 cached), 0 items' in capsys.readouterr().out
+    load_assessments(pattern, subjects, False, False, True, False)
+    assert 'Loaded 14 assessments from 2 files (2 parsed, 0 cached), 0 items' in capsys.readouterr().out
+
+
+def test_compile_assessments_file(tmpdir):
+    file = tmpdir.join('asmt.csv')
+    # a short row and a blank line should be handled like csv.DictReader does
+    file.write('AssessmentId,AssessmentName,AssessmentSubject,AssessmentGrade,AssessmentType,AssessmentSubtype,'
+               'AssessmentVersion,AcademicYear,ASL\n'
+               'a1,A1,Math,3,interim,IAB,1,2019,\n'
+               '\n'
+               'a1,A1,Math,3,interim,IAB,1,2019,Y\n'
+               'a2,A2,ELA,KG,interim,ICA\n')
+    records, items = compile_assessments_file(str(file))
+    assert items is None
+    assert [record['row']['AssessmentId'] for record in records] == ['a1', 'a2']
+    assert records[0]['accommodations'] == ['AmericanSignLanguage']
+    assert records[1]['row']['AcademicYear'] is None
+
+
+def test_build_assessments_by_subject_code():
+    subjects = generate_default_subjects()
+    records, items = compile_assessments_file(join(test_data_dir, 'IAB_Math.items.csv'))
+    for record in records:
+        record['row']['AssessmentSubject'] = 'MATH'
+    asmts = build_assessments(records, items, subjects, False, False, True, False)
+    assert len(asmts) == 5
+    assert all(asmt.subject.code == 'Math' for asmt in asmts)
+
+
+def test_items_are_shared_across_assessments():
+    subjects = generate_default_subjects()
+    file = join(test_data_dir, 'IAB_Math.items.csv')
+    first = load_assessments_file(file, subjects, False, False, True, True)
+    second = load_assessments_file(file, subjects, False, False, True, True)
+    for asmt1, asmt2 in zip(first, second):
+        assert asmt1.segment.id != asmt2.segment.id
+        for item1, item2 in zip(asmt1.item_bank, asmt2.item_bank):
+            assert item1 is not item2
+            assert item1.item is item2.item
+            assert item1.segment_id == asmt1.segment.id and item2.segment_id == asmt2.segment.id
@@ -0,0 +1,35 @@
+"""
+Unit tests for the assessment index.
+
+"""
+from datagen.util.assessment_index import AssessmentIndex
+from datagen.util.id_gen import IDGen
+from tests.generators.assessment_test import generate_assessment
+
+ID_GEN = IDGen()
+
+
+def test_index():
+    assessments = [generate_assessment('SUM', 2017, 'Math', 3, ID_GEN),
+                   generate_assessment('IAB', 2017, 'ELA', 3, ID_GEN),
+                   generate_assessment('ICA', 2017, 'Math', 3, ID_GEN),
+                   generate_assessment('IAB', 2017, 'Math', 3, ID_GEN),
+                   generate_assessment('SUM', 2017, 'ELA', 11, ID_GEN),
+                   generate_assessment('SUM', 2018, 'Math', 3, ID_GEN)]
+    index = AssessmentIndex(assessments)
+
+    assert len(index) == 6
+    assert index.years == [2017, 2018]
+    assert index.grades == {3, 11}
+    assert index.subject_codes == ['ELA', 'Math']
+
+    # in the order they were loaded
+    assert index.get(2017, 3) == assessments[0:4]
+    assert index.get(2017, 3, 'IAB') == [assessments[1], assessments[3]]
+    assert index.get(2017, 11) == [assessments[4]]
+    assert index.get(2018, 11) == []
+    assert index.get(2018, 3, 'ICA') == []
+
+    assert index.get_subject_codes(2017, 3) == ['ELA', 'Math']
+    assert index.get_subject_codes(2018, 3) == ['Math']
+    assert index.get_subject_codes(2016, 3) == []
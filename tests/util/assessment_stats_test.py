@@ -4,7 +4,8 @@
 import pytest
 
 from datagen.util.assessment_stats import DemographicLevels, Stats, score_given_capability, performance_level, \
-    random_subscores
+    random_subscores, scores_given_capabilities, performance_levels, random_subscores_batch, random_stderr, \
+    random_stderrs
 from datagen.util.assessment_stats import RandomLevelByDemographics, Properties, GradeLevels
 from datagen.util.assessment_stats import random_capability
 from datagen.util.weighted_choice import weighted_choice
@@ -157,5 +158,50 @@ def test_random_subscores():
     subscores = random_subscores(1900, [0.5, 0.5], 1100, 1950)
 
 
+def test_scores_given_capabilities():
+    cuts = [2300, 2400, 2500, 2600, 2700, 2800, 2900]
+    for capability, mean_score, mean_level in ((0.0, 2300, 1.0), (2.0, 2600, 3.5), (3.99, 2899, 6.0)):
+        scores, levels = scores_given_capabilities([capability] * 1000, cuts)
+        assert abs(sum(scores) / len(scores) - mean_score) <= 15
+        assert abs(sum(levels) / len(levels) - mean_level) <= 0.3
+        assert all(cuts[0] <= score < cuts[-1] for score in scores)
+
+        # same distribution as the single version
+        singles = [score_given_capability(capability, cuts)[0] for _ in range(1000)]
+        assert abs(sum(scores) / len(scores) - sum(singles) / len(singles)) <= 10
+
+
+def test_performance_levels():
+    cuts = [2300, 2400, 2500, 2600, 2700]
+    scores = list(range(2300, 2701))
+    assert performance_levels(scores, cuts) == [performance_level(score, cuts) for score in scores]
+    with pytest.raises(ValueError):
+        performance_levels([2299], cuts)
+
+
+def test_random_subscores_batch():
+    for weights in ([0.5, 0.5], [0.25, 0.25, 0.25, 0.25], [0.2, 0.2, 0.2, 0.2, 0.2], [0.4, 0.3, 0.3]):
+        scores = [1100 + (i * 7) % 850 for i in range(500)]
+        subscores = random_subscores_batch(scores, weights, 1100, 1950)
+        assert len(subscores) == len(scores)
+        for score, row in zip(scores, subscores):
+            assert len(row) == len(weights)
+            assert all(1100 <= subscore <= 1950 for subscore in row)
+            assert score - 1 <= sum(weight * subscore for weight, subscore in zip(weights, row)) <= score + 1
+
+    # subscores lean towards the score, like the single version
+    batch = random_subscores_batch([1500] * 2000, [0.5, 0.5], 1100, 1950)
+    singles = [random_subscores(1500, [0.5, 0.5], 1100, 1950) for _ in range(2000)]
+    assert abs(sum(row[0] for row in batch) / 2000 - sum(row[0] for row in singles) / 2000) <= 15
+
+
+def test_random_stderrs():
+    stderrs = random_stderrs([1100, 1500, 1950] * 1000, 1100, 1950)
+    assert all(25 <= stderr <= 25 + 60 + 120 for stderr in stderrs[0::3])
+    assert all(25 <= stderr <= 25 + 60 for stderr in stderrs[2::3])
+    singles = [random_stderr(1500, 1100, 1950) for _ in range(1000)]
+    assert abs(sum(stderrs[1::3]) / 1000 - sum(singles) / 1000) <= 5
+
+
 if __name__ == '__main__':
     test_random_subscores()
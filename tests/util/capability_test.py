@@ -0,0 +1,97 @@
+"""
+Unit tests for the capability module.
+
+"""
+import random
+
+import pytest
+
+from datagen.model.student import Student
+from datagen.util.assessment_stats import adjust_capability, random_capability
+from datagen.util.capability import CapabilityEngine, combine_adjustments, get_engine
+
+DISTRIBUTIONS = [[0.04, 0.32, 0.57, 0.07], [0.25, 0.25, 0.25, 0.25], [0.5, 0.5, 0.0, 0.0]]
+SUBJECTS = ['ELA', 'Math', 'ELPAC']
+
+
+def _initialize(engine, n, adj=0.0):
+    students = [Student() for _ in range(n)]
+    engine.initialize(students, SUBJECTS, [DISTRIBUTIONS] * n, [[adj] * len(SUBJECTS)] * n)
+    return students
+
+
+def _ks_statistic(a: [float], b: [float]) -> float:
+    """ Two-sample Kolmogorov-Smirnov statistic, the max distance between the empirical distribution functions """
+    a, b = sorted(a), sorted(b)
+    i = j = 0
+    d = 0.0
+    while i < len(a) and j < len(b):
+        if a[i] <= b[j]:
+            i += 1
+        else:
+            j += 1
+        d = max(d, abs(i / len(a) - j / len(b)))
+    return d
+
+
+def test_reference_engine_matches_random_capability():
+    random.seed(42)
+    expected = [[random_capability(distribution, -0.3) for distribution in DISTRIBUTIONS] for _ in range(10)]
+    random.seed(42)
+    students = _initialize(CapabilityEngine(), 10, -0.3)
+    assert [[s.capability[code] for code in SUBJECTS] for s in students] == expected
+
+
+def test_reference_engine_seed():
+    a = _initialize(get_engine('python', seed=1), 5)
+    b = _initialize(get_engine('python', seed=1), 5)
+    assert [s.capability for s in a] == [s.capability for s in b]
+
+
+def test_adjust():
+    engine = CapabilityEngine()
+    students = _initialize(engine, 5)
+    before = engine.matrix(students, SUBJECTS)
+    exponent = combine_adjustments([0.1, -0.2])
+    engine.adjust(students, [exponent] * 5)
+    after = engine.matrix(students, SUBJECTS)
+    for row_before, row_after in zip(before, after):
+        for value_before, value_after in zip(row_before, row_after):
+            assert value_after == pytest.approx(adjust_capability(adjust_capability(value_before, 0.1), -0.2))
+    assert engine.capabilities(students, 'Math') == [row[1] for row in after]
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        get_engine('fortran')
+
+
+def test_numpy_engine_equivalent():
+    pytest.importorskip('numpy')
+    n = 5000
+    python_engine = get_engine('python', seed=1)
+    numpy_engine = get_engine('numpy', seed=1)
+    for adj in (0.0, -0.4, 0.3):
+        python_students = _initialize(python_engine, n, adj)
+        numpy_students = _initialize(numpy_engine, n, adj)
+        for exponent in (1.0, combine_adjustments([0.1])):
+            python_engine.adjust(python_students, [exponent] * n)
+            numpy_engine.adjust(numpy_students, [exponent] * n)
+            for code in SUBJECTS:
+                a = python_engine.capabilities(python_students, code)
+                b = list(numpy_engine.capabilities(numpy_students, code))
+                assert all(0.0 <= value <= 4.0 for value in b)
+                assert sum(b) / n == pytest.approx(sum(a) / n, abs=0.05)
+                # the critical value for alpha = 0.001 is 1.95 * sqrt(2 / n) = 0.039
+                assert _ks_statistic(a, b) < 0.039
+
+
+def test_numpy_engine_matrix():
+    pytest.importorskip('numpy')
+    engine = get_engine('numpy', seed=1)
+    students = _initialize(engine, 7)
+    matrix = engine.matrix(students, SUBJECTS)
+    assert matrix.shape == (7, 3)
+    assert matrix[2, 1] == students[2].capability['Math']
+    # levels with no probability are never picked
+    assert (matrix[:, 2] <= 2.0).all()
@@ -0,0 +1,36 @@
+import pytest
+
+import datagen.config.hierarchy as hier_config
+import datagen.config.population as pop_config
+from datagen.util.compiled_config import COMPILED, ConfigCompiler, SchoolType
+
+
+def test_school_type():
+    school_type = SchoolType({'type': 'Odd School', 'grades': [5, 3, 4], 'students': {'min': 10, 'max': 20},
+                              'group_size': 5})
+    assert school_type.type == 'Odd School'
+    assert school_type.grades == (3, 4, 5)
+    assert 4 in school_type.grade_set and 6 not in school_type.grade_set
+    assert (school_type.student_min, school_type.student_max, school_type.student_avg) == (10, 20, 15)
+    assert school_type.group_size == 5
+    assert school_type.adjust_pld == 0.0
+    with pytest.raises(AttributeError):
+        school_type.grades = (3,)
+
+
+def test_compiling_once():
+    compiler = ConfigCompiler()
+    config = hier_config.SCHOOL_TYPES['High School']
+    assert compiler.school_type(config) is compiler.school_type(config)
+    assert compiler.school_type(config) is not compiler.school_type(dict(config))
+    assert compiler.school_type(None) is None
+
+
+def test_demographics():
+    config = pop_config.DEMOGRAPHICS['california']
+    demographics = COMPILED.demographics(config)
+    assert len(demographics) == 13
+    assert demographics[3]['gender'] is config['3']['gender']
+    with pytest.raises(TypeError):
+        demographics[3]['gender'] = {}
+    assert COMPILED.demographics({'3': {}, '5': {}}) == (None, None, None, {}, None, {})
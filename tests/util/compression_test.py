@@ -0,0 +1,79 @@
+import gzip
+
+import pytest
+
+from datagen.util.compression import OutputCompression
+
+
+def test_no_compression(tmpdir):
+    compression = OutputCompression()
+    path = str(tmpdir.join('out.xml'))
+    compression.write_file(path, 'hello')
+    assert compression.path(path) == path
+    with open(path) as f:
+        assert f.read() == 'hello'
+
+
+def test_gzip_round_trip(tmpdir):
+    compression = OutputCompression('gzip', level=9)
+    path = str(tmpdir.join('out.csv'))
+    with compression.open(path) as stream:
+        stream.write('a,b\n')
+        stream.write(b'1,2\n')
+    compression.close()
+    assert compression.path(path) == path + '.gz'
+    with gzip.open(path + '.gz', 'rt') as f:
+        assert f.read() == 'a,b\n1,2\n'
+    with compression.open_read(path) as f:
+        assert f.read() == 'a,b\n1,2\n'
+
+
+def test_gzip_is_deterministic(tmpdir):
+    compression = OutputCompression('gzip')
+    compression.write_file(str(tmpdir.join('a')), 'same content')
+    compression.write_file(str(tmpdir.join('b')), 'same content')
+    assert tmpdir.join('a.gz').read_binary() == tmpdir.join('b.gz').read_binary()
+
+
+def test_threaded(tmpdir):
+    compression = OutputCompression('gzip', threaded=True, queue_size=2)
+    for i in range(20):
+        compression.write_file(str(tmpdir.join('file{}'.format(i))), 'content {}'.format(i))
+    stream = compression.open(str(tmpdir.join('stream')))
+    for i in range(100):
+        stream.write('{}\n'.format(i))
+    stream.close()
+    compression.close()
+
+    for i in range(20):
+        with gzip.open(str(tmpdir.join('file{}.gz'.format(i))), 'rt') as f:
+            assert f.read() == 'content {}'.format(i)
+    with gzip.open(str(tmpdir.join('stream.gz')), 'rt') as f:
+        assert f.read() == ''.join('{}\n'.format(i) for i in range(100))
+
+
+def test_threaded_error_raised_on_close(tmpdir):
+    compression = OutputCompression(threaded=True)
+    compression.write_file(str(tmpdir.join('missing', 'out.xml')), 'data')
+    with pytest.raises(FileNotFoundError):
+        compression.close()
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        OutputCompression('bzip2')
+
+
+@pytest.mark.parametrize('codec, module', [('zstd', 'zstandard'), ('lz4', 'lz4.frame')])
+def test_optional_codec(tmpdir, codec, module):
+    try:
+        __import__(module)
+    except ImportError:
+        with pytest.raises(ValueError):
+            OutputCompression(codec)
+        return
+    compression = OutputCompression(codec)
+    path = str(tmpdir.join('out.xml'))
+    compression.write_file(path, 'hello')
+    with compression.open_read(path) as f:
+        assert f.read() == 'hello'
@@ -0,0 +1,46 @@
+"""
+Unit tests for the dates module.
+
+"""
+import datetime
+
+from datagen.util.dates import DateTable, weekday
+
+
+def test_date():
+    dates = DateTable()
+    ordinal = dates.ordinal(2015, 5, 10)
+    assert ordinal == datetime.date(2015, 5, 10).toordinal()
+    assert dates.date(ordinal) == datetime.date(2015, 5, 10)
+    assert dates.date(ordinal) is dates.get(2015, 5, 10)
+    assert dates.offset(datetime.date(2015, 5, 10), -10) == datetime.date(2015, 4, 30)
+
+
+def test_random_dates():
+    dates = DateTable()
+    values = dates.random_dates(dates.ordinal(2016), 0, 365, 1000)
+    assert len(values) == 1000
+    assert all(datetime.date(2016, 1, 1) <= value <= datetime.date(2016, 12, 31) for value in values)
+    assert len(set(id(value) for value in values)) == len(set(values))
+
+
+def test_iso():
+    dates = DateTable()
+    assert dates.iso(None) is None
+    assert dates.iso(datetime.date(2015, 5, 10)) == '2015-05-10'
+    assert dates.iso(datetime.date(2015, 5, 10)) is dates.iso(datetime.date(2015, 5, 10))
+    assert dates.iso(datetime.datetime(2015, 5, 10, 9, 30)) == '2015-05-10T09:30:00'
+
+
+def test_max_size():
+    dates = DateTable(max_size=10)
+    for ordinal in range(730000, 730100):
+        assert dates.iso(dates.date(ordinal)) == datetime.date.fromordinal(ordinal).isoformat()
+    assert len(dates._dates) <= 10
+    assert len(dates._isos) <= 10
+
+
+def test_weekday():
+    for day in range(1, 15):
+        value = datetime.date(2017, 5, day)
+        assert weekday(value.toordinal()) == value.weekday()
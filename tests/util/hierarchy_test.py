@@ -4,7 +4,11 @@ import pytest
 from inspect import getsourcefile
 from os.path import abspath, dirname, join
 
-from datagen.util.hierarchy import read_hierarchy, write_hierarchy
+import os
+
+from datagen.util.hierarchy import HierarchyWriter, cached_hierarchy, generate_hierarchy, hierarchy_cache_key, \
+    read_hierarchy, write_hierarchy
+from datagen.util.id_gen import IDGen
 
 # technique for getting current directory regardless of how it is being run
 test_data_dir = abspath(join(dirname(abspath(getsourcefile(lambda: 0))), '../../test_data/'))
@@ -33,3 +37,148 @@ def test_value_errors():
         read_hierarchy(join(test_data_dir, 'hierarchy.bad_school_type.csv'))
     with pytest.raises(ValueError):
         read_hierarchy(join(test_data_dir, 'hierarchy.multiple_states.csv'))
+
+
+HEADER = 'state_id,state_code,state_name,state_type,district_id,district_name,district_type,school_id,school_name,school_type,school_interims\n'
+
+
+def test_reading_interleaved_hierarchy(tmpdir):
+    file = tmpdir.join('hierarchy.csv')
+    file.write(HEADER +
+               '00,CA,California,tiny,D1,Igen District,Tiny,S1,Big Bay,Tiny Middle School,1\n'
+               '00,CA,California,tiny,D2,Crom District,Tiny,S2,Crom Hold,Tiny High School,0\n'
+               '00,CA,California,tiny,D1,Igen District,Tiny,S3,Igen Hold,Tiny High School,1\n'
+               '00,CA,California,tiny,D1,Igen District,Tiny,S1,Big Bay,Tiny Middle School,1\n')
+    state, districts, schools = read_hierarchy(str(file))
+    assert [d.id for d in districts] == ['D1', 'D2']
+    assert [s.id for s in schools] == ['S1', 'S2', 'S3']
+    assert schools[0].district is schools[2].district is districts[0]
+    assert all(d.state is state for d in districts)
+    assert not schools[1].takes_interim_asmts
+
+
+def test_reporting_all_errors(tmpdir):
+    file = tmpdir.join('hierarchy.csv')
+    file.write(HEADER +
+               '00,CA,California,tiny,D1,Igen District,Big,S1,Big Bay,Tiny Middle School,1\n'
+               '00,CA,California,tiny,D1,Igen District,Big,S2,Igen Hold,Tiny High School,1\n'
+               '00,CA,California,tiny,D2,Crom District,Tiny,S3,Crom Hold,Huge School,1\n'
+               '00,CA,California,tiny,D2,Crom Hold,Tiny,S4,Crom Hall,Tiny High School,1\n'
+               '00,CA,California,tiny,D2,Crom District,Tiny,S5,Crom Hall,Tiny High School,1\n'
+               '00,CA,California,tiny,D2,Crom District,Tiny,S5,Crom Hall II,Tiny High School,1\n'
+               '42,PN,Pern,tiny,D3,Pern District,Tiny,S6,Pern Hold,Tiny High School,1\n')
+    with pytest.raises(ValueError) as e:
+        read_hierarchy(str(file))
+    assert str(e.value).splitlines() == [
+        'Invalid hierarchy, 5 errors:',
+        "  line 2: District type 'Big' not found",
+        "  line 4: School type 'Huge School' not found",
+        "  line 5: District 'D2' doesn't match an earlier row",
+        "  line 7: School 'S5' doesn't match an earlier row",
+        '  line 8: State mismatch, it must be the same for all rows']
+
+
+def test_reading_district_groups(tmpdir):
+    file = tmpdir.join('hierarchy.csv')
+    file.write(HEADER[:-1] + ',district_group_id,district_group_name\n'
+               '00,CA,California,tiny,D1,Igen District,Tiny,S1,Big Bay,Tiny Middle School,1,G1,Pern North\n'
+               '00,CA,California,tiny,D2,Crom District,Tiny,S2,Crom Hold,Tiny High School,0,,\n'
+               '00,CA,California,tiny,D3,Fort District,Tiny,S3,Fort Hold,Tiny High School,1,G1,Pern North\n'
+               '00,CA,California,tiny,D1,Igen District,Tiny,S4,Igen Hold,Tiny High School,1,G1,Pern North\n')
+    state, districts, schools = read_hierarchy(str(file))
+    group = districts[0].group
+    assert (group.id, group.name) == ('G1', 'Pern North')
+    assert group.state is state
+    assert districts[1].group is None
+    assert districts[2].group is group
+
+
+def test_reporting_district_group_errors(tmpdir):
+    file = tmpdir.join('hierarchy.csv')
+    file.write(HEADER[:-1] + ',district_group_id,district_group_name\n'
+               '00,CA,California,tiny,D1,Igen District,Tiny,S1,Big Bay,Tiny Middle School,1,G1,Pern North\n'
+               '00,CA,California,tiny,D2,Crom District,Tiny,S2,Crom Hold,Tiny High School,1,G1,Pern South\n'
+               '00,CA,California,tiny,D1,Igen District,Tiny,S3,Igen Hold,Tiny High School,1,,\n')
+    with pytest.raises(ValueError) as e:
+        read_hierarchy(str(file))
+    assert str(e.value).splitlines() == [
+        'Invalid hierarchy, 2 errors:',
+        "  line 3: District group 'G1' doesn't match an earlier row",
+        "  line 4: District 'D1' doesn't match an earlier row"]
+
+
+def test_writing_district_groups(tmpdir):
+    file = str(tmpdir.join('hierarchy.csv'))
+    state, districts, schools = generate_hierarchy('example', 'Example State', 'ES', IDGen(), seed=42)
+    assert any(d.group for d in districts)
+    write_hierarchy(file, schools)
+
+    _, copy_districts, _ = read_hierarchy(file)
+    assert [(d.id, d.group.id if d.group else None, d.group.name if d.group else None) for d in copy_districts] == \
+           [(d.id, d.group.id if d.group else None, d.group.name if d.group else None) for d in districts]
+
+
+def test_appending_hierarchy(tmpdir):
+    file = str(tmpdir.join('hierarchy.csv'))
+    state, districts, schools = read_hierarchy(join(test_data_dir, 'hierarchy.good.csv'))
+
+    with HierarchyWriter(file) as writer:
+        writer.write(schools[:4])
+        writer.write(schools[2:6])
+    with HierarchyWriter(file, append=True) as writer:
+        writer.write(schools[5:])
+
+    _, copy_districts, copy_schools = read_hierarchy(file)
+    assert [s.id for s in copy_schools] == [s.id for s in schools]
+    assert [d.id for d in copy_districts] == [d.id for d in districts]
+    with open(file) as f:
+        assert len(f.readlines()) == len(schools) + 1
+
+    # a new writer overwrites the file
+    write_hierarchy(file, schools[:2])
+    assert len(read_hierarchy(file)[2]) == 2
+
+
+def test_appending_to_other_csv(tmpdir):
+    file = tmpdir.join('other.csv')
+    file.write('a,b\n1,2\n')
+    with pytest.raises(ValueError):
+        HierarchyWriter(str(file), append=True)
+
+
+def _ids(schools):
+    return [(s.id, s.name, s.type_str, s.takes_interim_asmts, s.district.id, s.district.name) for s in schools]
+
+
+def test_generating_seeded_hierarchy():
+    _, _, schools = generate_hierarchy('devel', 'Example State', 'ES', IDGen(), seed=42)
+    _, _, same = generate_hierarchy('devel', 'Example State', 'ES', IDGen(), seed=42)
+    _, _, other = generate_hierarchy('devel', 'Example State', 'ES', IDGen(), seed=43)
+    assert _ids(schools) == _ids(same)
+    assert _ids(schools) != _ids(other)
+
+
+def test_caching_generated_hierarchy(tmpdir):
+    cache_dir = str(tmpdir.join('cache'))
+    state, districts, schools = cached_hierarchy(cache_dir, 'devel', 'Example State', 'ES', IDGen())
+    assert len(os.listdir(cache_dir)) == 1
+
+    cached_state, cached_districts, cached_schools = cached_hierarchy(cache_dir, 'devel', 'Example State', 'ES', IDGen())
+    assert (cached_state.guid, cached_state.id, cached_state.code, cached_state.name) == \
+           (state.guid, state.id, state.code, state.name)
+    assert [(d.guid, d.id, d.name) for d in cached_districts] == [(d.guid, d.id, d.name) for d in districts]
+    assert [s.guid for s in cached_schools] == [s.guid for s in schools]
+    assert _ids(cached_schools) == _ids(schools)
+
+    # a different seed (or state) is a different hierarchy
+    cached_hierarchy(cache_dir, 'devel', 'Example State', 'ES', IDGen(), seed=1)
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_hierarchy_cache_key():
+    key = hierarchy_cache_key('devel', 'Example State', 'ES', 1)
+    assert key.startswith('devel-')
+    assert hierarchy_cache_key('devel', 'Example State', 'ES', 1) == key
+    assert hierarchy_cache_key('devel', 'Example State', 'ES', 2) != key
+    assert hierarchy_cache_key('devel', 'Example State', 'EX', 1) != key
+    assert hierarchy_cache_key('devel', 'Example State', 'ES', None) != key
@@ -18,6 +18,14 @@ def test_rec_id():
     assert id == 1000000000
 
 
+def test_rec_ids():
+    idg = IDGen()
+    assert idg.get_rec_id('some_object_type') == 1000000000
+    assert list(idg.get_rec_ids('some_object_type', 3)) == [1000000001, 1000000002, 1000000003]
+    assert list(idg.get_rec_ids('some_object_type', 0)) == []
+    assert idg.get_rec_id('some_object_type') == 1000000004
+
+
 def test_group_id():
     idg = IDGen()
     id = idg.get_group_id('some_object_type')
@@ -25,6 +33,13 @@ def test_group_id():
     assert id == 100
 
 
+def test_group_ids():
+    idg = IDGen()
+    assert idg.get_group_id('some_object_type') == 100
+    assert list(idg.get_group_ids('some_object_type', 3)) == [200, 300, 400]
+    assert idg.get_group_id('some_object_type') == 500
+
+
 def test_rec_id_from_two_types():
     idg = IDGen()
     assert idg.get_group_id('some_object_type_1') == 100
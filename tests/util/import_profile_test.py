@@ -0,0 +1,55 @@
+"""
+Unit tests for the import profile, and the start up budget of a run.
+
+"""
+from datagen.util.import_profile import package_profile, parse_import_times, profile_imports
+
+# time (in seconds) a run may spend importing datagen before generating anything
+STARTUP_BUDGET = 0.5
+
+IMPORT_TIMES = """import time: self [us] | cumulative | imported package
+import time:       150 |        150 |   _io
+import time:       300 |        300 |       pyprind.progbar
+import time:       200 |        500 |     pyprind
+import time:       100 |        100 |       datagen.model.school
+import time:       400 |        400 |       uuid
+import time:        50 |        950 |     datagen.util.id_gen
+import time:       500 |       1950 |   datagen.worker_manager
+not an import time line
+"""
+
+
+def test_parse_import_times():
+    imports = parse_import_times(IMPORT_TIMES.splitlines())
+    assert [module.name for module in imports] == ['_io', 'datagen.worker_manager']
+    worker_manager = imports[1]
+    assert (worker_manager.self_us, worker_manager.cumulative_us) == (500, 1950)
+    assert [module.name for module in worker_manager.children] == ['pyprind', 'datagen.util.id_gen']
+    assert [module.name for module in worker_manager.children[1].children] == ['datagen.model.school', 'uuid']
+
+
+def test_package_profile():
+    profiles = package_profile(parse_import_times(IMPORT_TIMES.splitlines()))
+    assert [profile.name for profile in profiles] == ['datagen.worker_manager', 'datagen.util.id_gen',
+                                                      'datagen.model.school']
+    worker_manager, id_gen, school = profiles
+    # modules outside datagen are attributed to the datagen module importing them
+    assert (worker_manager.self_us, worker_manager.imports_us, worker_manager.largest_import) == (500, 500, 'pyprind')
+    assert (id_gen.self_us, id_gen.imports_us, id_gen.total_us, id_gen.largest_import) == (50, 400, 450, 'uuid')
+    assert (school.total_us, school.largest_import) == (100, None)
+
+
+def test_startup_budget():
+    imports = profile_imports('datagen.generate_data')
+    modules = set()
+    stack = list(imports)
+    while stack:
+        module = stack.pop()
+        modules.add(module.name)
+        stack.extend(module.children)
+
+    startup_us = sum(module.cumulative_us for module in imports if module.in_package)
+    assert startup_us < STARTUP_BUDGET * 1000000, 'Importing datagen took {:.0f} ms'.format(startup_us / 1000)
+    # only imported when they are needed
+    for module in ('datagen.util.import_profile', 'multiprocessing', 'http.client', 'yaml', 'numpy', 'pyarrow'):
+        assert module not in modules
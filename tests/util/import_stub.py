@@ -0,0 +1,83 @@
+"""
+A local stand-in for the RDW import service (and token service), for tests.
+
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ImportStub:
+    """
+    Accepts POST /exams/imports with a bearer token, responds like the import service.
+    Can be told to fail the next N imports (with the given status), to expire the token and/or to respond to
+    token requests without a token.
+    """
+
+    def __init__(self):
+        self.imports = []
+        self.fail_next = 0
+        self.fail_status = 503
+        self.token = 'token-1'
+        self.token_requests = 0
+        self.no_access_token = False
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(self))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    def expire_token(self):
+        with self.lock:
+            self.token = 'token-{}'.format(self.token_requests + 1)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _handler(stub: ImportStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with stub.lock:
+                stub.connections.add(self.client_address)
+                if self.path == '/auth/token':
+                    stub.token_requests += 1
+                    stub.token = 'token-{}'.format(stub.token_requests)
+                    if stub.no_access_token:
+                        return self._respond(200, {'error': 'no token for you'})
+                    return self._respond(200, {'access_token': stub.token, 'expires_in': 3600})
+                if self.path != '/exams/imports':
+                    return self._respond(404, {'message': 'not found'})
+                if self.headers.get('Authorization') != 'Bearer ' + stub.token:
+                    return self._respond(401, {'message': 'unauthorized'})
+                if stub.fail_next > 0:
+                    stub.fail_next -= 1
+                    return self._respond(stub.fail_status, {'message': 'unavailable'})
+                stub.imports.append(body)
+                return self._respond(202, {'id': len(stub.imports), 'status': 'ACCEPTED'})
+
+        def _respond(self, status, data):
+            payload = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
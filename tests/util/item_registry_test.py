@@ -0,0 +1,58 @@
+"""
+Unit tests for the item registry.
+
+"""
+from datagen.model.item import AssessmentItem
+from datagen.util.item_registry import ItemRegistry
+
+
+def test_get_shares_items():
+    registry = ItemRegistry()
+    item = registry.get('200', '1234', 'MC', 1, 2, 0.5, 'B', 4, '1|NBT|E')
+    assert registry.get('200', '1234', 'MC', 1, 2, 0.5, 'B', 4, '1|NBT|E') is item
+    # another item's strings are shared
+    other = registry.get(''.join(['2', '00']), '5678', ''.join(['M', 'C']), 1, 2, 0.5, 'B', 4, None)
+    assert other is not item
+    assert other.bank_key is item.bank_key and other.type is item.type
+    assert len(registry) == 2
+
+
+def test_get_variants():
+    registry = ItemRegistry()
+    item = registry.get('200', '1234', 'MC', 1, 2, 0.5, 'B', 4, None)
+    variant = registry.get('200', '1234', 'MC', 1, 2, 0.75, 'B', 4, None)
+    assert variant is not item
+    assert variant.difficulty == 0.75
+    assert registry.get('200', '1234', 'MC', 1, 2, 0.75, 'B', 4, None) is variant
+    assert registry.get('200', '1234', 'MC', 1, 2, 0.5, 'B', 4, None) is item
+    assert len(registry) == 2
+
+    registry.clear()
+    assert len(registry) == 0
+
+
+def test_target():
+    registry = ItemRegistry()
+    target = registry.target(' 3 | G-SRT |A ')
+    assert target == '3|G-SRT|A'
+    assert registry.target(' 3 | G-SRT |A ') is target
+    assert registry.target('3|G-SRT|A') is target
+
+
+def test_assessment_item():
+    registry = ItemRegistry()
+    item = registry.get('200', '1234', 'MC', 1, 2, 0.5, 'B', 4, '1|NBT|E')
+    first = AssessmentItem(item)
+    first.position = 3
+    second = AssessmentItem(item)
+    second.position = 7
+    assert first.item is second.item is item
+    assert (first.item_key, first.max_score, first.target, first.position) == ('1234', 1, '1|NBT|E', 3)
+    assert (second.item_key, second.max_score, second.target, second.position) == ('1234', 1, '1|NBT|E', 7)
+
+    standalone = AssessmentItem()
+    assert standalone.item is not item
+    standalone.type = 'EQ'
+    assert standalone.item.type == 'EQ'
+    assert standalone.options_count == 0
+    assert standalone.operational == '1'
@@ -0,0 +1,26 @@
+"""
+Unit tests for the names helpers.
+
+"""
+import random
+
+from datagen.generators.names import NAMES_FEMALE_FIRST, NAMES_LAST, NAMES_MALE_FIRST
+from datagen.util.names_helpers import NameInfo, PeopleNames, _generate_names
+
+
+def test_people_names_are_lazy():
+    names = PeopleNames(NAMES_MALE_FIRST, NAMES_FEMALE_FIRST, NAMES_LAST)
+    assert not names.loaded
+    assert len(names.male_names) == 1000000
+    assert names.loaded
+    assert len(names.female_names) == len(names.last_names) == 1000000
+
+
+def test_generate_names():
+    all_names = [NameInfo('SMITH', 1.0, 1.0, 1), NameInfo('JONES', 0.5, 1.5, 2), NameInfo('RARE', 0.001, 1.501, 3)]
+    random.seed(1)
+    generated = _generate_names(1000, all_names, 1.501 * 0.01)
+    assert sum(generated.values()) == 1000
+    # the remaining slots are filled with names already added
+    assert set(generated) == {'SMITH', 'JONES'}
+    assert generated['SMITH'] >= 666 and generated['JONES'] >= 333
@@ -0,0 +1,101 @@
+"""
+Unit tests for the population snapshot module.
+
+"""
+import os
+
+import pytest
+
+import datagen.generators.hierarchy as hier_gen
+import datagen.generators.population as pop_gen
+from datagen.util.id_gen import IDGen
+
+pytest.importorskip('pyarrow')
+
+from datagen.util.population_snapshot import PopulationReader, PopulationWriter, STUDENT_FIELDS
+
+ID_GEN = IDGen()
+
+
+def _generate_population():
+    state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
+    districts = [hier_gen.generate_district('Small Average', state, ID_GEN) for _ in range(2)]
+    schools = [hier_gen.generate_school('Elementary School', district, ID_GEN, interim_asmt_rate=0.5)
+               for district in districts for _ in range(2)]
+    rs_by_year = {year: hier_gen.generate_registration_system(year, str(year - 1) + '-02-27', ID_GEN)
+                  for year in (2015, 2016)}
+    return state, districts, schools, rs_by_year
+
+
+def test_save_and_load(tmpdir):
+    path = os.path.join(str(tmpdir), 'population')
+    state, districts, schools, rs_by_year = _generate_population()
+
+    writer = PopulationWriter(path, ['ELA', 'Math'])
+    writer.write_hierarchy(schools)
+    writer.write_registration_systems(rs_by_year)
+    saved = {}
+    for district in districts:
+        school = [s for s in schools if s.district == district][0]
+        students = pop_gen.generate_students(school, 3, 5, ID_GEN, 2015, ['ELA', 'Math'])
+        for year in (2015, 2016):
+            if year > 2015:
+                pop_gen.advance_students(students, {4: [school]}, hold_back_rate=0.0, drop_out_rate=0.0)
+            # only ELA has groups
+            pop_gen.assign_student_groups(school, students[0].grade, students, ID_GEN, ['ELA'])
+            writer.add_enrollment(year, school, students[0].grade, students)
+            writer.flush()
+            saved[(district.guid, year)] = [(s.guid, s.school.guid, s.grade, s.rec_id, dict(s.capability),
+                                             s.groups['ELA'].id, s.groups['ELA'].name) for s in students]
+    writer.close()
+
+    reader = PopulationReader(path)
+    assert reader.years == [2015, 2016]
+    assert reader.grades == {3, 4}
+    assert reader.subject_codes == ['ELA', 'Math']
+
+    loaded_state, loaded_districts, loaded_schools = reader.hierarchy()
+    assert loaded_state.guid == state.guid
+    assert [d.guid for d in loaded_districts] == [d.guid for d in districts]
+    assert [(s.guid, s.id, s.name, s.type_str, s.takes_interim_asmts) for s in loaded_schools] == \
+           [(s.guid, s.id, s.name, s.type_str, s.takes_interim_asmts) for s in schools]
+
+    loaded_rs = reader.registration_systems()
+    assert loaded_rs[2016].guid == rs_by_year[2016].guid
+
+    for district in loaded_districts:
+        for year in (2015, 2016):
+            schools_with_grades = reader.enrollments(district, year, loaded_rs[year])
+            assert len(schools_with_grades) == 1
+            (school, grades), = schools_with_grades.items()
+            students = [student for grade_students in grades.values() for student in grade_students]
+            assert all(student.school is school and student.reg_sys is loaded_rs[year] for student in students)
+            assert [(s.guid, s.school.guid, s.grade, s.rec_id, s.capability, s.groups['ELA'].id,
+                     s.groups['ELA'].name) for s in students] == saved[(district.guid, year)]
+            assert all('Math' not in s.groups for s in students)
+
+
+def test_load_students(tmpdir):
+    path = os.path.join(str(tmpdir), 'population')
+    state, districts, schools, rs_by_year = _generate_population()
+    students = pop_gen.generate_students(schools[0], 3, 10, ID_GEN, 2015, ['ELA'])
+
+    writer = PopulationWriter(path, ['ELA'])
+    writer.write_hierarchy(schools)
+    writer.write_registration_systems(rs_by_year)
+    writer.add_enrollment(2015, schools[0], 3, students)
+    writer.close()
+
+    reader = PopulationReader(path)
+    _, loaded_districts, _ = reader.hierarchy()
+    loaded = reader.enrollments(loaded_districts[0], 2015)
+    loaded_students = list(loaded.values())[0][3]
+    for student, loaded_student in zip(students, loaded_students):
+        for name, _ in STUDENT_FIELDS:
+            assert getattr(loaded_student, name) == getattr(student, name)
+        assert loaded_student.district.guid == student.district.guid
+
+
+def test_no_snapshot(tmpdir):
+    with pytest.raises(ValueError):
+        PopulationReader(str(tmpdir))
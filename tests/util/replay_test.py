@@ -0,0 +1,124 @@
+"""
+Unit tests for the load-test replay, using a local stub import service.
+
+"""
+import gzip
+import math
+import os
+import socketserver
+import tarfile
+import threading
+
+import pytest
+
+from datagen.util.import_client import TokenProvider
+from datagen.util.replay import LatencyStats, Replay, iter_files
+from tests.util.import_stub import ImportStub
+
+
+def _write_files(root, count):
+    folder = os.path.join(root, 'ES', 'D1', 'S1')
+    os.makedirs(folder)
+    for i in range(count):
+        with open(os.path.join(folder, '{}.xml'.format(i)), 'w') as f:
+            f.write('<TDSReport id="{}"/>'.format(i))
+
+
+def test_latency_stats():
+    stats = LatencyStats()
+    for i in range(1, 101):
+        stats.record(i / 1000.0, 202)
+    stats.record(20.0, 503)
+    stats.record(0.001, 'TimeoutError')
+
+    assert stats.count == 102
+    assert stats.errors == 2
+    assert stats.percentile(50) == 0.05
+    assert stats.percentile(99) == 0.1
+    assert stats.percentile(100) == 20.0
+    histogram = dict(stats.histogram())
+    assert histogram[0.005] == 6
+    assert histogram[math.inf] == 1
+    assert sum(histogram.values()) == 102
+    assert 'p95=' in stats.report()
+
+
+def test_iter_files(tmpdir):
+    root = str(tmpdir.join('out'))
+    _write_files(root, 3)
+    with gzip.open(os.path.join(root, 'ES', 'D1', 'S1', '9.xml.gz'), 'wb') as f:
+        f.write(b'<TDSReport id="9"/>')
+
+    files = dict(iter_files(root))
+    assert sorted(files) == [os.path.join('ES', 'D1', 'S1', '{}.xml'.format(i)) for i in (0, 1, 2, 9)]
+    assert files[os.path.join('ES', 'D1', 'S1', '9.xml')] == b'<TDSReport id="9"/>'
+
+    archive = str(tmpdir.join('out.tar.gz'))
+    with tarfile.open(archive, 'w:gz') as tar:
+        tar.add(os.path.join(root, 'ES'), arcname='ES')
+    assert sorted(dict(iter_files(archive))) == ['ES/D1/S1/{}.xml'.format(i) for i in (0, 1, 2)]
+
+    with pytest.raises(ValueError):
+        list(iter_files(str(tmpdir.join('missing'))))
+
+
+def test_replay(tmpdir):
+    root = str(tmpdir)
+    _write_files(root, 20)
+    with ImportStub() as stub:
+        stub.fail_next = 2
+        replay = Replay(stub.url + '/exams/imports', TokenProvider('token-1'), rate=200, concurrency=4)
+        stats = replay.run(iter_files(root))
+
+    assert stats.count == 20
+    assert stats.errors == 2
+    assert stats.statuses == {202: 18, 503: 2}
+    assert len(stub.imports) == 18
+    assert len(stub.connections) <= 4
+    # 20 files at 200/s takes at least 95ms
+    assert stats.elapsed >= 0.095
+
+
+def test_replay_token_refresh(tmpdir):
+    root = str(tmpdir)
+    _write_files(root, 5)
+    with ImportStub() as stub:
+        tokens = TokenProvider(token_url=stub.url + '/auth/token')
+        tokens.get()
+        stub.expire_token()
+        replay = Replay(stub.url + '/exams/imports', tokens, concurrency=1)
+        stats = replay.run(iter_files(root))
+
+    # the first token is rejected, the refreshed one is accepted
+    assert stats.statuses == {401: 1, 202: 4}
+    assert stub.token_requests == 2
+
+
+def test_replay_connection_error():
+    replay = Replay('http://127.0.0.1:1/exams/imports', concurrency=2)
+    stats = replay.run([('1.xml', b'<TDSReport/>'), ('2.xml', b'<TDSReport/>')])
+    assert stats.count == 2
+    assert stats.errors == 2
+    assert stats.error_rate == 1.0
+
+
+class _MalformedHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.request.recv(65536)
+        self.wfile.write(b'MALFORMED\r\n')
+
+
+def test_replay_malformed_response():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _MalformedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        replay = Replay('http://127.0.0.1:{}/exams/imports'.format(server.server_address[1]), concurrency=2)
+        stats = replay.run([('{}.xml'.format(i), b'<TDSReport/>') for i in range(4)])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # every request fails, the replay carries on
+    assert stats.count == 4
+    assert stats.statuses == {'IndexError': 4}
@@ -0,0 +1,101 @@
+"""
+Unit tests for the run configuration.
+
+"""
+import json
+
+import pytest
+
+import datagen.config.cfg as cfg
+import datagen.config.population as pop_config
+import datagen.config.state_types as state_config
+from datagen.util.run_config import apply_rates, apply_run_config, load_run_config, run_config_args, \
+    validate_run_config
+
+CONFIG = {
+    'state': {'name': 'Pern', 'code': 'PN', 'type': 'county'},
+    'state_types': {'county': {'district_types_and_counts': [['Small Average', 2]],
+                               'district_groups': [2, 1.0],
+                               'subject_skip_percentages': {'Math': .04, 'ELA': .03},
+                               'demographics': 'california'}},
+    'packages': {'source': './in/2019v2.*.csv', 'ica': True},
+    'years': [2019],
+    'rates': {'interim_asmt': 1, 'transfer': 0.1},
+    'outputs': {'dir': '/tmp/out', 'xml': False, 'csv': True, 'compress': 'gzip'},
+    'parallelism': {'pkg_processes': 4},
+    'seeds': {'hierarchy': 42, 'generation': 7},
+}
+
+
+def test_load_json(tmpdir):
+    file = str(tmpdir.join('run.json'))
+    with open(file, 'w') as f:
+        json.dump(CONFIG, f)
+    assert load_run_config(file) == CONFIG
+
+
+def test_load_yaml(tmpdir):
+    pytest.importorskip('yaml')
+    file = str(tmpdir.join('run.yaml'))
+    with open(file, 'w') as f:
+        f.write('state: {name: Pern, code: PN, type: tiny}\n'
+                'packages:\n'
+                '  source: ./in/*.csv\n'
+                '  sum: true\n'
+                'years: [2018, 2019]\n')
+    assert load_run_config(file) == {'state': {'name': 'Pern', 'code': 'PN', 'type': 'tiny'},
+                                     'packages': {'source': './in/*.csv', 'sum': True}, 'years': [2018, 2019]}
+
+
+def test_invalid(tmpdir):
+    file = str(tmpdir.join('run.json'))
+    with open(file, 'w') as f:
+        json.dump({'state': {'type': 'atlantis', 'flag': 'blue'},
+                   'packages': {'sum': 'yes'},
+                   'rates': {'transfer': 2, 'absence': 0.1},
+                   'outputs': {'compress': 'zip'},
+                   'parallelism': {'pkg_processes': True},
+                   'state_types': {'county': {'district_types_and_counts': [['Huge', 2]]}},
+                   'colors': []}, f)
+    with pytest.raises(ValueError) as error:
+        load_run_config(file)
+    message = str(error.value)
+    assert message.startswith("Invalid run configuration '{}', 10 errors:".format(file))
+    for expected in ("state: unknown setting 'flag'", 'packages.sum: expected bool, not "yes"',
+                     'rates.transfer: 2 is not between 0 and 1', "rates: unknown rate 'absence'",
+                     "outputs.compress: unknown codec 'zip'", 'parallelism.pkg_processes: expected int, not true',
+                     'state_types.county: missing demographics, subject_skip_percentages',
+                     "state_types.county.district_types_and_counts: unknown district type 'Huge'",
+                     "unknown section 'colors'", "state.type: unknown state type 'atlantis'"):
+        assert expected in message
+
+
+def test_validate():
+    assert validate_run_config(CONFIG) == []
+    assert validate_run_config({}) == []
+    assert validate_run_config([]) == ['expected a mapping of sections, e.g. state, packages, outputs']
+    assert validate_run_config({'hierarchy': {'source': 'nowhere.csv'}, 'years': [2019, '2020']}) == \
+        ["years: expected int, not \"2020\"", "hierarchy.source: file 'nowhere.csv' not found"]
+
+
+def test_run_config_args():
+    args = run_config_args(CONFIG)
+    assert args['state_name'] == 'Pern' and args['state_type'] == 'county'
+    assert args['pkg_source'] == './in/2019v2.*.csv' and args['gen_ica'] is True
+    assert args['xml_out'] is False and args['csv_out'] is True and args['compress'] == 'gzip'
+    assert args['pkg_processes'] == 4
+    assert (args['hier_seed'], args['seed']) == (42, 7)
+    assert args['years'] == [2019]
+    assert 'rates' not in args
+
+
+def test_apply_run_config():
+    rates = (cfg.INTERIM_ASMT_RATE, pop_config.STUDENT_TRANSFER_RATE)
+    try:
+        apply_run_config(CONFIG)
+        assert state_config.STATE_TYPES['county']['district_types_and_counts'] == [('Small Average', 2)]
+        assert state_config.STATE_TYPES['county']['district_groups'] == (2, 1.0)
+        assert (cfg.INTERIM_ASMT_RATE, pop_config.STUDENT_TRANSFER_RATE) == (1, 0.1)
+    finally:
+        del state_config.STATE_TYPES['county']
+        apply_rates({'interim_asmt': rates[0], 'transfer': rates[1]})
@@ -0,0 +1,68 @@
+"""
+Unit tests for the run plan.
+
+"""
+import pytest
+
+import datagen.config.cfg as cfg
+import datagen.generators.hierarchy as hier_gen
+from datagen.util.assessment_index import AssessmentIndex
+from datagen.util.id_gen import IDGen
+from datagen.util.run_plan import RunPlan
+from tests.generators.assessment_test import generate_assessment
+
+ID_GEN = IDGen()
+
+# expected students in a grade of an elementary school: the triangular mean plus the additional students
+ELEM_STUDENTS = (75 + 125 + 100) / 3 + 10 / 6
+
+
+def _hierarchy():
+    state = hier_gen.generate_state('devel', 'Example State', 'ES', ID_GEN)
+    district = hier_gen.generate_district('Small Average', state, ID_GEN)
+    elem_school = hier_gen.generate_school('Elementary School', district, ID_GEN, interim_asmt_rate=1)
+    high_school = hier_gen.generate_school('High School', district, ID_GEN, interim_asmt_rate=0)
+    return state, [elem_school, high_school]
+
+
+def test_plan():
+    state, schools = _hierarchy()
+    asmt = generate_assessment('SUM', 2017, 'Math', 3, ID_GEN)
+    iab = generate_assessment('IAB', 2017, 'ELA', 11, ID_GEN)
+    asmt2 = generate_assessment('SUM', 2018, 'Math', 4, ID_GEN)
+    index = AssessmentIndex([asmt, iab, asmt2])
+
+    plan = RunPlan(state, schools, index, gen_item=True)
+    assert plan.years == [2017, 2018]
+    assert plan.grades == {3, 4, 5, 6, 7, 8, 11}
+
+    elem, high = plan.schools
+    assert elem.school is schools[0] and elem.grades == (3, 4, 5)
+    assert high.grades == (11,)
+    assert elem.students == pytest.approx(ELEM_STUDENTS * 3)
+
+    # two summatives, skipped by some students and retaken or updated by others
+    outcomes = ELEM_STUDENTS * (1 - .04) * (1 + max(cfg.ASMT_RETAKE_RATE, cfg.ASMT_UPDATE_RATE))
+    assert elem.outcomes == pytest.approx(2 * outcomes)
+    assert elem.item_responses == pytest.approx(outcomes * (len(asmt.item_bank) + len(asmt2.item_bank)))
+    # the high school doesn't take interim assessments
+    assert high.outcomes == 0
+    assert plan.outcomes == elem.outcomes
+    assert plan.students == elem.students + high.students
+
+    summary = plan.summary(top=1)
+    assert summary.startswith('Run plan: 2 schools, years [2017, 2018]')
+    assert schools[0].id in summary and schools[1].id not in summary
+
+
+def test_plan_years():
+    state, schools = _hierarchy()
+    index = AssessmentIndex([generate_assessment('SUM', 2017, 'Math', 3, ID_GEN),
+                             generate_assessment('SUM', 2018, 'Math', 3, ID_GEN)])
+
+    plan = RunPlan(state, schools, index, years=[2018])
+    assert plan.years == [2018]
+    assert plan.schools[0].item_responses == 0
+
+    with pytest.raises(ValueError, match=r'No assessment packages for years \[2016, 2019\]'):
+        RunPlan(state, schools, index, years=[2019, 2018, 2016])
@@ -0,0 +1,49 @@
+"""
+Unit tests for the weighted choice module.
+
+"""
+import random
+
+from datagen.util.weighted_choice import SamplerRegistry, WeightedChooser
+
+
+def test_chooser_sample():
+    chooser = WeightedChooser({'a': 1.0, 'b': 3.0, 'c': 0.0}, rng=random.Random(42))
+    values = chooser.sample(20000)
+    assert len(values) == 20000
+    assert 'c' not in values
+    assert abs(values.count('b') / len(values) - 0.75) < 0.02
+    assert chooser.choose() in ('a', 'b')
+
+
+def test_chooser_seed():
+    chooser = WeightedChooser({'a': 1.0, 'b': 1.0, 'c': 1.0})
+    assert [chooser.choose(seed=7) for _ in range(5)] == [chooser.choose(seed=7)] * 5
+
+
+def test_registry_compiles_once():
+    registry = SamplerRegistry()
+    config = {'a': {'perc': 0.4}, 'b': {'perc': 0.6}}
+    calls = []
+
+    def weights():
+        calls.append(1)
+        return {name: obj['perc'] for name, obj in config.items()}
+
+    chooser = registry.get(config, weights)
+    assert registry.get(config, weights) is chooser
+    assert len(calls) == 1
+
+    # same content but a different object is a different configuration
+    other = dict(config)
+    assert registry.get(other, lambda: {name: obj['perc'] for name, obj in other.items()}) is not chooser
+
+    # additional key
+    assert registry.get(config, lambda: {'a': 1.0}, 'only a') is not chooser
+    assert registry.get(config, lambda: {'a': 1.0}, 'only a').sample(3) == ['a', 'a', 'a']
+
+
+def test_registry_none():
+    registry = SamplerRegistry()
+    config = {}
+    assert registry.get(config, lambda: None) is None
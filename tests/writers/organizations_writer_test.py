@@ -0,0 +1,78 @@
+"""
+Unit tests for the organizations writer.
+
+"""
+import json
+from collections import OrderedDict
+
+from datagen.util.compression import OutputCompression
+from datagen.util.hierarchy import generate_hierarchy
+from datagen.util.id_gen import IDGen
+from datagen.writers.organizations_writer import OrganizationsWriter, write_organizations
+
+
+def _expected(schools):
+    # what the XmlWorker used to write, re-reading and merging the file for every district
+    districts = OrderedDict()
+    institutions = OrderedDict()
+    for school in schools:
+        district = school.district
+        districts.setdefault(district.id, OrderedDict([('entityId', district.id), ('entityName', district.name),
+                                                       ('entityType', 'DISTRICT'), ('parentEntityType', 'STATE'),
+                                                       ('parentEntityId', district.state.code)]))
+        institutions.setdefault(school.id, OrderedDict([('entityId', school.id), ('entityName', school.name),
+                                                        ('entityType', 'INSTITUTION'), ('parentEntityType', 'DISTRICT'),
+                                                        ('parentEntityId', district.id)]))
+    return json.dumps(OrderedDict([('districts', list(districts.values())),
+                                   ('institutions', list(institutions.values()))]), indent=2)
+
+
+def test_writing_organizations(tmpdir):
+    file = str(tmpdir.join('organizations.json'))
+    _, _, schools = generate_hierarchy('devel', 'Example State', 'ES', IDGen(), seed=42)
+    with OrganizationsWriter(file) as writer:
+        writer.write(schools[:5])
+        writer.write(schools[3:])
+
+    with open(file) as f:
+        assert f.read() == _expected(schools)
+    assert tmpdir.listdir() == [tmpdir.join('organizations.json')]
+
+
+def test_writing_no_organizations(tmpdir):
+    file = str(tmpdir.join('organizations.json'))
+    write_organizations(file, [])
+    with open(file) as f:
+        assert json.load(f) == {'districts': [], 'institutions': []}
+
+
+def test_writing_district_groups(tmpdir):
+    file = str(tmpdir.join('organizations.json'))
+    state, districts, schools = generate_hierarchy('example', 'Example State', 'ES', IDGen(), seed=42)
+    write_organizations(file, schools)
+
+    with open(file) as f:
+        org = json.load(f)
+    assert list(org) == ['groupofdistricts', 'districts', 'institutions']
+    groups = {g['entityId']: g for g in org['groupofdistricts']}
+    assert all(g['entityType'] == 'GROUPOFDISTRICTS' and g['parentEntityType'] == 'STATE' and
+               g['parentEntityId'] == 'ES' for g in groups.values())
+    for entity, district in zip(org['districts'], districts):
+        assert entity['entityId'] == district.id
+        if district.group:
+            assert (entity['parentEntityType'], entity['parentEntityId']) == ('GROUPOFDISTRICTS', district.group.id)
+            assert groups[district.group.id]['entityName'] == district.group.name
+        else:
+            assert (entity['parentEntityType'], entity['parentEntityId']) == ('STATE', 'ES')
+    assert [s['entityId'] for s in org['institutions']] == [s.id for s in schools]
+
+
+def test_writing_compressed_organizations(tmpdir):
+    file = str(tmpdir.join('organizations.json'))
+    compression = OutputCompression('gzip')
+    _, _, schools = generate_hierarchy('devel', 'Example State', 'ES', IDGen(), seed=42)
+    write_organizations(file, schools, compression)
+    compression.close()
+
+    with compression.open_read(file) as f:
+        assert f.read() == _expected(schools)